@@ -0,0 +1,6 @@
+"""Seeded datasets and benchmark scenarios for the store API.
+
+``python manage.py seed_benchmark_data`` fills the database and
+``python manage.py run_benchmarks`` runs the scenarios and writes JSON results.
+``python manage.py benchmark_serialization`` compares the book read paths.
+"""
@@ -0,0 +1,175 @@
+import asyncio
+import gc
+import statistics
+import threading
+import time
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+
+from benchmarks.runner import IN_PROCESS_HOST, in_process_hosts, percentile
+from store.models import Book
+
+
+def endpoints():
+    book_id = Book.objects.order_by('id').values_list('id', flat=True).first()
+    if book_id is None:
+        raise ValueError('The database has no books, run seed_benchmark_data first.')
+    return {
+        'list': ('/book/', '/async/book/', {'page_size': 100}),
+        'retrieve': (f'/book/{book_id}/', f'/async/book/{book_id}/', {}),
+    }
+
+
+class WSGIServer:
+    """A threaded WSGI server without sockets: at most ``threads`` requests run at once.
+
+    A worker stays busy for ``client_delay`` seconds after the response is
+    built, as it would while writing to a slow client.
+    """
+
+    def __init__(self, threads, client_delay):
+        self.application = get_wsgi_application()
+        self.workers = threading.BoundedSemaphore(threads)
+        self.client_delay = client_delay
+
+    def request(self, path, query):
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+                   'HTTP_HOST': IN_PROCESS_HOST, 'SERVER_NAME': IN_PROCESS_HOST,
+                   'SERVER_PORT': '80'}
+        setup_testing_defaults(environ)
+        status = []
+
+        def start_response(value, headers, exc_info=None):
+            status.append(value)
+
+        with self.workers:
+            result = self.application(environ, start_response)
+            try:
+                body = b''.join(result)
+            finally:
+                result.close()
+            time.sleep(self.client_delay)
+        return int(status[0].split()[0]), body
+
+    def run(self, clients, work):
+        latencies, statuses = [], []
+
+        def client(requests):
+            try:
+                for path, query in requests:
+                    started = time.perf_counter()
+                    statuses.append(self.request(path, query)[0])
+                    latencies.append(time.perf_counter() - started)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=client, args=(requests,)) for requests in work]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, latencies, statuses
+
+
+class ASGIServer:
+    """The ASGI counterpart of ``WSGIServer``: every client is a task on one event loop."""
+
+    def __init__(self, client_delay):
+        self.application = get_asgi_application()
+        self.client_delay = client_delay
+
+    async def request(self, path, query):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+            'query_string': query.encode(), 'headers': [(b'host', IN_PROCESS_HOST.encode())],
+            'client': ('127.0.0.1', 0), 'server': (IN_PROCESS_HOST, 80),
+        }
+        finished = asyncio.Event()
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        status, body = [], []
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif message['type'] == 'http.response.body':
+                body.append(message.get('body', b''))
+                if not message.get('more_body'):
+                    await asyncio.sleep(self.client_delay)
+
+        try:
+            await self.application(scope, receive, send)
+        finally:
+            finished.set()
+        return status[0], b''.join(body)
+
+    def run(self, clients, work):
+        latencies, statuses = [], []
+
+        async def client(requests):
+            for path, query in requests:
+                started = time.perf_counter()
+                statuses.append((await self.request(path, query))[0])
+                latencies.append(time.perf_counter() - started)
+
+        async def main():
+            await asyncio.gather(*(client(requests) for requests in work))
+
+        started = time.perf_counter()
+        asyncio.run(main())
+        elapsed = time.perf_counter() - started
+        # Each ASGI request runs its sync code in a thread of its own; collect the
+        # connections those threads left behind.
+        gc.collect()
+        return elapsed, latencies, statuses
+
+
+def summary(elapsed, latencies, statuses):
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies) * 1000, 3),
+            'p50': round(percentile(latencies, 0.5) * 1000, 3),
+            'p95': round(percentile(latencies, 0.95) * 1000, 3),
+        },
+        'status_codes': {str(status): statuses.count(status) for status in sorted(set(statuses))},
+    }
+
+
+def concurrency_throughput(endpoint='list', requests=200, clients=50, threads=4,
+                           client_delay=0.02, cold=True):
+    """Throughput of the sync views under WSGI and of the async views under ASGI.
+
+    ``clients`` concurrent clients send ``requests`` GETs in total and read
+    each response for ``client_delay`` seconds. The WSGI server has
+    ``threads`` workers (a gunicorn worker with ``--threads``), the ASGI one
+    a single event loop. Both run in this process, without sockets. ``cold``
+    makes every request miss the response cache.
+    """
+    sync_path, async_path, params = endpoints()[endpoint]
+    wsgi, asgi = WSGIServer(threads, client_delay), ASGIServer(client_delay)
+    query = urlencode(params)
+    with in_process_hosts():
+        sync_body = wsgi.request(sync_path, query)[1]
+        async_body = asyncio.run(asgi.request(async_path, query))[1]
+
+        results = {'identical': sync_body == async_body.replace(b'/async/', b'/')}
+        for name, server, path in (('wsgi', wsgi, sync_path), ('asgi', asgi, async_path)):
+            work = [[] for _ in range(clients)]
+            for i in range(requests):
+                nonce = {'_nonce': f'{name}-{time.time_ns()}-{i}'} if cold else {}
+                work[i % clients].append((path, urlencode({**params, **nonce})))
+            results[name] = summary(*server.run(clients, work))
+    return results
@@ -0,0 +1,93 @@
+import itertools
+import random
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+
+from store.logic import rebuild_counters, rebuild_rating_summaries
+from store.models import Book, UserBookRelation
+
+USERNAME_PREFIX = 'bench_user_'
+# Of the books the ``create`` scenario posts, which have no isbn.
+CREATED_AUTHOR = 'Benchmark Author'
+AUTHORS = 500
+BATCH_SIZE = 5000
+WORDS = (
+    'War', 'Peace', 'Night', 'River', 'Garden', 'Shadow', 'Winter', 'Sea', 'Stone', 'Fire',
+    'Glass', 'Silence', 'Road', 'House', 'Empire', 'Letters', 'Dream', 'Island', 'City', 'Light',
+)
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def clear_dataset():
+    User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+    Book.objects.filter(Q(isbn__startswith='bench') | Q(author=CREATED_AUTHOR)).delete()
+
+
+def generate_dataset(users=100, books=1000, relations_per_user=20, like_ratio=0.5,
+                     bookmark_ratio=0.2, rating_ratio=0.3, rating_weights=(1, 2, 4, 6, 4),
+                     popularity_skew=1.1, seed=42, batch_size=BATCH_SIZE):
+    """Insert a reproducible dataset with ``bulk_create`` batches.
+
+    Book popularity follows a Zipf-like law with exponent ``popularity_skew``,
+    so a few books collect most relations. Each relation independently is a
+    like, a bookmark and/or a rating with the given probabilities; ratings
+    1..5 are drawn with ``rating_weights``. Counters and rating summaries are
+    rebuilt at the end. Returns the number of rows inserted per model.
+    """
+    rng = random.Random(seed)
+    first_user = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+
+    with transaction.atomic():
+        for batch in _batched(range(first_user, first_user + users), batch_size):
+            User.objects.bulk_create([User(username=f'{USERNAME_PREFIX}{i}', password='!')
+                                      for i in batch])
+        first_book = Book.objects.filter(isbn__startswith='bench').count()
+        for batch in _batched(range(first_book, first_book + books), batch_size):
+            Book.objects.bulk_create([
+                Book(name=f'Book {i} {rng.choice(WORDS)} {rng.choice(WORDS)}',
+                     price=Decimal(rng.randrange(100, 10000)) / 100,
+                     author=f'Author {rng.randrange(AUTHORS)} {rng.choice(WORDS)}',
+                     isbn=f'bench{i:08d}')
+                for i in batch])
+
+    user_ids = list(User.objects.filter(username__startswith=USERNAME_PREFIX)
+                    .order_by('id').values_list('id', flat=True))[first_user:]
+    book_ids = list(Book.objects.filter(isbn__startswith='bench')
+                    .order_by('id').values_list('id', flat=True))
+    weights = list(itertools.accumulate(1 / (rank + 1) ** popularity_skew
+                                        for rank in range(len(book_ids))))
+    per_user = min(relations_per_user, len(book_ids))
+
+    def relations():
+        for user_id in user_ids:
+            chosen = set()
+            while len(chosen) < per_user:
+                chosen.update(rng.choices(book_ids, cum_weights=weights,
+                                          k=per_user - len(chosen)))
+            for book_id in sorted(chosen):
+                yield UserBookRelation(
+                    user_id=user_id, book_id=book_id,
+                    like=rng.random() < like_ratio,
+                    in_bookmarks=rng.random() < bookmark_ratio,
+                    rate=rng.choices(range(1, 6), weights=rating_weights)[0]
+                    if rng.random() < rating_ratio else None)
+
+    created_relations = 0
+    for batch in _batched(relations(), batch_size):
+        UserBookRelation.objects.bulk_create(batch, ignore_conflicts=True)
+        created_relations += len(batch)
+    rebuild_counters()
+    rebuild_rating_summaries()
+    return {'users': len(user_ids), 'books': books, 'relations': created_relations}
+
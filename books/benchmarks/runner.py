@@ -0,0 +1,254 @@
+import http.client
+import json
+import math
+import platform
+import random
+import re
+import statistics
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import nullcontext
+from importlib import import_module
+from urllib.parse import urlencode, urlsplit
+
+import django
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client, override_settings
+from django.utils.crypto import get_random_string
+
+from benchmarks.dataset import CREATED_AUTHOR, USERNAME_PREFIX, WORDS
+from store.models import Book
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+# The test client's default host; in-process requests carry it.
+IN_PROCESS_HOST = 'testserver'
+
+
+def _query_count(server_timing):
+    match = QUERIES_RE.search(server_timing or '')
+    return int(match.group(1)) if match else None
+
+
+class ClientDriver:
+    """Send requests in-process through the Django test client."""
+    in_process = True
+
+    def __init__(self, user):
+        self.anonymous = Client()
+        self.authenticated = Client()
+        self.authenticated.force_login(user)
+
+    def request(self, method, path, data=None, auth=False):
+        client = self.authenticated if auth else self.anonymous
+        if method == 'GET':
+            response = client.get(path, data)
+        else:
+            response = client.generic(method, path, json.dumps(data),
+                                      content_type='application/json')
+        return response.status_code, _query_count(response.get('Server-Timing'))
+
+
+class HttpDriver:
+    """Send requests over keep-alive HTTP to a running WSGI/ASGI server."""
+    in_process = False
+
+    def __init__(self, user, url):
+        parts = urlsplit(url)
+        self.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80)
+        self.prefix = parts.path.rstrip('/')
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        csrf_token = get_random_string(32)
+        self.auth_headers = {
+            'Cookie': f'sessionid={session.session_key}; csrftoken={csrf_token}',
+            'X-CSRFToken': csrf_token,
+        }
+
+    def request(self, method, path, data=None, auth=False):
+        headers = dict(self.auth_headers) if auth else {}
+        body = None
+        if method == 'GET':
+            if data:
+                path = f'{path}?{urlencode(data)}'
+        else:
+            body = json.dumps(data)
+            headers['Content-Type'] = 'application/json'
+        self.connection.request(method, self.prefix + path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        response.read()
+        return response.status, _query_count(response.getheader('Server-Timing'))
+
+
+class Context:
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        bounds = Book.objects.aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            raise ValueError('The database has no books, run seed_benchmark_data first.')
+        span = range(bounds['low'], bounds['high'] + 1)
+        candidates = self.rng.sample(span, min(len(span), 2000))
+        self.book_ids = sorted(Book.objects.filter(pk__in=candidates).values_list('id', flat=True))
+        self.prices = list(Book.objects.filter(pk__in=self.book_ids[:50])
+                           .values_list('price', flat=True))
+
+
+def scenario_list(context, i):
+    return 'GET', '/book/', {'page_size': 100}, False
+
+
+def scenario_filter(context, i):
+    return 'GET', '/book/', {'price': str(context.rng.choice(context.prices))}, False
+
+
+def scenario_search(context, i):
+    return 'GET', '/book/', {'search': context.rng.choice(WORDS)[:4], 'page_size': 100}, False
+
+
+def scenario_ordering(context, i):
+    ordering = context.rng.choice(['price', '-price', 'author', '-author'])
+    return 'GET', '/book/', {'ordering': ordering, 'page_size': 100}, False
+
+
+def scenario_retrieve(context, i):
+    return 'GET', f'/book/{context.rng.choice(context.book_ids)}/', None, False
+
+
+def scenario_relation_patch(context, i):
+    data = {'like': context.rng.random() < 0.5, 'rate': context.rng.randrange(1, 6)}
+    return 'PATCH', f'/book-relation/{context.rng.choice(context.book_ids)}/', data, True
+
+
+def scenario_create(context, i):
+    data = {'name': f'Benchmark book {i}', 'price': '12.34', 'author': CREATED_AUTHOR}
+    return 'POST', '/book/', data, True
+
+
+SCENARIOS = {
+    'list': scenario_list,
+    'filter': scenario_filter,
+    'search': scenario_search,
+    'ordering': scenario_ordering,
+    'retrieve': scenario_retrieve,
+    'relation_patch': scenario_relation_patch,
+    'create': scenario_create,
+}
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def run_scenario(driver, scenario, context, iterations, warmup, cold, memory_iterations=5):
+    def send(i):
+        method, path, data, auth = scenario(context, i)
+        if cold and method == 'GET':
+            data = dict(data or {}, _nonce=f'{time.time_ns()}-{i}')
+        return driver.request(method, path, data, auth)
+
+    for i in range(warmup):
+        send(i)
+
+    latencies, queries, statuses = [], [], Counter()
+    started = time.perf_counter()
+    for i in range(iterations):
+        request_started = time.perf_counter()
+        status, query_count = send(warmup + i)
+        latencies.append(time.perf_counter() - request_started)
+        statuses[status] += 1
+        if query_count is not None:
+            queries.append(query_count)
+    elapsed = time.perf_counter() - started
+
+    peak_memory = None
+    if driver.in_process and memory_iterations:
+        tracemalloc.start()
+        for i in range(memory_iterations):
+            send(warmup + iterations + i)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'requests': iterations,
+        'throughput_rps': round(iterations / elapsed, 2),
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies) * 1000, 3),
+            'p50': round(percentile(latencies, 0.5) * 1000, 3),
+            'p95': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99': round(percentile(latencies, 0.99) * 1000, 3),
+            'max': round(max(latencies) * 1000, 3),
+        },
+        'queries': {
+            'mean': round(statistics.mean(queries), 2) if queries else None,
+            'max': max(queries) if queries else None,
+        },
+        'peak_memory_kb': round(peak_memory / 1024, 1) if peak_memory is not None else None,
+        'status_codes': {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def in_process_hosts():
+    """Allow ``IN_PROCESS_HOST`` besides the configured hosts while requests run in-process."""
+    return override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, IN_PROCESS_HOST])
+
+
+def run_benchmarks(names=None, driver='client', url=None, iterations=100, warmup=10,
+                   cold=False, seed=42):
+    """Run the named scenarios (all by default) and return the results document."""
+    user = User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('id').first()
+    if user is None:
+        user = User.objects.create(username=f'{USERNAME_PREFIX}runner', password='!')
+    driver = ClientDriver(user) if driver == 'client' else HttpDriver(user, url)
+    context = Context(seed)
+    results = {}
+    with in_process_hosts() if driver.in_process else nullcontext():
+        for name in names or SCENARIOS:
+            results[name] = run_scenario(driver, SCENARIOS[name], context, iterations, warmup,
+                                         cold)
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'driver': 'client' if driver.in_process else url,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'iterations': iterations,
+            'warmup': warmup,
+            'cold': cold,
+            'books': Book.objects.count(),
+            'users': User.objects.count(),
+        },
+        'scenarios': results,
+    }
+
+
+def compare(baseline, current, threshold=0.1):
+    """Return human readable regressions of ``current`` against ``baseline``.
+
+    A scenario regresses when its p95 latency grows, or its throughput drops,
+    by more than ``threshold`` (relative), or when it runs more queries.
+    """
+    regressions = []
+    for name, result in current['scenarios'].items():
+        old = baseline['scenarios'].get(name)
+        if old is None:
+            continue
+        old_p95, new_p95 = old['latency_ms']['p95'], result['latency_ms']['p95']
+        if old_p95 and new_p95 > old_p95 * (1 + threshold):
+            regressions.append(f'{name}: p95 {old_p95}ms -> {new_p95}ms')
+        old_rps, new_rps = old['throughput_rps'], result['throughput_rps']
+        if new_rps < old_rps * (1 - threshold):
+            regressions.append(f'{name}: throughput {old_rps} -> {new_rps} req/s')
+        old_queries, new_queries = old['queries']['max'], result['queries']['max']
+        if old_queries is not None and new_queries is not None and new_queries > old_queries:
+            regressions.append(f'{name}: queries {old_queries} -> {new_queries}')
+    return regressions
@@ -0,0 +1,43 @@
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+from store.renderers import FastJSONRenderer, orjson
+from store.rows import BookRows
+from store.serializers import BookSerializer
+from store.views import BookViewSet
+
+
+def render_serializer(queryset):
+    return JSONRenderer().render(BookSerializer(queryset, many=True).data)
+
+
+def render_rows(queryset):
+    rows = BookRows()
+    return FastJSONRenderer().render(rows.data(rows.values(queryset)))
+
+
+PATHS = {
+    'serializer': render_serializer,
+    'rows': render_rows,
+}
+
+
+def serialization_throughput(limit=1000, repeat=5):
+    """Rows per second of the serializer and ``BookRows`` read paths, query included.
+
+    Both render the first ``limit`` books of the anonymous book list, the
+    best of ``repeat`` runs is kept.
+    """
+    queryset = BookViewSet.queryset.order_by('id')[:limit]
+    rows = queryset.count()
+    outputs, results = {}, {'orjson': orjson is not None}
+    for name, render in PATHS.items():
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            outputs[name] = render(queryset.all())
+            best = min(best, time.perf_counter() - started)
+        results[name] = {'rows': rows, 'rows_per_second': round(rows / best) if best else None}
+    results['identical'] = outputs['serializer'] == outputs['rows']
+    return results
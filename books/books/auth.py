@@ -0,0 +1,83 @@
+"""Authentication without queries on warm requests.
+
+``CachedAuthenticationMiddleware`` replaces Django's ``AuthenticationMiddleware``
+and keeps the user objects in the cache, keyed by id, whatever backend
+(``ModelBackend`` or the social auth ones) logged them in. The session hash is
+checked against the cached user as ``django.contrib.auth.get_user`` does; when
+it does not match, the request falls back to that function, which reloads the
+user and flushes the session if needed. ``forget_user`` drops a user from the
+cache when it is saved or deleted.
+
+The cache must be shared by all the workers, or a deactivated user or a
+revoked staff flag stays in effect in the others until ``TIMEOUT``:
+``check --deploy`` fails on a process-local (locmem) cache.
+
+Sessions use the ``cached_db`` engine, so reading one does not query either.
+
+Settings (all optional)::
+
+    AUTH_USER_CACHE = {
+        'CACHE': 'default',
+        'TIMEOUT': 300,
+    }
+"""
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+USER_KEY = 'auth:user:{}'
+
+
+def get_setting(name, default):
+    return getattr(settings, 'AUTH_USER_CACHE', {}).get(name, default)
+
+
+def get_cache():
+    return caches[get_setting('CACHE', 'default')]
+
+
+def get_user(request):
+    """``django.contrib.auth.get_user`` reading the user from the cache when it can."""
+    user_id = request.session.get(SESSION_KEY)
+    backend_path = request.session.get(BACKEND_SESSION_KEY)
+    if user_id is None or backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return auth.get_user(request)
+    cache = get_cache()
+    key = USER_KEY.format(user_id)
+    user = cache.get(key)
+    if user is not None:
+        session_hash = request.session.get(HASH_SESSION_KEY)
+        if session_hash and constant_time_compare(session_hash, user.get_session_auth_hash()):
+            return user
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(key, user, get_setting('TIMEOUT', 300))
+    return user
+
+
+def forget_user(sender, instance, **kwargs):
+    get_cache().delete(USER_KEY.format(instance.pk))
+
+
+def check_user_cache(app_configs=None, **kwargs):
+    if isinstance(get_cache(), LocMemCache):
+        return [checks.Error(
+            'AUTH_USER_CACHE uses a process-local cache, so saving or deleting a user '
+            'does not reach the other workers.',
+            hint='Point AUTH_USER_CACHE["CACHE"] at a shared cache (Redis, Memcached).',
+            id='books.E001',
+        )]
+    return []
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
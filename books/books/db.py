@@ -0,0 +1,162 @@
+"""Read replica routing.
+
+``ReplicaRouter`` sends writes to ``default`` and reads to one of the
+replicas, except when the data may not have replicated yet:
+
+* in unsafe (writing) requests, inside ``transaction.atomic`` on the primary
+  and for the rest of a request or command after it wrote anything;
+* for ``STICKY_SECONDS`` after a request of the same session wrote, so users
+  read their own writes (``ReplicaRoutingMiddleware`` keeps the mark in the
+  cache, keyed by the session cookie so no query is needed to find it).
+
+A replica that cannot be connected to is skipped for ``RETRY_SECONDS`` and
+reads fall back to the other replicas, then to the primary. Connections are
+persistent (``CONN_MAX_AGE``) and checked before reuse (``CONN_HEALTH_CHECKS``).
+
+Settings (all optional)::
+
+    REPLICA_ROUTING = {
+        'REPLICAS': ['replica'],  # DATABASES aliases serving reads
+        'STICKY_SECONDS': 5,
+        'RETRY_SECONDS': 30,
+        'CACHE': 'default',
+    }
+
+To try it locally with two SQLite files, add a second alias and migrate it
+(there is no replication, so the replica only shows rows written to it)::
+
+    DATABASES['replica'] = {'ENGINE': 'django.db.backends.sqlite3',
+                            'NAME': BASE_DIR / 'replica.sqlite3',
+                            'TEST': {'MIRROR': 'default'}}
+
+    python manage.py migrate --database replica
+"""
+import contextvars
+import hashlib
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.connection import ConnectionDoesNotExist
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_KEY = 'db:primary:{}'
+
+_use_primary = contextvars.ContextVar('use_primary', default=False)
+_wrote = contextvars.ContextVar('wrote', default=False)
+_unavailable_until = {}
+
+
+def get_setting(name, default):
+    return getattr(settings, 'REPLICA_ROUTING', {}).get(name, default)
+
+
+def use_primary(sticky=False):
+    """Send the reads of the current request or command to the primary from now on.
+
+    With ``sticky``, the next requests of the session too, as after a write.
+    """
+    _use_primary.set(True)
+    if sticky:
+        _wrote.set(True)
+
+
+def is_available(alias):
+    """Whether ``alias`` can be connected to, remembering failures for ``RETRY_SECONDS``."""
+    if _unavailable_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except (DatabaseError, ConnectionDoesNotExist) as error:
+        logger.warning('Replica %s is unavailable: %s', alias, error)
+        _unavailable_until[alias] = time.monotonic() + get_setting('RETRY_SECONDS', 30)
+        return False
+    _unavailable_until.pop(alias, None)
+    return True
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if (_use_primary.get() or _wrote.get()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        replicas = list(get_setting('REPLICAS', []))
+        random.shuffle(replicas)
+        for alias in replicas:
+            if is_available(alias):
+                return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+def _sticky_key(session_key):
+    return STICKY_KEY.format(hashlib.sha1(session_key.encode()).hexdigest())
+
+
+class ReplicaRoutingMiddleware:
+    """Scope the routing state to the request and make writers sticky to the primary.
+
+    Must come after ``SessionMiddleware``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        cache = caches[get_setting('CACHE', 'default')]
+        session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        primary = (request.method not in SAFE_METHODS
+                   or bool(session_key and cache.get(_sticky_key(session_key))))
+        primary_token = _use_primary.set(primary)
+        wrote_token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            session_key = getattr(request, 'session', None) and request.session.session_key
+            if _wrote.get() and session_key:
+                cache.set(_sticky_key(session_key), True, get_setting('STICKY_SECONDS', 5))
+            return response
+        finally:
+            _use_primary.reset(primary_token)
+            _wrote.reset(wrote_token)
+
+    async def __acall__(self, request):
+        cache = caches[get_setting('CACHE', 'default')]
+        session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        primary = (request.method not in SAFE_METHODS
+                   or bool(session_key and await cache.aget(_sticky_key(session_key))))
+        primary_token = _use_primary.set(primary)
+        wrote_token = _wrote.set(False)
+        try:
+            # asgiref copies context variables set in worker threads back, so _wrote
+            # sees the writes of sync views.
+            response = await self.get_response(request)
+            session_key = getattr(request, 'session', None) and request.session.session_key
+            if _wrote.get() and session_key:
+                await cache.aset(_sticky_key(session_key), True, get_setting('STICKY_SECONDS', 5))
+            return response
+        finally:
+            _use_primary.reset(primary_token)
+            _wrote.reset(wrote_token)
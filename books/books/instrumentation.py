@@ -0,0 +1,280 @@
+"""Per-request query count and latency instrumentation.
+
+``RequestInstrumentationMiddleware`` records, for every request, the number
+of SQL queries and the time spent in the database, in serializers and in the
+whole view. The numbers are sent back in a ``Server-Timing`` header and
+aggregated per route in process memory, where ``metrics`` serves them as JSON
+percentiles or in the Prometheus text format, together with the gauges apps
+register with ``registry.register_gauges``.
+
+Settings (all optional)::
+
+    REQUEST_INSTRUMENTATION = {
+        'QUERY_BUDGETS': {'book-list': 2},  # URL name -> max queries
+        'ON_BUDGET_EXCEEDED': 'log',        # or 'raise'
+    }
+"""
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+from rest_framework.serializers import ListSerializer
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, float('inf'))
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def get_setting(name, default):
+    return getattr(settings, 'REQUEST_INSTRUMENTATION', {}).get(name, default)
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.queries = 0
+        self.timings = {'db': 0.0, 'serializer': 0.0, 'view': 0.0}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.timings['db'] += time.perf_counter() - started
+
+    def server_timing(self):
+        return ', '.join(
+            f'{name};dur={duration * 1000:.2f}' + (f';desc="{self.queries} queries"'
+                                                  if name == 'db' else '')
+            for name, duration in self.timings.items())
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to ``name`` for the current request."""
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.timings[name] = metrics.timings.get(name, 0.0) + time.perf_counter() - started
+
+
+class TimedListSerializer(ListSerializer):
+
+    @property
+    def data(self):
+        with timed('serializer'):
+            return super().data
+
+
+class TimedSerializerMixin:
+    """Account ``serializer.data`` as serializer time.
+
+    Set ``Meta.list_serializer_class = TimedListSerializer`` to cover ``many=True`` too.
+    """
+
+    @property
+    def data(self):
+        with timed('serializer'):
+            return super().data
+
+
+class RouteStats:
+
+    def __init__(self):
+        self.count = 0
+        self.buckets = [0] * len(BUCKETS)
+        self.totals = {'queries': 0, 'db': 0.0, 'serializer': 0.0, 'view': 0.0}
+        self.max_queries = 0
+
+    def add(self, metrics):
+        self.count += 1
+        self.buckets[bisect.bisect_left(BUCKETS, metrics.timings['view'])] += 1
+        self.totals['queries'] += metrics.queries
+        self.max_queries = max(self.max_queries, metrics.queries)
+        for name in ('db', 'serializer', 'view'):
+            self.totals[name] += metrics.timings[name]
+
+    def quantile(self, q):
+        """Estimate the ``q`` quantile of the view time by interpolating in its bucket."""
+        rank = q * self.count
+        seen = 0
+        for index, observed in enumerate(self.buckets):
+            if observed and seen + observed >= rank:
+                lower = BUCKETS[index - 1] if index else 0.0
+                upper = BUCKETS[index] if index < len(BUCKETS) - 1 else lower
+                return lower + (upper - lower) * (rank - seen) / observed
+            seen += observed
+        return 0.0
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'p50_ms': round(self.quantile(0.5) * 1000, 3),
+            'p95_ms': round(self.quantile(0.95) * 1000, 3),
+            'p99_ms': round(self.quantile(0.99) * 1000, 3),
+            'avg_queries': round(self.totals['queries'] / self.count, 2),
+            'max_queries': self.max_queries,
+            'avg_db_ms': round(self.totals['db'] * 1000 / self.count, 3),
+            'avg_serializer_ms': round(self.totals['serializer'] * 1000 / self.count, 3),
+        }
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.gauges = []
+
+    def register_gauges(self, collect):
+        """Serve the gauges ``collect()`` returns as ``{name: (description, value)}``."""
+        self.gauges.append(collect)
+
+    def collect_gauges(self):
+        return {name: gauge for collect in self.gauges for name, gauge in collect().items()}
+
+    def record(self, route, metrics):
+        with self.lock:
+            self.routes.setdefault(route, RouteStats()).add(metrics)
+
+    def reset(self):
+        with self.lock:
+            self.routes = {}
+
+    def snapshot(self):
+        with self.lock:
+            return {f'{method} {name}': stats.as_dict()
+                    for (method, name), stats in sorted(self.routes.items())}
+
+    def prometheus(self):
+        lines = [
+            '# HELP books_request_duration_seconds Time spent in the view.',
+            '# TYPE books_request_duration_seconds histogram',
+        ]
+        totals = []
+        with self.lock:
+            for (method, name), stats in sorted(self.routes.items()):
+                labels = f'method="{method}",route="{name}"'
+                cumulative = 0
+                for bound, observed in zip(BUCKETS, stats.buckets):
+                    cumulative += observed
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'books_request_duration_seconds_bucket{{{labels},le="{le}"}} '
+                                 f'{cumulative}')
+                lines.append(f'books_request_duration_seconds_sum{{{labels}}} '
+                             f'{stats.totals["view"]}')
+                lines.append(f'books_request_duration_seconds_count{{{labels}}} {stats.count}')
+                totals.append((labels, stats.totals))
+        for metric, key, description in (
+                ('books_request_queries_total', 'queries', 'SQL queries executed.'),
+                ('books_request_db_seconds_total', 'db', 'Time spent in the database.'),
+                ('books_request_serializer_seconds_total', 'serializer',
+                 'Time spent in serializers.')):
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} counter')
+            lines.extend(f'{metric}{{{labels}}} {values[key]}' for labels, values in totals)
+        for name, (description, value) in self.collect_gauges().items():
+            lines += [f'# HELP books_{name} {description}', f'# TYPE books_{name} gauge',
+                      f'books_{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match.route
+
+
+class RequestInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                self.wrap_connections(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            metrics.timings['view'] = time.perf_counter() - started
+            _current.reset(token)
+        return self.record(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        stack = ExitStack()
+        try:
+            # Connections are per thread: wrap the ones of the thread that runs the
+            # sync code of this request (asgiref's ThreadSensitiveContext).
+            await sync_to_async(self.wrap_connections)(stack, metrics)
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            metrics.timings['view'] = time.perf_counter() - started
+            _current.reset(token)
+        return self.record(request, response, metrics)
+
+    @staticmethod
+    def wrap_connections(stack, metrics):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+
+    def record(self, request, response, metrics):
+        route = route_name(request)
+        registry.record((request.method, route), metrics)
+        response['Server-Timing'] = metrics.server_timing()
+        self.check_budget(request, route, metrics)
+        return response
+
+    def check_budget(self, request, route, metrics):
+        budget = get_setting('QUERY_BUDGETS', {}).get(route)
+        if budget is None or metrics.queries <= budget:
+            return
+        message = (f'{request.method} {request.path} ({route}) ran {metrics.queries} queries, '
+                   f'budget is {budget}')
+        if get_setting('ON_BUDGET_EXCEEDED', 'log') == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+def metrics(request):
+    if not (request.user.is_authenticated and request.user.is_staff):
+        raise PermissionDenied
+    if request.GET.get('format') == 'prometheus':
+        return HttpResponse(registry.prometheus(),
+                            content_type='text/plain; version=0.0.4; charset=utf-8')
+    gauges = {name: value for name, (description, value) in registry.collect_gauges().items()}
+    return JsonResponse({**registry.snapshot(), **({'gauges': gauges} if gauges else {})})
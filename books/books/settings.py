@@ -33,11 +33,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'books.instrumentation.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'books.db.ReplicaRoutingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'books.auth.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -74,9 +76,44 @@ DATABASES = {
         'PASSWORD': '000000',
         'HOST': 'localhost',
         'PORT': '5432',
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+DATABASE_ROUTERS = ['books.db.ReplicaRouter']
+
+REPLICA_ROUTING = {
+    'REPLICAS': [],
+    'STICKY_SECONDS': 5,
+    'RETRY_SECONDS': 30,
+    'CACHE': 'default',
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+AUTH_USER_CACHE = {
+    'CACHE': 'default',
+    'TIMEOUT': 300,
+}
+
+STORE_RESPONSE_CACHE = 'default'
+STORE_RESPONSE_CACHE_TIMEOUT = 60 * 60
+# Buffer relation PATCHes for the flush_relation_changes command (store.writebehind).
+STORE_RELATION_WRITE_BEHIND = False
+# Pre-compressed anonymous book lists written by the build_snapshots command (store.snapshots).
+STORE_SNAPSHOT_DIR = BASE_DIR / 'snapshots'
+
+REQUEST_INSTRUMENTATION = {
+    'QUERY_BUDGETS': {},
+    'ON_BUDGET_EXCEEDED': 'log',
+}
 
 
 # Password validation
@@ -2,6 +2,8 @@ from django.contrib import admin
 from django.template.defaulttags import url
 from django.urls import path, include, re_path
 from rest_framework.routers import SimpleRouter
+from books.instrumentation import metrics
+from store.async_views import async_view
 from store.views import BookViewSet, BookRelationViewSet
 from store.views import auth
 
@@ -12,7 +14,20 @@ router.register(r'book-relation', BookRelationViewSet)
 urlpatterns = [
     path('admin/', admin.site.urls),
     re_path('', include('social_django.urls', namespace='social')),
-    path('auth/', auth)
+    path('auth/', auth),
+    path('metrics/', metrics),
 ]
 
 urlpatterns += router.urls
+
+# The read endpoints again as async views, for clients of an ASGI deployment.
+urlpatterns += [
+    path('async/book/', async_view(BookViewSet, 'list'), name='async-book-list'),
+    path('async/book/<int:pk>/', async_view(BookViewSet, 'retrieve'), name='async-book-detail'),
+    path('async/book-relation/bookmarks/', async_view(BookRelationViewSet, 'bookmarks'),
+         name='async-userbookrelation-bookmarks'),
+    path('async/book-relation/likes/', async_view(BookRelationViewSet, 'likes'),
+         name='async-userbookrelation-likes'),
+    path('async/book-relation/rated/', async_view(BookRelationViewSet, 'rated'),
+         name='async-userbookrelation-rated'),
+]
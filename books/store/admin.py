@@ -1,5 +1,27 @@
 from django.contrib import admin
+from .counting import EstimatedCountPaginator
 from .models import *
 
-admin.site.register(Book)
-admin.site.register(UserBookRelation)
+
+@admin.register(Book)
+class BookAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'author', 'price', 'likes_count')
+    raw_id_fields = ('owner',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(UserBookRelation)
+class UserBookRelationAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'like', 'in_bookmarks', 'rate')
+    list_select_related = ('user', 'book')
+    raw_id_fields = ('user', 'book')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+admin.site.register(BookRatingSummary)
+admin.site.register(TrendingScore)
+admin.site.register(BookSimilarity)
+admin.site.register(BookTombstone)
+admin.site.register(PendingRelationChange)
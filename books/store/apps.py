@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.core import checks
+from django.db.models.signals import post_delete, post_migrate, post_save
 
 
 class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'store'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+
+        from books.auth import check_user_cache, forget_user
+        from books.instrumentation import registry
+        from store import signals
+        from store.cache import check_response_cache
+        from store.writebehind import buffer_gauges
+        post_migrate.connect(signals.ensure_search_index, sender=self)
+        post_save.connect(forget_user, sender=get_user_model())
+        post_delete.connect(forget_user, sender=get_user_model())
+        registry.register_gauges(buffer_gauges)
+        checks.register(check_user_cache, checks.Tags.caches, deploy=True)
+        checks.register(check_response_cache, checks.Tags.caches, deploy=True)
@@ -0,0 +1,74 @@
+"""Async read endpoints for ASGI deployments.
+
+``AsyncReadView`` serves one read action of a viewset on the event loop. The
+request goes through the viewset's own ``initial`` (authentication,
+permissions, throttling, content negotiation) in a single hop to a worker
+thread, since sessions and users are only loaded synchronously. Rows are then
+fetched with the async ORM (``aiterator``, ``aget``) and the response cache is
+read and written through the async cache API, so a request waiting on the
+database or on a slow client holds no thread of its own. Writes stay on the
+sync viewsets.
+
+Django runs the sync code of every ASGI request in a thread of its own, so
+database connections are not reused across requests whatever ``CONN_MAX_AGE``
+says; put a pooler such as PgBouncer in front of PostgreSQL.
+``benchmark_concurrency`` compares this path under ASGI with the sync views
+under WSGI.
+
+A viewset supports it by mixing in ``AsyncReadMixin`` and defining
+``a<action>`` coroutines next to its sync actions.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+
+
+class AsyncReadMixin:
+
+    @staticmethod
+    def pinned(queryset):
+        """``queryset`` bound to the database the router picks for it.
+
+        The router may connect to a replica to check it is up, which cannot
+        happen on the event loop, so async actions pin their querysets while
+        they are still in a worker thread.
+        """
+        return queryset.using(queryset.db)
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+
+
+class AsyncReadView(View):
+    viewset = None
+    action = None
+    http_method_names = ['get', 'options']
+
+    async def get(self, request, *args, **kwargs):
+        viewset = self.viewset(action_map={'get': self.action}, basename=self.get_basename(),
+                               args=args, kwargs=kwargs, format_kwarg=None)
+        request = viewset.initialize_request(request, *args, **kwargs)
+        viewset.request = request
+        viewset.headers = viewset.default_response_headers
+        try:
+            await sync_to_async(viewset.initial)(request, *args, **kwargs)
+            response = await getattr(viewset, f'a{self.action}')(request, *args, **kwargs)
+        except Exception as exc:
+            response = viewset.handle_exception(exc)
+        response = viewset.finalize_response(request, response, *args, **kwargs)
+        if not hasattr(response, 'render'):
+            return response
+        # Handed back unrendered, the response would be rendered in a worker thread.
+        response.render()
+        return HttpResponse(response.content, status=response.status_code,
+                            headers=response.headers)
+
+    def get_basename(self):
+        # The router's default, which the response cache keys include.
+        return self.viewset.queryset.model._meta.object_name.lower()
+
+
+def async_view(viewset, action):
+    return AsyncReadView.as_view(viewset=viewset, action=action)
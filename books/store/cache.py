@@ -0,0 +1,221 @@
+import hashlib
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+LIST_GENERATION_KEY = 'store:books:generation'
+BOOK_GENERATION_KEY = 'store:book:{}:generation'
+TRENDING_GENERATION_KEY = 'store:trending:generation'
+RECOMMENDATIONS_GENERATION_KEY = 'store:recommendations:generation'
+
+
+def get_cache():
+    return caches[getattr(settings, 'STORE_RESPONSE_CACHE', 'default')]
+
+
+def check_response_cache(app_configs=None, **kwargs):
+    # Generations are bumped in the writing process only: the other workers would keep
+    # serving their cached responses, and snapshots built by the build_snapshots command
+    # would never match the generation of a worker.
+    if isinstance(get_cache(), LocMemCache):
+        return [checks.Error(
+            'STORE_RESPONSE_CACHE uses a process-local cache, so a write does not '
+            'invalidate the responses cached by the other workers.',
+            hint='Point STORE_RESPONSE_CACHE at a shared cache (Redis, Memcached).',
+            id='store.E001',
+        )]
+    return []
+
+
+def _bump(keys):
+    get_cache().set_many({key: uuid.uuid4().hex for key in keys}, timeout=None)
+
+
+def _invalidate(keys):
+    _bump(keys)
+    transaction.on_commit(lambda: _bump(keys))
+
+
+def invalidate_books(book_ids=None):
+    """Drop cached book responses: the list plus the given books (or all books).
+
+    Generations are bumped now, so the current transaction reads fresh data,
+    and again on commit, so a response cached by a concurrent reader from
+    pre-commit data is not served afterwards.
+    """
+    if book_ids is None:
+        keys = [LIST_GENERATION_KEY, BOOK_GENERATION_KEY.format('*')]
+    else:
+        keys = [LIST_GENERATION_KEY] + [BOOK_GENERATION_KEY.format(pk) for pk in set(book_ids)]
+    _invalidate(keys)
+
+
+def invalidate_trending():
+    _invalidate([TRENDING_GENERATION_KEY])
+
+
+def invalidate_recommendations():
+    _invalidate([RECOMMENDATIONS_GENERATION_KEY])
+
+
+def get_generation(keys):
+    cache = get_cache()
+    generations = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in generations}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        generations.update(missing)
+    return ':'.join(generations[key] for key in keys)
+
+
+async def aget_generation(keys):
+    cache = get_cache()
+    generations = await cache.aget_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in generations}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        generations.update(missing)
+    return ':'.join(generations[key] for key in keys)
+
+
+def normalized_query(request, ignore=()):
+    params = sorted((key, value) for key, values in request.GET.lists()
+                    for value in values if value != '' and key not in ignore)
+    return urlencode(params)
+
+
+def make_etag(content):
+    return '"%s"' % hashlib.sha1(content).hexdigest()
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag in etags
+
+
+class CachedResponseMixin:
+    """Cache rendered ``list``/``retrieve`` responses of a viewset.
+
+    The cache key contains the user (responses carry per-user fields), the
+    path and normalized query string and the generation of the data it
+    depends on: the list generation for ``list`` and the book generation for
+    ``retrieve``. ``invalidate_books`` bumps them on every write. Responses
+    carry a strong ETag, so a matching ``If-None-Match`` gets a 304 straight
+    from the cache. ``alist``, ``aretrieve`` and ``acached_response`` do the
+    same for async views.
+    """
+    cache_timeout = getattr(settings, 'STORE_RESPONSE_CACHE_TIMEOUT', 60 * 60)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response([LIST_GENERATION_KEY], super().list,
+                                    request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        book_key = BOOK_GENERATION_KEY.format(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        return self.cached_response([BOOK_GENERATION_KEY.format('*'), book_key],
+                                    super().retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_response([LIST_GENERATION_KEY], super().alist,
+                                           request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        book_key = BOOK_GENERATION_KEY.format(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        return await self.acached_response([BOOK_GENERATION_KEY.format('*'), book_key],
+                                           super().aretrieve, request, *args, **kwargs)
+
+    def get_cache_key(self, request, generation_keys):
+        return self.make_cache_key(request, get_generation(generation_keys))
+
+    async def aget_cache_key(self, request, generation_keys):
+        return self.make_cache_key(request, await aget_generation(generation_keys))
+
+    def make_cache_key(self, request, generation):
+        # The absolute URL: pages link to it and sync and async views build different links.
+        url = f'{self.origin(request)}{request.path}?{self.get_cache_query(request)}'
+        query = hashlib.md5(url.encode()).hexdigest()
+        user = request.user.pk if request.user.is_authenticated else 'anonymous'
+        return (f'store:response:{self.basename}:{self.action}:{self.kwargs_key()}:{user}:'
+                f'{generation}:{query}')
+
+    def get_cache_query(self, request):
+        return normalized_query(request)
+
+    def origin(self, request):
+        # Requests built in process (``render_list``) have no host, nor absolute links.
+        if 'HTTP_HOST' not in request.META and 'SERVER_NAME' not in request.META:
+            return ''
+        return f'{request.scheme}://{request.get_host()}'
+
+    def kwargs_key(self):
+        return ','.join(f'{key}={value}' for key, value in sorted(self.kwargs.items()))
+
+    def cached_response(self, generation_keys, handler, request, *args, **kwargs):
+        cache = get_cache()
+        key = self.get_cache_key(request, generation_keys)
+        cached = cache.get(key)
+        if cached is not None:
+            return self.response_from_cache(request, cached)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code != 200 or 'no-store' in response.get('Cache-Control', ''):
+            return response
+
+        def store(rendered):
+            entry = self.cache_entry(rendered)
+            cache.set(key, entry, self.cache_timeout)
+            return self.tag_response(request, rendered, entry[2])
+
+        response.add_post_render_callback(store)
+        return response
+
+    async def acached_response(self, generation_keys, handler, request, *args, **kwargs):
+        """``cached_response`` for async views, which get the response already rendered."""
+        cache = get_cache()
+        key = await self.aget_cache_key(request, generation_keys)
+        cached = await cache.aget(key)
+        if cached is not None:
+            return self.response_from_cache(request, cached)
+
+        response = self.finalize_response(request, await handler(request, *args, **kwargs),
+                                          *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        response.render()
+        entry = self.cache_entry(response)
+        await cache.aset(key, entry, self.cache_timeout)
+        return self.tag_response(request, response, entry[2]) or response
+
+    def response_from_cache(self, request, cached):
+        content, content_type, etag = cached
+        if etag_matches(request, etag):
+            return self.not_modified(etag)
+        response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
+        return response
+
+    @staticmethod
+    def cache_entry(rendered):
+        return rendered.content, rendered['Content-Type'], make_etag(rendered.content)
+
+    def tag_response(self, request, rendered, etag):
+        """Set the ETag of ``rendered``, or return the 304 that replaces it."""
+        if etag_matches(request, etag):
+            return self.not_modified(etag)
+        rendered['ETag'] = etag
+
+    @staticmethod
+    def not_modified(etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
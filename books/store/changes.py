@@ -0,0 +1,74 @@
+"""Incremental sync of the book catalog.
+
+Every write to a book (its fields, its like/bookmark/rating counters and
+summary, a delete) gives it the version of the writing transaction (see
+``CatalogVersion``), deletes leave a ``BookTombstone``. A client keeps the
+token of its last sync and asks for what changed since, which is an index
+range scan on the versions, so polling costs O(changes) instead of
+O(catalog). Changes come in ``(version, book id)`` order and a token is
+``"<version>.<book id>"`` of the last change returned; ``0`` starts over.
+
+Changes at or above ``CatalogVersion.watermark()`` are held back until the
+transactions still running below them end, since one of those may commit a
+smaller version. A response that held changes back is not cached.
+
+A response lists the changed books and the ids of the deleted ones: apply
+``deleted`` before ``changed``, then poll again with ``token`` (at once when
+``has_more`` is set).
+"""
+import heapq
+import re
+
+from django.db.models import Q
+
+from store.models import BookTombstone, CatalogVersion
+
+TOKEN_RE = re.compile(r'^(\d+)\.(\d+)$')
+
+
+def parse_token(token):
+    """Return the ``(version, book id)`` a token stands for, raise ``ValueError`` if invalid."""
+    if token in (None, '', '0'):
+        return 0, 0
+    match = TOKEN_RE.match(token)
+    if match is None:
+        raise ValueError(token)
+    return int(match.group(1)), int(match.group(2))
+
+
+def format_token(position):
+    return '%d.%d' % position if position != (0, 0) else '0'
+
+
+def _after(position, version_field, id_field):
+    version, book_id = position
+    return Q(**{f'{version_field}__gt': version}) | Q(**{version_field: version,
+                                                         f'{id_field}__gt': book_id})
+
+
+def changes_since(books, since, limit):
+    """Return ``(changed, deleted, token, has_more, held)`` for the changes after ``since``.
+
+    ``books`` is a ``values()`` queryset of books with their ``id`` and
+    ``version``, ``since`` a ``(version, book id)`` position. The first
+    ``limit`` settled changes are returned in order: book rows, deleted book
+    ids and the token of the last of them. ``held`` tells whether committed
+    changes were held back by the watermark.
+    """
+    # Before the rows: every version below it is visible to the queries that follow.
+    watermark = CatalogVersion.watermark(books.db)
+    changed = (books.filter(_after(since, 'version', 'pk'))
+               .order_by('version', 'pk')[:limit + 1])
+    deleted = (BookTombstone.objects.using(books.db).filter(_after(since, 'version', 'book_id'))
+               .order_by('version', 'book_id').values_list('version', 'book_id')[:limit + 1])
+    merged = list(heapq.merge(
+        (((row['version'], row['id']), row, None) for row in changed),
+        (((version, book_id), None, book_id) for version, book_id in deleted),
+        key=lambda change: change[0]))[:limit + 1]
+    settled = [change for change in merged if watermark is None or change[0][0] < watermark]
+    held = len(settled) < len(merged)
+    has_more = len(settled) > limit
+    settled = settled[:limit]
+    token = format_token(settled[-1][0] if settled else since)
+    return ([row for _, row, _ in settled if row is not None],
+            [book_id for _, _, book_id in settled if book_id is not None], token, has_more, held)
@@ -0,0 +1,70 @@
+"""Row counts that stay cheap on huge tables.
+
+An exact ``COUNT(*)`` scans every matching row. ``estimated_count`` asks
+PostgreSQL's planner instead (``pg_class.reltuples`` for a whole table, the
+row estimate of ``EXPLAIN`` for a filtered queryset) and only counts exactly
+when the estimate is below ``threshold``, where counting is cheap and the
+relative error of an estimate would be large. Other databases count exactly
+and cache large counts for ``COUNT_CACHE_TIMEOUT`` seconds.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from store.cache import get_cache
+
+ESTIMATE_THRESHOLD = getattr(settings, 'STORE_COUNT_ESTIMATE_THRESHOLD', 10000)
+COUNT_CACHE_TIMEOUT = 60
+COUNT_KEY = 'store:count:{}'
+
+
+def table_estimate(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [table])
+        row = cursor.fetchone()
+    # reltuples is -1 (or 0 before PostgreSQL 14) until the table is first analyzed.
+    return int(row[0]) if row and row[0] > 0 else None
+
+
+def plan_estimate(queryset):
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def estimated_count(queryset, threshold=ESTIMATE_THRESHOLD):
+    """Return ``(count, exact)`` for ``queryset``: an estimate when it is at least ``threshold``."""
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        query = queryset.query
+        if not query.where and not query.distinct and not query.combinator:
+            estimate = table_estimate(connection, queryset.model._meta.db_table)
+        else:
+            estimate = plan_estimate(queryset)
+        if estimate is not None and estimate >= threshold:
+            return estimate, False
+        return queryset.count(), True
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    key = COUNT_KEY.format(hashlib.md5(f'{queryset.db}:{sql}:{params}'.encode()).hexdigest())
+    count = get_cache().get(key)
+    if count is not None and count >= threshold:
+        return count, False
+    count = queryset.count()
+    if count >= threshold:
+        get_cache().set(key, count, COUNT_CACHE_TIMEOUT)
+    return count, True
+
+
+class EstimatedCountPaginator(Paginator):
+    """``Paginator`` whose ``count`` comes from ``estimated_count``, for the admin."""
+    count_threshold = ESTIMATE_THRESHOLD
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        return estimated_count(self.object_list, self.count_threshold)[0]
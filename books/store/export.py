@@ -0,0 +1,82 @@
+import csv
+import json
+
+from django.http import HttpRequest, QueryDict
+from rest_framework.request import Request
+
+from store.serializers import BookSerializer
+
+EXPORT_FIELDS = ('id', 'name', 'price', 'author', 'like_count', 'annotated_likes')
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    """Yield the rows of ``queryset`` as ``BookSerializer`` would render them.
+
+    Rows are read through ``iterator()`` (a server-side cursor on PostgreSQL)
+    as plain tuples, and the like counts come from the counter columns, so
+    memory stays flat and there are no per-row queries.
+    """
+    price = BookSerializer().fields['price']
+    rows = queryset.values_list('id', 'name', 'price', 'author', 'likes_count')
+    for pk, name, amount, author, likes in rows.iterator(chunk_size=chunk_size):
+        yield pk, name, price.to_representation(amount), author, likes, likes
+
+
+def _buffered(lines):
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def render_ndjson(rows):
+    return _buffered(json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + '\n'
+                     for row in rows)
+
+
+def render_csv(rows):
+    writer = csv.writer(_Echo())
+    return _buffered(writer.writerow(row) for row in _with_header(rows))
+
+
+def _with_header(rows):
+    yield EXPORT_FIELDS
+    yield from rows
+
+
+RENDERERS = {
+    'ndjson': render_ndjson,
+    'csv': render_csv,
+}
+
+
+def export_books(queryset, export_format):
+    return RENDERERS[export_format](export_rows(queryset))
+
+
+def filter_books(query_string):
+    """Apply the ``BookViewSet`` filters described by ``query_string`` outside a request."""
+    from store.views import BookViewSet
+
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = QueryDict(query_string)
+    view = BookViewSet(request=Request(http_request), action='export', format_kwarg=None,
+                       args=(), kwargs={})
+    return view.filter_queryset(view.get_queryset())
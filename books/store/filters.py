@@ -0,0 +1,72 @@
+from django.db.models import Count, Q
+from django.db.models.functions import Coalesce
+from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter
+
+from store.models import Book
+
+# Upper bounds of the price facet buckets; the last bucket is open-ended.
+PRICE_BUCKETS = (10, 20, 50, 100)
+
+
+class BookFilter(filters.FilterSet):
+    """Range and prefix filters of the book list.
+
+    Every filter is a single-column comparison on ``store_book`` (or the
+    rating summary), so it can walk an index: ``(price, id)`` for price
+    ranges, ``(author, price, id)`` for an author sorted or bounded by price,
+    the ``varchar_pattern_ops`` author index for prefixes on PostgreSQL and
+    ``(likes_count, id)`` for popular books.
+    """
+    min_price = filters.NumberFilter(field_name='price', lookup_expr='gte')
+    max_price = filters.NumberFilter(field_name='price', lookup_expr='lte')
+    author_prefix = filters.CharFilter(field_name='author', lookup_expr='startswith')
+    min_likes = filters.NumberFilter(field_name='likes_count', lookup_expr='gte')
+    min_rating = filters.NumberFilter(field_name='rating_summary__average', lookup_expr='gte')
+
+    class Meta:
+        model = Book
+        fields = ['price', 'author']
+
+
+def book_facets(queryset, authors=10):
+    """Price bucket and top author counts of ``queryset``.
+
+    The buckets are counted with filtered aggregates in a single query; the
+    authors in one GROUP BY.
+    """
+    bounds = (None,) + PRICE_BUCKETS + (None,)
+    buckets = list(zip(bounds, bounds[1:]))
+    counts = queryset.order_by().aggregate(total=Count('pk'), **{
+        f'bucket_{i}': Count('pk', filter=Q(**{
+            key: value for key, value in (('price__gte', low), ('price__lt', high))
+            if value is not None}))
+        for i, (low, high) in enumerate(buckets)})
+    top_authors = (queryset.order_by().values('author').annotate(count=Count('pk'))
+                   .order_by('-count', 'author')[:authors])
+    return {
+        'count': counts['total'],
+        'price': [{'min': low, 'max': high, 'count': counts[f'bucket_{i}']}
+                  for i, (low, high) in enumerate(buckets)],
+        'authors': list(top_authors),
+    }
+
+
+class BookOrderingFilter(OrderingFilter):
+    """``OrderingFilter`` that can sort by the rating summary.
+
+    The summary column is only annotated when it is sorted on. Books inserted
+    without one (bulk paths before ``ensure_rating_summaries`` ran) are kept
+    by a LEFT JOIN and sort as unrated, with an average of 0, which is what an
+    empty summary holds. A filter on the summary turns it into an inner join
+    that walks the ``average`` indexes.
+    """
+    summary_fields = {'average_rating': 'rating_summary__average'}
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view) or ()
+        names = {name.lstrip('-') for name in ordering} & set(self.summary_fields)
+        if names:
+            queryset = queryset.annotate(**{name: Coalesce(self.summary_fields[name], 0.0)
+                                            for name in names})
+        return super().filter_queryset(request, queryset, view)
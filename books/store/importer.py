@@ -0,0 +1,160 @@
+import csv
+import io
+import json
+import time
+
+from django.db import connections, router, transaction
+from rest_framework.exceptions import ValidationError
+
+from store.cache import invalidate_books
+from store.logic import ensure_rating_summaries
+from store.models import Book, CatalogVersion
+from store.serializers import BookImportSerializer
+
+IMPORT_CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+IMPORT_FIELDS = ('isbn', 'name', 'price', 'author')
+CHUNK_SIZE = 2000
+OTHER_OWNER_ERROR = 'A book with this ISBN belongs to another user.'
+
+
+def read_csv(lines):
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_ndjson(lines):
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            row = error
+        yield line_number, row
+
+
+READERS = {
+    'csv': read_csv,
+    'ndjson': read_ndjson,
+}
+
+
+def write_bulk_create(connection, rows, owner, only_own):
+    # only_own: the rows of other owners were rejected under a lock by import_books.
+    Book.objects.using(connection.alias).bulk_create(
+        [Book(owner=owner, **row) for row in rows],
+        update_conflicts=True, unique_fields=['isbn'],
+        update_fields=['name', 'price', 'author', 'version'])
+
+
+def write_copy(connection, rows, owner, only_own):
+    """Load ``rows`` with COPY into a temporary table and upsert them from there.
+
+    With ``only_own``, books of other owners are left alone even if one was
+    inserted since ``import_books`` checked.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row['isbn'], row['name'], row['price'], row['author'], row['version']])
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE TEMPORARY TABLE store_book_import '
+                       '(isbn varchar(13), name varchar(250), price numeric(7, 2), '
+                       'author varchar(250), version bigint)')
+        cursor.copy_expert('COPY store_book_import (isbn, name, price, author, version) '
+                           'FROM STDIN WITH (FORMAT csv)', buffer)
+        cursor.execute(
+            'INSERT INTO store_book (isbn, name, price, author, owner_id, likes_count, '
+            'bookmarks_count, rating_sum, rating_count, version) '
+            'SELECT isbn, name, price, author, %s, 0, 0, 0, 0, version FROM store_book_import '
+            'ON CONFLICT (isbn) DO UPDATE SET name = EXCLUDED.name, price = EXCLUDED.price, '
+            'author = EXCLUDED.author, version = EXCLUDED.version'
+            + (' WHERE store_book.owner_id IS NOT DISTINCT FROM %s' if only_own else ''),
+            [owner.pk if owner else None] * (2 if only_own else 1))
+        cursor.execute('DROP TABLE store_book_import')
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_books(lines, import_format, owner=None, chunk_size=CHUNK_SIZE, use_copy=None,
+                 max_errors=None, only_own=False):
+    """Validate and upsert books keyed on ISBN from an iterable of text lines.
+
+    Rows are validated with ``BookImportSerializer`` and written one chunk per
+    transaction, with COPY on PostgreSQL and ``bulk_create`` elsewhere. With
+    ``only_own``, a row whose ISBN belongs to a book of another owner is
+    rejected instead of overwriting it. Returns a summary with the per-row
+    errors of rejected rows (the first ``max_errors`` of them when given).
+    """
+    connection = connections[router.db_for_write(Book)]
+    if use_copy is None:
+        use_copy = connection.vendor == 'postgresql'
+    write = write_copy if use_copy else write_bulk_create
+    serializer = BookImportSerializer()
+    summary = {'processed': 0, 'imported': 0, 'rejected': 0, 'errors': []}
+    started = time.monotonic()
+
+    def reject(line_number, errors):
+        summary['rejected'] += 1
+        if max_errors is None or len(summary['errors']) < max_errors:
+            summary['errors'].append({'line': line_number, 'errors': errors})
+
+    for chunk in _chunks(READERS[import_format](lines), chunk_size):
+        valid, line_numbers = {}, {}
+        for line_number, row in chunk:
+            summary['processed'] += 1
+            try:
+                if isinstance(row, ValueError):
+                    raise ValidationError({'non_field_errors': [f'Invalid JSON: {row}']})
+                if not isinstance(row, dict):
+                    raise ValidationError({'non_field_errors': ['Expected a JSON object.']})
+                data = serializer.run_validation({field: row.get(field) for field in IMPORT_FIELDS})
+            except ValidationError as error:
+                reject(line_number, error.detail)
+                continue
+            valid[data['isbn']] = data
+            line_numbers.setdefault(data['isbn'], []).append(line_number)
+        if not valid:
+            continue
+        with transaction.atomic(using=connection.alias):
+            if only_own:
+                taken = (Book.objects.using(connection.alias).select_for_update()
+                         .filter(isbn__in=list(valid))
+                         .exclude(owner_id=owner.pk if owner else None)
+                         .values_list('isbn', flat=True))
+                for isbn in sorted(taken, key=lambda isbn: line_numbers[isbn][0]):
+                    del valid[isbn]
+                    for line_number in line_numbers[isbn]:
+                        reject(line_number, {'isbn': [OTHER_OWNER_ERROR]})
+            if valid:
+                rows = list(valid.values())
+                version = CatalogVersion.allocate(using=connection.alias)
+                for row in rows:
+                    row['version'] = version
+                write(connection, rows, owner, only_own)
+                ensure_rating_summaries(Book.objects.using(connection.alias).filter(
+                    isbn__in=list(valid)))
+        summary['imported'] += len(valid)
+
+    summary['seconds'] = round(time.monotonic() - started, 3)
+    if summary['seconds']:
+        summary['rows_per_second'] = round(summary['processed'] / summary['seconds'])
+    else:
+        summary['rows_per_second'] = None
+    invalidate_books()
+    return summary
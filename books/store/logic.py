@@ -0,0 +1,274 @@
+from django.db import transaction
+from django.db.models import (Case, Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value,
+                              When)
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from store.cache import invalidate_books
+from store.models import (Book, BookEvent, BookRatingSummary, CatalogVersion,
+                          UserBookRelation)
+
+COUNTER_FIELDS = ('likes_count', 'bookmarks_count', 'rating_sum', 'rating_count')
+HISTOGRAM_FIELDS = tuple(f'rate_{rate}' for rate in range(1, 6))
+BATCH_SIZE = 2000
+# Users per query in ``lock_relations``: one OR term each, well within SQLite's expression depth.
+USERS_PER_QUERY = 200
+
+
+def relation_counters(like, in_bookmarks, rate):
+    counters = {
+        'likes_count': int(bool(like)),
+        'bookmarks_count': int(bool(in_bookmarks)),
+        'rating_sum': rate or 0,
+        'rating_count': int(rate is not None),
+    }
+    for field in HISTOGRAM_FIELDS:
+        counters[field] = int(field == f'rate_{rate}')
+    return counters
+
+
+def add_relation_change(deltas, old_state, new_state):
+    """Accumulate the counter shift from ``old_state`` to ``new_state`` into ``deltas``.
+
+    States are ``(book_id, like, in_bookmarks, rate)`` tuples, ``None`` for a
+    relation that does not exist (before create or after delete). ``deltas``
+    maps book ids to ``{counter or histogram field: delta}``.
+    """
+    for state, sign in ((old_state, -1), (new_state, 1)):
+        if state is None:
+            continue
+        book_deltas = deltas.setdefault(state[0],
+                                        dict.fromkeys(COUNTER_FIELDS + HISTOGRAM_FIELDS, 0))
+        for field, value in relation_counters(*state[1:]).items():
+            book_deltas[field] += sign * value
+    return deltas
+
+
+def _delta(deltas, field):
+    """Return the per-book delta of ``field`` as an expression, ``None`` if all are 0."""
+    whens = [When(pk=book_id, then=Value(fields[field]))
+             for book_id, fields in deltas.items() if fields[field]]
+    if len(deltas) == 1 and whens:
+        return whens[0].result
+    if whens:
+        return Case(*whens, default=Value(0))
+    return None
+
+
+def _average(total, count):
+    return Coalesce(Cast(total, FloatField()) / NullIf(count, Value(0)), Value(0.0))
+
+
+def _book_average():
+    """The average rating of the summary's book, from its counters."""
+    return Subquery(Book.objects.filter(pk=OuterRef('pk')).values(
+        average=_average(F('rating_sum'), F('rating_count'))))
+
+
+def bump_versions(books):
+    """Give every book of the queryset ``books`` a new version in one UPDATE."""
+    with transaction.atomic(using=books.db):
+        return books.update(version=CatalogVersion.expression(books.db))
+
+
+def change_books_counters(deltas):
+    """Apply ``{book_id: {field: delta}}`` to the book counters in one UPDATE.
+
+    The books get a new version, rating histogram deltas are applied to
+    ``BookRatingSummary`` in another UPDATE. Call it inside a transaction.
+    """
+    deltas = {book_id: fields for book_id, fields in deltas.items() if any(fields.values())}
+    if not deltas:
+        return
+    changes = {'version': CatalogVersion.expression()}
+    for field in COUNTER_FIELDS:
+        delta = _delta(deltas, field)
+        if delta is not None:
+            changes[field] = F(field) + delta
+    Book.objects.filter(pk__in=deltas).update(**changes)
+    change_rating_summaries(deltas)
+    record_events(deltas)
+    invalidate_books(deltas)
+
+
+def record_events(deltas):
+    """Append the like/bookmark/rate events behind ``deltas`` for the trending scores.
+
+    Likes and bookmarks are signed (taking one back cancels it), every new
+    rating counts as one rate event.
+    """
+    events = []
+    for book_id, fields in deltas.items():
+        for kind, weight in ((BookEvent.LIKE, fields['likes_count']),
+                             (BookEvent.BOOKMARK, fields['bookmarks_count']),
+                             (BookEvent.RATE, sum(max(fields[field], 0)
+                                                  for field in HISTOGRAM_FIELDS))):
+            if weight:
+                events.append(BookEvent(book_id=book_id, kind=kind, weight=weight))
+    if events:
+        BookEvent.objects.bulk_create(events)
+
+
+def change_rating_summaries(deltas):
+    """Apply the rating part of ``deltas`` to the books' rating summaries in one UPDATE.
+
+    The averages are taken from the book counters, so move those first.
+    """
+    deltas = {book_id: fields for book_id, fields in deltas.items()
+              if any(fields[field] for field in HISTOGRAM_FIELDS)}
+    if not deltas:
+        return
+    changes = {}
+    for field in HISTOGRAM_FIELDS:
+        delta = _delta(deltas, field)
+        if delta is not None:
+            changes[field] = F(field) + delta
+    BookRatingSummary.objects.filter(pk__in=deltas).update(average=_book_average(), **changes)
+
+
+def apply_relation_change(old_state, new_state):
+    change_books_counters(add_relation_change({}, old_state, new_state))
+
+
+def upsert_relations(user, changes):
+    """Create or update the relations of ``user`` in a fixed number of queries.
+
+    ``changes`` maps book ids to the relation fields to set; fields that are
+    not given keep their current value. Returns the resulting relations by
+    book id and the set of book ids whose relation was created.
+    """
+    relations, created = upsert_user_relations(
+        {(user.pk, book_id): fields for book_id, fields in changes.items()})
+    return ({book_id: relations[user.pk, book_id] for book_id in changes},
+            {book_id for user_id, book_id in created})
+
+
+def lock_relations(pairs):
+    """Lock and return the existing relations of exactly the ``(user_id, book_id)`` ``pairs``.
+
+    One query per ``USERS_PER_QUERY`` users, each an OR of the users' books.
+    """
+    books_by_user = {}
+    for user_id, book_id in sorted(pairs):
+        books_by_user.setdefault(user_id, []).append(book_id)
+    users = list(books_by_user)
+    relations = {}
+    for start in range(0, len(users), USERS_PER_QUERY):
+        condition = Q()
+        for user_id in users[start:start + USERS_PER_QUERY]:
+            condition |= Q(user_id=user_id, book_id__in=books_by_user[user_id])
+        for relation in (UserBookRelation.objects.select_for_update().filter(condition)
+                         .order_by('user_id', 'book_id')):
+            relations[relation.user_id, relation.book_id] = relation
+    return relations
+
+
+def upsert_user_relations(changes):
+    """``upsert_relations`` for any users: ``changes`` is keyed by ``(user_id, book_id)``.
+
+    The book counters of all the changes move in one UPDATE.
+    """
+    with transaction.atomic():
+        existing = lock_relations(changes)
+        created = set(changes) - set(existing)
+        if created:
+            # A concurrent request may be creating the same relations: insert blank ones,
+            # which count for nothing, waiting for it, then lock them as it left them.
+            UserBookRelation.objects.bulk_create(
+                [UserBookRelation(user_id=user_id, book_id=book_id)
+                 for user_id, book_id in sorted(created)], ignore_conflicts=True)
+            existing.update(lock_relations(created))
+        relations, deltas = {}, {}
+        for (user_id, book_id), fields in changes.items():
+            relation = UserBookRelation(user_id=user_id, book_id=book_id)
+            old_state = existing[user_id, book_id].counted_state()
+            relation.like, relation.in_bookmarks, relation.rate = old_state[1:]
+            for field, value in fields.items():
+                setattr(relation, field, value)
+            add_relation_change(deltas, old_state, relation.counted_state())
+            relations[user_id, book_id] = relation
+        UserBookRelation.objects.bulk_create(
+            relations.values(), update_conflicts=True, unique_fields=['user', 'book'],
+            update_fields=['like', 'in_bookmarks', 'rate'])
+        change_books_counters(deltas)
+    return relations, created
+
+
+def find_counter_mismatches(book_ids=None):
+    """Yield ``(book, stored, actual)`` for every book whose counters drifted."""
+    queryset = Book.objects.annotate(
+        actual_likes_count=Count('userbookrelation', filter=Q(userbookrelation__like=True)),
+        actual_bookmarks_count=Count('userbookrelation',
+                                     filter=Q(userbookrelation__in_bookmarks=True)),
+        actual_rating_sum=Coalesce(Sum('userbookrelation__rate'), 0),
+        actual_rating_count=Count('userbookrelation__rate'),
+    )
+    if book_ids is not None:
+        queryset = queryset.filter(pk__in=book_ids)
+    for book in queryset.order_by('pk').iterator(chunk_size=2000):
+        stored = {field: getattr(book, field) for field in COUNTER_FIELDS}
+        actual = {field: getattr(book, f'actual_{field}') for field in COUNTER_FIELDS}
+        if stored != actual:
+            yield book, stored, actual
+
+
+def _relation_aggregate(aggregate, **filters):
+    relations = UserBookRelation.objects.filter(book=OuterRef('pk'), **filters)
+    return Coalesce(Subquery(relations.order_by().values('book').annotate(
+        value=aggregate).values('value')), 0)
+
+
+def ensure_rating_summaries(books=None):
+    """Create the missing rating summaries of ``books`` (a queryset, default: all).
+
+    Paths that insert books without ``save()`` (bulk imports) call this.
+    """
+    books = Book.objects.all() if books is None else books
+    missing = books.filter(rating_summary__isnull=True).order_by('pk').values_list('pk', flat=True)
+    created, last = 0, 0
+    while True:
+        book_ids = list(missing.filter(pk__gt=last)[:BATCH_SIZE])
+        if not book_ids:
+            return created
+        BookRatingSummary.objects.bulk_create(
+            [BookRatingSummary(book_id=book_id) for book_id in book_ids], ignore_conflicts=True)
+        created += len(book_ids)
+        last = book_ids[-1]
+
+
+def rebuild_rating_summaries(book_ids=None):
+    """Recompute the rating summaries from ``UserBookRelation`` and bump the book versions.
+
+    The averages come from the book counters: ``rebuild_counters`` fixes those.
+    """
+    books = Book.objects.all() if book_ids is None else Book.objects.filter(pk__in=book_ids)
+    ensure_rating_summaries(books)
+    queryset = BookRatingSummary.objects.all()
+    if book_ids is not None:
+        queryset = queryset.filter(pk__in=book_ids)
+    updated = queryset.update(
+        average=_book_average(),
+        **{field: _relation_aggregate(Count('pk'), rate=rate)
+           for rate, field in enumerate(HISTOGRAM_FIELDS, start=1)})
+    bump_versions(books)
+    invalidate_books(book_ids)
+    return updated
+
+
+def rebuild_counters(book_ids=None):
+    """Recompute the counters from ``UserBookRelation`` in a single UPDATE.
+
+    The books get a new version afterwards, so sync clients fetch them again.
+    """
+    queryset = Book.objects.all()
+    if book_ids is not None:
+        queryset = queryset.filter(pk__in=book_ids)
+    updated = queryset.update(
+        likes_count=_relation_aggregate(Count('pk'), like=True),
+        bookmarks_count=_relation_aggregate(Count('pk'), in_bookmarks=True),
+        rating_sum=_relation_aggregate(Sum('rate'), rate__isnull=False),
+        rating_count=_relation_aggregate(Count('pk'), rate__isnull=False),
+    )
+    BookRatingSummary.objects.filter(book__in=queryset).update(average=_book_average())
+    bump_versions(queryset)
+    invalidate_books(book_ids)
+    return updated
@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.concurrency import concurrency_throughput
+
+
+class Command(BaseCommand):
+    help = 'Compare the throughput of the sync views under WSGI and the async views under ASGI.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('endpoint', nargs='?', default='list', choices=['list', 'retrieve'])
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--clients', type=int, default=50, help='Concurrent clients.')
+        parser.add_argument('--threads', type=int, default=4, help='WSGI worker threads.')
+        parser.add_argument('--client-delay', type=float, default=0.02,
+                            help='Seconds each client takes to read a response.')
+        parser.add_argument('--warm', action='store_true',
+                            help='Let requests hit the response cache.')
+        parser.add_argument('-o', '--output', help='Write the results to this JSON file.')
+
+    def handle(self, *args, **options):
+        try:
+            results = concurrency_throughput(
+                options['endpoint'], requests=options['requests'], clients=options['clients'],
+                threads=options['threads'], client_delay=options['client_delay'],
+                cold=not options['warm'])
+        except ValueError as error:
+            raise CommandError(error)
+        for name in ('wsgi', 'asgi'):
+            result = results[name]
+            latency = result['latency_ms']
+            self.stdout.write(f'{name}  {result["throughput_rps"]:>9} req/s  '
+                              f'p50 {latency["p50"]}ms  p95 {latency["p95"]}ms  '
+                              f'status {result["status_codes"]}')
+        self.stdout.write(f'identical output: {results["identical"]}')
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
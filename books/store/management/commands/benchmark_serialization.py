@@ -0,0 +1,23 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from benchmarks.serialization import serialization_throughput
+
+
+class Command(BaseCommand):
+    help = 'Compare the rows per second of the serializer and the fast book read paths.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=1000, help='Books rendered per run.')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('-o', '--output', help='Write the results to this JSON file.')
+
+    def handle(self, *args, **options):
+        results = serialization_throughput(options['limit'], options['repeat'])
+        for name in ('serializer', 'rows'):
+            self.stdout.write(f'{name:10} {results[name]["rows_per_second"]:>9} rows/s')
+        self.stdout.write(f'identical output: {results["identical"]}, orjson: {results["orjson"]}')
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
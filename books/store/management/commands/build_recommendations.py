@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from store.recommendations import CHUNK_SIZE, MEMORY_MB, TOP_K, build_similarities, changed_books
+
+
+class Command(BaseCommand):
+    help = 'Compute the item-item similar books table from likes and ratings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('book_ids', nargs='*', type=int,
+                            help='Only refresh these books (default: all).')
+        parser.add_argument('--since-hours', type=float,
+                            help='Only refresh books liked, bookmarked or rated this recently.')
+        parser.add_argument('--top-k', type=int, default=TOP_K,
+                            help='Similar books kept per book.')
+        parser.add_argument('--memory-mb', type=int, default=MEMORY_MB,
+                            help='Size of one block of dense similarities.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Relations fetched per round trip.')
+
+    def handle(self, *args, **options):
+        book_ids = set(options['book_ids']) or None
+        if options['since_hours'] is not None:
+            since = timezone.now() - timedelta(hours=options['since_hours'])
+            book_ids = (book_ids or set()) | changed_books(since)
+            if not book_ids:
+                self.stdout.write(self.style.SUCCESS('No books changed.'))
+                return
+        refreshed = build_similarities(book_ids, top_k=options['top_k'],
+                                       memory_mb=options['memory_mb'],
+                                       chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed similar books of {refreshed} books.'))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.snapshots import build_snapshots, snapshot_dir
+
+
+class Command(BaseCommand):
+    help = 'Render the anonymous book lists to pre-compressed snapshot files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float,
+                            help='Keep running and rebuild stale snapshots every this many '
+                                 'seconds.')
+
+    def handle(self, *args, **options):
+        if snapshot_dir() is None:
+            raise CommandError('STORE_SNAPSHOT_DIR is not set.')
+        while True:
+            built = build_snapshots()
+            self.stdout.write(self.style.SUCCESS(
+                f'Built {", ".join(built)}.' if built else 'Snapshots are up to date.'))
+            if not options['every']:
+                return
+            time.sleep(options['every'])
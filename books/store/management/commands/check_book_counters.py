@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store.logic import find_counter_mismatches, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Compare Book counters against UserBookRelation and report drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('book_ids', nargs='*', type=int,
+                            help='Only check these books (default: all).')
+        parser.add_argument('--fix', action='store_true',
+                            help='Rebuild the counters of inconsistent books.')
+
+    def handle(self, *args, **options):
+        mismatched = []
+        for book, stored, actual in find_counter_mismatches(options['book_ids'] or None):
+            mismatched.append(book.pk)
+            self.stdout.write(f'Book {book.pk}: stored {stored}, actual {actual}')
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS('All book counters are consistent.'))
+            return
+        if options['fix']:
+            rebuild_counters(mismatched)
+            self.stdout.write(self.style.SUCCESS(f'Fixed counters for {len(mismatched)} books.'))
+            return
+        raise CommandError(f'{len(mismatched)} books have inconsistent counters.')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from store.export import EXPORT_CONTENT_TYPES, export_books, filter_books
+
+
+class Command(BaseCommand):
+    help = 'Stream the book catalog as NDJSON or CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', dest='export_format', default='ndjson',
+                            choices=list(EXPORT_CONTENT_TYPES))
+        parser.add_argument('--query', default='',
+                            help='BookViewSet filters as a query string, '
+                                 'e.g. "price=50&ordering=author".')
+        parser.add_argument('-o', '--output', help='Output file (default: stdout).')
+
+    def handle(self, *args, **options):
+        chunks = export_books(filter_books(options['query']), options['export_format'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
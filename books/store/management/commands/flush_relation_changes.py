@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.writebehind import BATCH_SIZE, buffer_gauges, flush_relation_changes
+
+
+class Command(BaseCommand):
+    help = 'Apply the relation changes buffered by the write-behind mode.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Pending changes applied per transaction.')
+        parser.add_argument('--every', type=float,
+                            help='Keep running and flush every this many seconds.')
+
+    def handle(self, *args, **options):
+        while True:
+            flushed = 0
+            while True:
+                count = flush_relation_changes(options['batch_size'])
+                flushed += count
+                if count < options['batch_size']:
+                    break
+            gauges = buffer_gauges()
+            self.stdout.write(self.style.SUCCESS(
+                f'{flushed} changes applied, {gauges["relation_buffer_depth"][1]} pending, '
+                f'lag {gauges["relation_buffer_lag_seconds"][1]:.1f}s'))
+            if not options['every']:
+                return
+            time.sleep(options['every'])
@@ -0,0 +1,49 @@
+import json
+import os
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from store.importer import CHUNK_SIZE, import_books
+
+EXTENSIONS = {
+    '.csv': 'csv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+}
+
+
+class Command(BaseCommand):
+    help = 'Upsert books keyed on ISBN from a CSV or NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', dest='import_format', choices=['csv', 'ndjson'],
+                            help='Input format (default: guessed from the file extension).')
+        parser.add_argument('--owner', help='Username to set as owner of new books.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--no-copy', action='store_true',
+                            help='Use bulk_create even on PostgreSQL.')
+
+    def handle(self, *args, **options):
+        import_format = options['import_format'] or EXTENSIONS.get(
+            os.path.splitext(options['path'])[1].lower())
+        if import_format is None:
+            raise CommandError('Cannot guess the input format, pass --format.')
+        owner = None
+        if options['owner']:
+            try:
+                owner = User.objects.get(username=options['owner'])
+            except User.DoesNotExist:
+                raise CommandError(f'User "{options["owner"]}" does not exist.')
+
+        with open(options['path'], encoding='utf-8', newline='') as lines:
+            summary = import_books(lines, import_format, owner=owner,
+                                   chunk_size=options['chunk_size'],
+                                   use_copy=False if options['no_copy'] else None)
+        for error in summary['errors']:
+            self.stderr.write(f'Line {error["line"]}: {json.dumps(error["errors"])}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {summary["processed"]} rows: {summary["imported"]} imported, '
+            f'{summary["rejected"]} rejected in {summary["seconds"]}s '
+            f'({summary["rows_per_second"]} rows/s).'))
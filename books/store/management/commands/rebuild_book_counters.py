@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from store.logic import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute like/bookmark/rating counters on Book from UserBookRelation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('book_ids', nargs='*', type=int,
+                            help='Only rebuild these books (default: all).')
+
+    def handle(self, *args, **options):
+        updated = rebuild_counters(options['book_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt counters for {updated} books.'))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.trending import LEADERBOARD_SIZE, WINDOWS, refresh_trending
+
+
+class Command(BaseCommand):
+    help = 'Recompute the time-decayed trending leaderboards from the book events.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window', action='append', choices=list(WINDOWS),
+                            help='Only refresh this window (repeatable, default: all).')
+        parser.add_argument('--size', type=int, default=LEADERBOARD_SIZE,
+                            help='Books kept per leaderboard.')
+        parser.add_argument('--no-prune', action='store_true',
+                            help='Keep events older than the longest window.')
+        parser.add_argument('--every', type=float,
+                            help='Keep running and refresh every this many seconds.')
+
+    def handle(self, *args, **options):
+        while True:
+            ranked = refresh_trending(options['window'], size=options['size'],
+                                      prune=not options['no_prune'])
+            self.stdout.write(self.style.SUCCESS(', '.join(
+                f'{window}: {count} books' for window, count in ranked.items())))
+            if not options['every']:
+                return
+            time.sleep(options['every'])
@@ -0,0 +1,54 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.runner import SCENARIOS, compare, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Run the API benchmark scenarios and write the results as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*',
+                            help=f'Scenarios to run (default: all of {", ".join(SCENARIOS)}).')
+        parser.add_argument('--driver', choices=['client', 'http'], default='client')
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='Server to benchmark with --driver http.')
+        parser.add_argument('--iterations', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--cold', action='store_true',
+                            help='Make every GET miss the response cache.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('-o', '--output', help='Write the results to this JSON file.')
+        parser.add_argument('--compare', help='Baseline results to check for regressions.')
+        parser.add_argument('--threshold', type=float, default=0.1)
+
+    def handle(self, *args, **options):
+        unknown = set(options['scenarios']) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown))}.')
+        try:
+            results = run_benchmarks(
+                options['scenarios'], driver=options['driver'], url=options['url'],
+                iterations=options['iterations'], warmup=options['warmup'],
+                cold=options['cold'], seed=options['seed'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        for name, result in results['scenarios'].items():
+            latency = result['latency_ms']
+            self.stdout.write(
+                f'{name:15} {result["throughput_rps"]:>9} req/s  p50 {latency["p50"]}ms  '
+                f'p95 {latency["p95"]}ms  p99 {latency["p99"]}ms  '
+                f'queries {result["queries"]["max"]}  peak {result["peak_memory_kb"]}KB')
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                regressions = compare(json.load(baseline), results, options['threshold'])
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(f'{len(regressions)} regressions against {options["compare"]}.')
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from benchmarks.dataset import clear_dataset, generate_dataset
+
+
+class Command(BaseCommand):
+    help = 'Insert a reproducible benchmark dataset of users, books and relations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--books', type=int, default=10000)
+        parser.add_argument('--relations-per-user', type=int, default=20)
+        parser.add_argument('--like-ratio', type=float, default=0.5)
+        parser.add_argument('--bookmark-ratio', type=float, default=0.2)
+        parser.add_argument('--rating-ratio', type=float, default=0.3)
+        parser.add_argument('--popularity-skew', type=float, default=1.1,
+                            help='Zipf exponent of book popularity (0 is uniform).')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete the previously generated benchmark data first.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            clear_dataset()
+        created = generate_dataset(
+            users=options['users'], books=options['books'],
+            relations_per_user=options['relations_per_user'],
+            like_ratio=options['like_ratio'], bookmark_ratio=options['bookmark_ratio'],
+            rating_ratio=options['rating_ratio'], popularity_skew=options['popularity_skew'],
+            seed=options['seed'])
+        self.stdout.write(self.style.SUCCESS(
+            'Created {users} users, {books} books and {relations} relations.'.format(**created)))
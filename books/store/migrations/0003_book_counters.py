@@ -0,0 +1,57 @@
+# Generated by Django 4.1.13 on 2026-10-18 14:29
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Book = apps.get_model('store', 'Book')
+    UserBookRelation = apps.get_model('store', 'UserBookRelation')
+
+    def aggregate(expression, **filters):
+        relations = UserBookRelation.objects.filter(book=OuterRef('pk'), **filters)
+        return Coalesce(Subquery(relations.order_by().values('book').annotate(
+            value=expression).values('value')), 0)
+
+    Book.objects.update(
+        likes_count=aggregate(Count('pk'), like=True),
+        bookmarks_count=aggregate(Count('pk'), in_bookmarks=True),
+        rating_sum=aggregate(Sum('rate'), rate__isnull=False),
+        rating_count=aggregate(Count('pk'), rate__isnull=False),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_alter_userbookrelation_rate'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='book',
+            options={'ordering': ['id']},
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='bookmarks_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
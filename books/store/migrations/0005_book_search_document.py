@@ -0,0 +1,63 @@
+from django.db import migrations
+
+DOCUMENT_SQL = (
+    "setweight(to_tsvector('simple', coalesce({row}.name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce({row}.author, '')), 'B')"
+)
+
+POSTGRES_SQL = (
+    'ALTER TABLE store_book ADD COLUMN search_document tsvector',
+    'UPDATE store_book SET search_document = ' + DOCUMENT_SQL.format(row='store_book'),
+    'CREATE INDEX store_book_search_document_idx ON store_book USING GIN (search_document)',
+    'CREATE FUNCTION store_book_search_document_update() RETURNS trigger AS $$ '
+    'BEGIN NEW.search_document := ' + DOCUMENT_SQL.format(row='NEW') + '; RETURN NEW; END '
+    '$$ LANGUAGE plpgsql',
+    'CREATE TRIGGER store_book_search_document_trigger '
+    'BEFORE INSERT OR UPDATE OF name, author ON store_book '
+    'FOR EACH ROW EXECUTE FUNCTION store_book_search_document_update()',
+)
+
+POSTGRES_TRIGRAM_SQL = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX store_book_name_trgm_idx ON store_book USING GIN (UPPER(name) gin_trgm_ops)',
+    'CREATE INDEX store_book_author_trgm_idx ON store_book USING GIN (UPPER(author) gin_trgm_ops)',
+)
+
+POSTGRES_REVERSE_SQL = (
+    'DROP TRIGGER IF EXISTS store_book_search_document_trigger ON store_book',
+    'DROP FUNCTION IF EXISTS store_book_search_document_update()',
+    'DROP INDEX IF EXISTS store_book_name_trgm_idx',
+    'DROP INDEX IF EXISTS store_book_author_trgm_idx',
+    'ALTER TABLE store_book DROP COLUMN IF EXISTS search_document',
+)
+
+
+def create_search_document(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in POSTGRES_SQL:
+        schema_editor.execute(statement)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        has_trigram = cursor.fetchone() is not None
+    if has_trigram:
+        for statement in POSTGRES_TRIGRAM_SQL:
+            schema_editor.execute(statement)
+
+
+def drop_search_document(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in POSTGRES_REVERSE_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_book_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_document, drop_search_document),
+    ]
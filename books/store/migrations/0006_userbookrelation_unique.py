@@ -0,0 +1,46 @@
+# Generated by Django 4.1.13 on 2026-10-18 14:36
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_relations(apps, schema_editor):
+    Book = apps.get_model('store', 'Book')
+    UserBookRelation = apps.get_model('store', 'UserBookRelation')
+    duplicates = UserBookRelation.objects.values('user', 'book').annotate(
+        relations=Count('id'), keep=Max('id')).filter(relations__gt=1)
+    book_ids = set()
+    for duplicate in duplicates:
+        UserBookRelation.objects.filter(user=duplicate['user'], book=duplicate['book']).exclude(
+            id=duplicate['keep']).delete()
+        book_ids.add(duplicate['book'])
+    if not book_ids:
+        return
+
+    def aggregate(expression, **filters):
+        relations = UserBookRelation.objects.filter(book=OuterRef('pk'), **filters)
+        return Coalesce(Subquery(relations.order_by().values('book').annotate(
+            value=expression).values('value')), 0)
+
+    Book.objects.filter(pk__in=book_ids).update(
+        likes_count=aggregate(Count('pk'), like=True),
+        bookmarks_count=aggregate(Count('pk'), in_bookmarks=True),
+        rating_sum=aggregate(Sum('rate'), rate__isnull=False),
+        rating_count=aggregate(Count('pk'), rate__isnull=False),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_book_search_document'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_relations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='userbookrelation',
+            constraint=models.UniqueConstraint(fields=('user', 'book'), name='unique_user_book_relation'),
+        ),
+    ]
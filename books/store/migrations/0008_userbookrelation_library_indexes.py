@@ -0,0 +1,21 @@
+# Generated by Django 4.1.13 on 2026-10-18 14:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_book_isbn'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userbookrelation',
+            index=models.Index(fields=['user', 'in_bookmarks', 'id'], name='store_userb_user_id_1b000c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userbookrelation',
+            index=models.Index(fields=['user', 'like', 'id'], name='store_userb_user_id_c4f927_idx'),
+        ),
+    ]
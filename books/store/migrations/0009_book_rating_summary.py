@@ -0,0 +1,67 @@
+# Generated by Django 4.1.13 on 2026-10-18 14:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+
+def fill_rating_summaries(apps, schema_editor):
+    Book = apps.get_model('store', 'Book')
+    BookRatingSummary = apps.get_model('store', 'BookRatingSummary')
+    UserBookRelation = apps.get_model('store', 'UserBookRelation')
+
+    book_ids = Book.objects.order_by('pk').values_list('pk', flat=True)
+    last = 0
+    while True:
+        batch = list(book_ids.filter(pk__gt=last)[:2000])
+        if not batch:
+            break
+        BookRatingSummary.objects.bulk_create(
+            [BookRatingSummary(book_id=book_id) for book_id in batch])
+        last = batch[-1]
+
+    def aggregate(expression, **filters):
+        relations = UserBookRelation.objects.filter(book=OuterRef('pk'), **filters)
+        return Coalesce(Subquery(relations.order_by().values('book').annotate(
+            value=expression).values('value')), 0)
+
+    BookRatingSummary.objects.update(
+        count=aggregate(Count('pk'), rate__isnull=False),
+        total=aggregate(Sum('rate'), rate__isnull=False),
+        **{f'rate_{rate}': aggregate(Count('pk'), rate=rate) for rate in range(1, 6)})
+    BookRatingSummary.objects.update(average=Coalesce(
+        Cast(F('total'), FloatField()) / NullIf(F('count'), Value(0)), Value(0.0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_userbookrelation_library_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookRatingSummary',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_summary', serialize=False, to='store.book')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('average', models.FloatField(default=0)),
+                ('rate_1', models.PositiveIntegerField(default=0)),
+                ('rate_2', models.PositiveIntegerField(default=0)),
+                ('rate_3', models.PositiveIntegerField(default=0)),
+                ('rate_4', models.PositiveIntegerField(default=0)),
+                ('rate_5', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='bookratingsummary',
+            index=models.Index(fields=['average', 'book'], name='store_bookr_average_6f8c68_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookratingsummary',
+            index=models.Index(models.OrderBy(models.F('average'), descending=True), models.F('book'), name='store_rating_average_desc'),
+        ),
+        migrations.RunPython(fill_rating_summaries, migrations.RunPython.noop),
+    ]
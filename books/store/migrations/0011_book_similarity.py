@@ -0,0 +1,27 @@
+# Generated by Django 4.1.13 on 2026-10-18 14:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0010_book_events_trending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='store.book')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_of', to='store.book')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='booksimilarity',
+            index=models.Index(fields=['book', '-score', 'similar'], name='store_books_book_id_3542b3_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.1.13 on 2026-10-18 15:05
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def fill_versions(apps, schema_editor):
+    Book = apps.get_model('store', 'Book')
+    CatalogVersion = apps.get_model('store', 'CatalogVersion')
+    Book.objects.update(version=F('id'))
+    last = Book.objects.aggregate(last=Max('id'))['last'] or 0
+    CatalogVersion.objects.create(pk=1, value=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0011_book_similarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookTombstone',
+            fields=[
+                ('book_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='version',
+            field=models.PositiveBigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(fill_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.13 on 2026-10-18 15:24
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0012_book_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingRelationChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.IntegerField()),
+                ('book_id', models.IntegerField()),
+                ('changes', models.JSONField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='pendingrelationchange',
+            index=models.Index(fields=['user_id', 'id'], name='store_pendi_user_id_5dd7cc_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.1.13 on 2026-10-18 15:45
+
+from django.db import migrations, models
+
+
+def reset_versions(apps, schema_editor):
+    # Counter versions are not comparable with transaction ids, and tokens
+    # change format: every client syncs from 0 again.
+    apps.get_model('store', 'Book').objects.update(version=0)
+    apps.get_model('store', 'BookTombstone').objects.update(version=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0014_book_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='booktombstone',
+            name='version',
+            field=models.PositiveBigIntegerField(),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['version', 'id'], name='store_book_version_a5cb78_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booktombstone',
+            index=models.Index(fields=['version', 'book_id'], name='store_bookt_version_7dfe50_idx'),
+        ),
+        migrations.RunPython(reset_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_transaction_versions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booktombstone',
+            name='book_id',
+            field=models.BigIntegerField(primary_key=True, serialize=False),
+        ),
+    ]
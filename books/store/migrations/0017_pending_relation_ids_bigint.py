@@ -0,0 +1,23 @@
+# Generated by Django 4.1.13 on 2026-10-18 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0016_tombstone_book_id_bigint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pendingrelationchange',
+            name='book_id',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='pendingrelationchange',
+            name='user_id',
+            field=models.BigIntegerField(),
+        ),
+    ]
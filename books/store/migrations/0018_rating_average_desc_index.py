@@ -0,0 +1,22 @@
+# Generated by Django 4.1.13 on 2026-10-18 15:55
+
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0017_pending_relation_ids_bigint'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='bookratingsummary',
+            name='store_rating_average_desc',
+        ),
+        migrations.AddIndex(
+            model_name='bookratingsummary',
+            index=models.Index(models.OrderBy(django.db.models.functions.comparison.Coalesce('average', 0.0), descending=True), models.F('book'), name='store_rating_average_desc'),
+        ),
+    ]
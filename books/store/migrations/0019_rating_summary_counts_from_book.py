@@ -0,0 +1,21 @@
+# Generated by Django 4.1.13 on 2026-10-18 15:56
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0018_rating_average_desc_index'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='bookratingsummary',
+            name='count',
+        ),
+        migrations.RemoveField(
+            model_name='bookratingsummary',
+            name='total',
+        ),
+    ]
@@ -1,19 +1,161 @@
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 
 class Book(models.Model):
     name = models.CharField(max_length=250)
     price = models.DecimalField(max_digits=7, decimal_places=2)
     author = models.CharField(max_length=250)
+    isbn = models.CharField(max_length=13, unique=True, null=True, blank=True)
     owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
                               related_name='my_books')
     readers = models.ManyToManyField(User, through='UserBookRelation',
                                      related_name='books')
+    likes_count = models.PositiveIntegerField(default=0)
+    bookmarks_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    version = models.PositiveBigIntegerField(default=0, editable=False)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['price', 'id']),
+            models.Index(fields=['author', 'id']),
+            models.Index(fields=['author', 'price', 'id']),
+            # LIKE 'prefix%' only uses a btree in the "C" collation or with pattern ops.
+            models.Index(fields=['author'], opclasses=['varchar_pattern_ops'],
+                         name='store_book_author_prefix'),
+            models.Index(fields=['likes_count', 'id']),
+            models.Index(fields=['version', 'id']),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(Book, instance=self)
+        with transaction.atomic(using=using):
+            self.version = CatalogVersion.allocate(using=using)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+            super().save(*args, **kwargs)
+
+    @property
+    def rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+
+class CatalogVersion(models.Model):
+    """Where ``Book.version`` and ``BookTombstone.version`` come from.
+
+    Every row a transaction writes gets the same version, and the change feed
+    only serves versions below ``watermark()``, all of whose writers have
+    finished, so it never skips a change committed late.
+
+    On PostgreSQL the version is the id of the writing transaction
+    (``txid_current()``), which takes no lock, and the watermark is the
+    oldest transaction still running. A long transaction holds the feed back
+    until it ends. Elsewhere this single-row counter hands versions out and
+    its row lock orders the writers. SQLite serializes them anyway, so the
+    lock costs nothing there. There is no watermark.
+    """
+    value = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def allocate(cls, using=None):
+        """Return the version of the current transaction's writes.
+
+        Call it inside the transaction that writes the version, before
+        touching the books: where the counter row is locked, every writer then
+        takes the locks in the same order.
+        """
+        using = using or router.db_for_write(cls)
+        connection = connections[using]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT txid_current()')
+                return cursor.fetchone()[0]
+        if connection.vendor != 'sqlite':
+            cls.objects.using(using).get_or_create(pk=1)
+            cls.objects.using(using).filter(pk=1).update(value=models.F('value') + 1)
+            return cls.objects.using(using).values_list('value', flat=True).get(pk=1)
+        with connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {cls._meta.db_table} SET value = value + 1 WHERE id = 1 '
+                           f'RETURNING value')
+            row = cursor.fetchone()
+        if row is None:
+            # The migration creates the row, a flushed database has lost it.
+            cls.objects.using(using).get_or_create(pk=1)
+            return cls.allocate(using)
+        return row[0]
+
+    @classmethod
+    def expression(cls, using=None):
+        """``allocate()`` as an expression for an UPDATE, which saves a query on PostgreSQL."""
+        using = using or router.db_for_write(cls)
+        if connections[using].vendor == 'postgresql':
+            return RawSQL('txid_current()', [], output_field=models.PositiveBigIntegerField())
+        return models.Value(cls.allocate(using))
+
+    @classmethod
+    def watermark(cls, using):
+        """Versions below this are settled: no writer of one is still running. ``None``: all."""
+        connection = connections[using]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT txid_snapshot_xmin(txid_current_snapshot())')
+            return cursor.fetchone()[0]
+
+
+class BookTombstone(models.Model):
+    """Marks a deleted book for the change feed."""
+    book_id = models.BigIntegerField(primary_key=True)
+    version = models.PositiveBigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['version', 'book_id']),
+        ]
+
+    def __str__(self):
+        return f'Book {self.book_id} deleted at version {self.version}'
+
+
+class BookRatingSummary(models.Model):
+    """The rating histogram of a book and its average, stored to be sorted on.
+
+    The number and sum of the ratings are ``Book.rating_count`` and
+    ``Book.rating_sum``, the average is derived from them.
+    """
+    book = models.OneToOneField(Book, on_delete=models.CASCADE, primary_key=True,
+                                related_name='rating_summary')
+    average = models.FloatField(default=0)
+    rate_1 = models.PositiveIntegerField(default=0)
+    rate_2 = models.PositiveIntegerField(default=0)
+    rate_3 = models.PositiveIntegerField(default=0)
+    rate_4 = models.PositiveIntegerField(default=0)
+    rate_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['average', 'book']),
+            # The expression ``BookOrderingFilter`` sorts on.
+            models.Index(Coalesce('average', 0.0).desc(), 'book', name='store_rating_average_desc'),
+        ]
+
+    def __str__(self):
+        return f'Rating of {self.book_id}: {self.average}'
+
+    def histogram(self):
+        return {str(rate): getattr(self, f'rate_{rate}') for rate in range(1, 6)}
+
 
 class UserBookRelation(models.Model):
     RATE_CHOICES = (
@@ -29,5 +171,98 @@ class UserBookRelation(models.Model):
     in_bookmarks = models.BooleanField(default=False)
     rate = models.PositiveSmallIntegerField(choices=RATE_CHOICES, null=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'book'], name='unique_user_book_relation'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'in_bookmarks', 'id']),
+            models.Index(fields=['user', 'like', 'id']),
+        ]
+
+    def __str__(self):
+        return f'Username: {self.user.username} book: {self.book.name}'
+
+    def counted_state(self):
+        return self.book_id, self.like, self.in_bookmarks, self.rate
+
+    def save(self, *args, **kwargs):
+        from store.logic import apply_relation_change
+
+        with transaction.atomic():
+            old_state = None
+            if not self._state.adding:
+                old_state = UserBookRelation.objects.select_for_update().filter(
+                    pk=self.pk).values_list('book_id', 'like', 'in_bookmarks', 'rate').first()
+            super().save(*args, **kwargs)
+            apply_relation_change(old_state, self.counted_state())
+
+
+class PendingRelationChange(models.Model):
+    """A relation change buffered by the write-behind mode, see ``store.writebehind``.
+
+    No foreign keys: checking them would lock the user and book rows the
+    buffer keeps writes away from.
+    """
+    user_id = models.BigIntegerField()
+    book_id = models.BigIntegerField()
+    changes = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_id', 'id']),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} on {self.book_id}: {self.changes}'
+
+
+class BookEvent(models.Model):
+    LIKE = 'like'
+    BOOKMARK = 'bookmark'
+    RATE = 'rate'
+    KIND_CHOICES = (
+        (LIKE, 'Like'),
+        (BOOKMARK, 'Bookmark'),
+        (RATE, 'Rate'),
+    )
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='events')
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES)
+    weight = models.SmallIntegerField(default=1)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f'{self.kind} {self.weight:+d} on {self.book_id} at {self.created_at}'
+
+
+class TrendingScore(models.Model):
+    window = models.CharField(max_length=16)
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='trending_scores')
+    score = models.FloatField()
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['window', 'book'], name='unique_trending_window_book'),
+        ]
+        indexes = [
+            models.Index(fields=['window', '-score', 'book']),
+        ]
+
+    def __str__(self):
+        return f'{self.window}: {self.book_id} ({self.score:.2f})'
+
+
+class BookSimilarity(models.Model):
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='similarities')
+    similar = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='similar_of')
+    score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['book', '-score', 'similar']),
+        ]
+
     def __str__(self):
-        return f'Username: {self.user.username} book: {self.book.name}'
\ No newline at end of file
+        return f'{self.book_id} ~ {self.similar_id} ({self.score:.3f})'
@@ -0,0 +1,193 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from functools import reduce
+from operator import or_
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .counting import ESTIMATE_THRESHOLD, estimated_count
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination that seeks by ``(ordering fields..., pk)`` instead of OFFSET.
+
+    The ordering is taken from the queryset (so it follows ``OrderingFilter``),
+    the primary key is appended as a tiebreaker and the cursor holds the
+    values of the last row seen. Pagination is opt-in unless ``optional`` is
+    false: it is only applied when the request carries a cursor or a page size.
+    The queryset may yield model instances or ``values()`` dicts.
+
+    A total is only returned on request (``?count=1``), since counting costs a
+    query of its own. Above ``count_threshold`` rows it is an estimate, which
+    ``count_exact`` reports (see ``store.counting``).
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    count_threshold = ESTIMATE_THRESHOLD
+    invalid_cursor_message = 'Invalid cursor'
+    optional = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.page_queryset(queryset, request)
+        if page_queryset is None:
+            return None
+        if self.count_requested(request):
+            self.count, self.count_exact = estimated_count(queryset, self.count_threshold)
+        return self.set_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views; ``queryset`` must be bound to a database."""
+        page_queryset = self.page_queryset(queryset, request)
+        if page_queryset is None:
+            return None
+        if self.count_requested(request):
+            self.count, self.count_exact = await sync_to_async(estimated_count)(
+                queryset, self.count_threshold)
+        return self.set_page([row async for row in page_queryset.aiterator()])
+
+    def page_queryset(self, queryset, request):
+        """Set up the page ``request`` asks for and return the queryset of its rows."""
+        params = request.query_params
+        if (self.optional and self.cursor_query_param not in params
+                and self.page_size_query_param not in params):
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.pk_name = queryset.model._meta.pk.name
+        self.fields = [self.get_field(queryset, name.lstrip('-')) for name in self.ordering]
+        self.count = None
+
+        self.cursor = self.decode_cursor(request)
+        self.reverse = self.cursor is not None and self.cursor['reverse']
+        ordering = [self.flip(name) for name in self.ordering] if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, self.cursor['position']))
+        return queryset[:self.page_size + 1]
+
+    def count_requested(self, request):
+        return request.query_params.get(self.count_query_param) in ('1', 'true')
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        return self.page
+
+    def get_paginated_response(self, data):
+        fields = [
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ]
+        if self.count is not None:
+            fields += [('count', self.count), ('count_exact', self.count_exact)]
+        return Response(OrderedDict(fields + [('results', data)]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'count': {'type': 'integer'},
+                'count_exact': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(request.query_params[self.page_size_query_param],
+                                 strict=True, cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return min(self.page_size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        ordering = [name for name in (queryset.query.order_by or queryset.model._meta.ordering)
+                    if isinstance(name, str)]
+        pk_name = queryset.model._meta.pk.name
+        if not {name.lstrip('-') for name in ordering} & {'pk', pk_name}:
+            ordering.append(pk_name)
+        return ordering
+
+    def get_field(self, queryset, name):
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        if name == 'pk':
+            return queryset.model._meta.pk
+        try:
+            return queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def flip(name):
+        return name[1:] if name.startswith('-') else '-' + name
+
+    def seek_filter(self, ordering, position):
+        conditions = []
+        for index, name in enumerate(ordering):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            equal = {ordering[i].lstrip('-'): position[i] for i in range(index)}
+            conditions.append(Q(**equal) & Q(**{f'{name.lstrip("-")}__{lookup}': position[index]}))
+        return reduce(or_, conditions)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if cursor['o'] != self.ordering or len(cursor['p']) != len(self.fields):
+                raise ValueError
+            position = [field.to_python(value) for field, value in zip(self.fields, cursor['p'])]
+            return {'position': position, 'reverse': bool(cursor['r'])}
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_value(self, instance, name):
+        if isinstance(instance, dict):
+            return instance[self.pk_name if name == 'pk' else name]
+        return getattr(instance, name)
+
+    def encode_cursor(self, instance, reverse):
+        position = [self.get_value(instance, name.lstrip('-')) for name in self.ordering]
+        cursor = {'o': self.ordering, 'p': position, 'r': reverse}
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(cursor, cls=DjangoJSONEncoder, separators=(',', ':')).encode())
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded.decode('ascii'))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+
+class LibraryPagination(KeysetPagination):
+    optional = False
@@ -7,6 +7,7 @@ class IsOwnerOrStaffOrReadOnly(BasePermission):
         return bool(
             request.method in SAFE_METHODS or
             request.user and
-            request.user.is_authenticated and (obj.owner == request.user or request.user.is_staff)
+            request.user.is_authenticated and
+            (obj.owner_id == request.user.pk or request.user.is_staff)
         )
 
@@ -0,0 +1,176 @@
+"""Item-item "readers who liked this also liked" recommendations.
+
+``build_similarities`` streams the positive interactions out of
+``UserBookRelation`` into a user x book sparse matrix, computes the cosine
+similarity between books block by block and stores the top K neighbours of
+every book in ``BookSimilarity``. The endpoints only read that table.
+
+Memory is bounded by the interaction arrays (12 bytes per liked or well
+rated relation, twice while the matrix is assembled) plus one dense
+``block x books`` float32 block of similarities, sized from ``memory_mb``.
+
+NumPy and SciPy are only needed to build the table, not to serve it.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from store.cache import invalidate_recommendations
+from store.models import Book, BookEvent, BookSimilarity, UserBookRelation
+
+TOP_K = 20
+MEMORY_MB = 256
+CHUNK_SIZE = 50000
+WRITE_BATCH_SIZE = 5000
+RECENT_LIKES = 200
+
+
+def _import_numpy():
+    try:
+        import numpy
+        from scipy import sparse
+    except ImportError:
+        raise ImproperlyConfigured('Building recommendations requires numpy and scipy.')
+    return numpy, sparse
+
+
+def interaction_matrix(chunk_size=CHUNK_SIZE):
+    """Return ``(matrix, book_ids)``: a users x books CSR matrix of interaction weights.
+
+    Rows are user ids, columns index ``book_ids``. A like weighs 1, a rating
+    ``(rate - 2) / 3`` (so 5 is worth a like and 1-2 nothing), whichever is
+    larger. Relations are read with a streamed cursor in ``chunk_size`` rows.
+    """
+    np, sparse = _import_numpy()
+    book_ids = np.fromiter(Book.objects.order_by('pk').values_list('pk', flat=True).iterator(
+        chunk_size=chunk_size), dtype=np.int64)
+    relations = (UserBookRelation.objects.filter(Q(like=True) | Q(rate__gte=3))
+                 .order_by().values_list('user_id', 'book_id', 'like', Coalesce('rate', 0)))
+
+    users, books, weights = [], [], []
+    chunk = []
+
+    def flush():
+        rows = np.array(chunk, dtype=np.int64)
+        users.append(rows[:, 0].astype(np.int32))
+        books.append(np.searchsorted(book_ids, rows[:, 1]).astype(np.int32))
+        weights.append(np.maximum(rows[:, 2], np.clip((rows[:, 3] - 2) / 3, 0, 1))
+                       .astype(np.float32))
+        chunk.clear()
+
+    for row in relations.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    if not users:
+        return sparse.csr_matrix((0, len(book_ids)), dtype=np.float32), book_ids
+
+    users, books, weights = (np.concatenate(parts) for parts in (users, books, weights))
+    matrix = sparse.csr_matrix((weights, (users, books)),
+                               shape=(int(users.max()) + 1, len(book_ids)), dtype=np.float32)
+    return matrix, book_ids
+
+
+def similar_books(matrix, rows, top_k=TOP_K, memory_mb=MEMORY_MB):
+    """Yield ``(row, neighbour rows, scores)`` for every book column index in ``rows``.
+
+    Similarities are cosine over the normalised columns, computed as a sparse
+    product for ``block`` books at a time and reduced to the top K with
+    ``argpartition`` on the dense block.
+    """
+    np, sparse = _import_numpy()
+    books = matrix.shape[1]
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0))).ravel()
+    scale = np.divide(1, norms, out=np.zeros_like(norms), where=norms > 0)
+    normalized = (matrix @ sparse.diags(scale.astype(np.float32))).tocsc()
+    transposed = normalized.T.tocsr()
+    top_k = min(top_k, books - 1)
+    if top_k < 1:
+        return
+    block = max(1, memory_mb * 1024 * 1024 // (4 * books))
+    rows = np.asarray(rows)
+    for start in range(0, len(rows), block):
+        block_rows = rows[start:start + block]
+        scores = (transposed[block_rows] @ normalized).toarray()
+        scores[np.arange(len(block_rows)), block_rows] = 0
+        neighbours = np.argpartition(scores, -top_k, axis=1)[:, -top_k:]
+        best = np.take_along_axis(scores, neighbours, axis=1)
+        order = np.argsort(-best, axis=1, kind='stable')
+        neighbours = np.take_along_axis(neighbours, order, axis=1)
+        best = np.take_along_axis(best, order, axis=1)
+        for row, row_neighbours, row_scores in zip(block_rows, neighbours, best):
+            keep = row_scores > 0
+            yield row, row_neighbours[keep], row_scores[keep]
+
+
+def build_similarities(book_ids=None, top_k=TOP_K, memory_mb=MEMORY_MB, chunk_size=CHUNK_SIZE):
+    """Recompute the neighbours of ``book_ids`` (default: every book).
+
+    Returns the number of books refreshed. Each batch of books is replaced in
+    its own transaction, so readers keep seeing the previous neighbours until
+    the new ones are committed. A partial refresh still reads every
+    interaction but only multiplies the rows of the given books; neighbour
+    lists of other books that mention them are refreshed on the next full run.
+    """
+    np = _import_numpy()[0]
+    matrix, all_ids = interaction_matrix(chunk_size)
+    if book_ids is None:
+        rows = np.arange(len(all_ids))
+    else:
+        rows = np.flatnonzero(np.isin(all_ids, list(book_ids)))
+
+    refreshed, pending, similarities = 0, [], []
+
+    def write():
+        with transaction.atomic():
+            BookSimilarity.objects.filter(book_id__in=pending).delete()
+            BookSimilarity.objects.bulk_create(similarities, batch_size=WRITE_BATCH_SIZE)
+        pending.clear()
+        similarities.clear()
+
+    for row, neighbours, scores in similar_books(matrix, rows, top_k, memory_mb):
+        book_id = int(all_ids[row])
+        pending.append(book_id)
+        similarities.extend(BookSimilarity(book_id=book_id, similar_id=int(all_ids[neighbour]),
+                                           score=round(float(score), 6))
+                            for neighbour, score in zip(neighbours, scores))
+        refreshed += 1
+        if len(similarities) >= WRITE_BATCH_SIZE:
+            write()
+    if pending:
+        write()
+    invalidate_recommendations()
+    return refreshed
+
+
+def changed_books(since):
+    """Books with a like, bookmark or rating event since ``since``."""
+    return set(BookEvent.objects.filter(created_at__gte=since)
+               .values_list('book_id', flat=True).distinct())
+
+
+def similar_to(book_id):
+    """Neighbours of ``book_id`` as books annotated with ``score``, best first."""
+    return (Book.objects.filter(similar_of__book=book_id)
+            .select_related('rating_summary')
+            .annotate(score=F('similar_of__score'))
+            .order_by('-score', 'id'))
+
+
+def recommended_for(user, recent=RECENT_LIKES):
+    """Books similar to the ``recent`` latest books ``user`` liked or rated well.
+
+    Scores of a candidate are summed over those books, and books the user
+    already has a relation with are left out.
+    """
+    liked = (UserBookRelation.objects.filter(Q(like=True) | Q(rate__gte=4), user=user)
+             .order_by('-id').values('book')[:recent])
+    known = UserBookRelation.objects.filter(user=user).values('book')
+    return (Book.objects.filter(similar_of__book__in=liked)
+            .exclude(pk__in=known)
+            .select_related('rating_summary')
+            .annotate(score=Sum('similar_of__score'))
+            .order_by('-score', 'id'))
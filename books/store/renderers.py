@@ -0,0 +1,25 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` that produces the same bytes with orjson when it is installed.
+
+    It is only byte-compatible for data made of dicts, lists, strings, ints,
+    booleans, None and floats between 1e-4 and 1e16 (orjson writes exponents
+    as ``1e-7`` where ``json`` writes ``1e-07``), so it is meant for views
+    whose output is known to stay in that range. Indented output and the
+    non-default ``UNICODE_JSON``/``COMPACT_JSON`` settings use ``json``.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {})):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Like JSONRenderer, escape the separators that are invalid in JavaScript strings.
+        return (orjson.dumps(data)
+                .replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029'))
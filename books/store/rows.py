@@ -0,0 +1,229 @@
+"""Read-only book serialization straight from database rows.
+
+``BookSerializer`` builds its field graph and walks it for every book, which
+dominates large pages. ``BookRows`` reads the same columns with ``values()``
+and builds the exact ``BookSerializer`` output with converters prepared once,
+and ``FastReadMixin`` serves ``list``/``retrieve`` with it and
+``FastJSONRenderer``. Writes keep going through ``BookSerializer``.
+"""
+from decimal import Decimal
+from operator import itemgetter, methodcaller
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from books.instrumentation import timed
+from store.renderers import FastJSONRenderer
+from store.models import Book
+from store.serializers import BookSerializer
+
+RATES = range(1, 6)
+
+
+def decimal_converter(field):
+    """Return a function doing ``field.to_representation`` for a ``DecimalField``.
+
+    Values that already have the field's decimal places (what the database
+    returns) are formatted directly instead of being quantized again.
+    """
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.decimal_places is None:
+        return field.to_representation
+    exponent = -field.decimal_places
+    max_digits = field.max_digits or float('inf')
+
+    def convert(value):
+        if isinstance(value, Decimal):
+            digits = value.as_tuple()
+            if digits.exponent == exponent and len(digits.digits) <= max_digits:
+                return f'{value:f}'
+        return field.to_representation(value)
+    return convert
+
+
+PERSONAL_COLUMNS = {'like': 'user_like', 'in_bookmarks': 'user_in_bookmarks',
+                    'rate': 'user_rate'}
+RATING_COLUMNS = (('rating_summary__book', 'rating_count', 'rating_summary__average')
+                  + tuple(f'rating_summary__rate_{rate}' for rate in RATES))
+FIELD_COLUMNS = {
+    'id': ('id',),
+    'name': ('name',),
+    'price': ('price',),
+    'author': ('author',),
+    'like_count': ('likes_count',),
+    'annotated_likes': ('likes_count',),
+    'like': (),
+    'in_bookmarks': (),
+    'rate': (),
+    'rating': RATING_COLUMNS,
+}
+BOOK_FIELDS = tuple(FIELD_COLUMNS)
+# Selected by ``retrieve`` for the object permissions, which see a ``Book``.
+PERMISSION_COLUMNS = ('id', 'owner_id')
+
+
+def book_columns(queryset, fields=BOOK_FIELDS):
+    """Columns of ``queryset`` needed to render ``fields`` and to build a pagination cursor.
+
+    The personal fields come from annotations, which ``get_queryset`` only
+    adds when they are asked for.
+    """
+    ordering = [name.lstrip('-')
+                for name in queryset.query.order_by or queryset.model._meta.ordering
+                if isinstance(name, str)]
+    columns = ['id'] + [column for name in fields for column in FIELD_COLUMNS[name]]
+    columns += [name for name in ordering
+                if name != 'pk' and name not in queryset.query.annotations]
+    return list(dict.fromkeys(columns))
+
+
+class BookRows:
+    """Turn ``values()`` rows of books into ``BookSerializer`` data."""
+
+    def __init__(self):
+        price = decimal_converter(BookSerializer().fields['price'])
+        histogram = [(str(rate), f'rating_summary__rate_{rate}') for rate in RATES]
+
+        def rating(row):
+            if row['rating_summary__book'] is None:
+                return None
+            return {
+                'count': row['rating_count'],
+                'average': row['rating_summary__average'],
+                'histogram': {key: row[column] for key, column in histogram},
+            }
+
+        self.converters = {
+            'id': itemgetter('id'),
+            'name': itemgetter('name'),
+            'price': lambda row: None if row['price'] is None else price(row['price']),
+            'author': itemgetter('author'),
+            'like_count': itemgetter('likes_count'),
+            'annotated_likes': itemgetter('likes_count'),
+            **{name: methodcaller('get', column) for name, column in PERSONAL_COLUMNS.items()},
+            'rating': rating,
+        }
+
+    def values(self, queryset, fields=BOOK_FIELDS, extra=()):
+        """``queryset`` as dicts of the columns ``fields`` need and of its annotations.
+
+        The annotations carry the personal fields and the values the keyset
+        pagination cursor is built from. ``extra`` columns are added as is.
+        """
+        columns = dict.fromkeys([*book_columns(queryset, fields), *extra])
+        return queryset.values(*columns, *queryset.query.annotations)
+
+    @staticmethod
+    def instance(row, using):
+        """The ``Book`` of a row selected with ``PERMISSION_COLUMNS``, other fields deferred."""
+        return Book.from_db(using, PERMISSION_COLUMNS, [row[name] for name in PERMISSION_COLUMNS])
+
+    def to_representation(self, row, fields=BOOK_FIELDS):
+        converters = self.converters
+        return {name: converters[name](row) for name in fields}
+
+    def data(self, rows, fields=BOOK_FIELDS):
+        with timed('serializer'):
+            return [self.to_representation(row, fields) for row in rows]
+
+
+class FastReadMixin:
+    """Serve ``list`` and ``retrieve`` from ``BookRows`` instead of the serializer.
+
+    Both paths honour ``?fields=``/``?exclude=`` (comma separated field
+    names): only the needed columns are selected and ``selected_fields`` tells
+    ``get_queryset`` which joins and annotations it can leave out. Set
+    ``fast_read = False`` to go through ``get_serializer`` again.
+
+    ``alist`` and ``aretrieve`` are the async versions served by
+    ``store.async_views`` (they need ``AsyncReadMixin``) and always use ``BookRows``.
+    """
+    fast_read = True
+    rows = BookRows()
+    read_actions = ('list', 'retrieve')
+    fields_query_param = 'fields'
+    exclude_query_param = 'exclude'
+
+    def selected_fields(self):
+        """The fields of the response, in ``BookSerializer`` order."""
+        if self.action not in self.read_actions:
+            return BOOK_FIELDS
+        selection = {}
+        for param in (self.fields_query_param, self.exclude_query_param):
+            names = {name.strip() for name in self.request.query_params.get(param, '').split(',')}
+            names.discard('')
+            unknown = names - set(BOOK_FIELDS)
+            if unknown:
+                raise ValidationError({param: [f'Unknown fields: {", ".join(sorted(unknown))}.']})
+            selection[param] = names
+        fields = selection[self.fields_query_param] or set(BOOK_FIELDS)
+        return tuple(name for name in BOOK_FIELDS
+                     if name in fields and name not in selection[self.exclude_query_param])
+
+    def get_renderers(self):
+        if self.fast_read and self.action in self.read_actions:
+            return [FastJSONRenderer()]
+        return super().get_renderers()
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in self.read_actions:
+            kwargs.setdefault('fields', self.selected_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in self.read_actions:
+            queryset = queryset.only(*book_columns(queryset, self.selected_fields()))
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if not self.fast_read:
+            return super().list(request, *args, **kwargs)
+        fields = self.selected_fields()
+        queryset = self.rows.values(self.filter_queryset(self.get_queryset()), fields)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.rows.data(page, fields))
+        return Response(self.rows.data(queryset, fields))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.fast_read:
+            return super().retrieve(request, *args, **kwargs)
+        fields = self.selected_fields()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.rows.values(self.filter_queryset(self.get_queryset()), fields,
+                                    PERMISSION_COLUMNS)
+        row = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]}).first()
+        if row is None:
+            raise Http404
+        self.check_object_permissions(request, self.rows.instance(row, queryset.db))
+        return Response(self.rows.data([row], fields)[0])
+
+    def async_queryset(self, fields, extra=()):
+        return self.pinned(self.rows.values(self.filter_queryset(self.get_queryset()), fields,
+                                            extra))
+
+    async def alist(self, request, *args, **kwargs):
+        fields = self.selected_fields()
+        queryset = await sync_to_async(self.async_queryset)(fields)
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.rows.data(page, fields))
+        return Response(self.rows.data([row async for row in queryset.aiterator()], fields))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        fields = self.selected_fields()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = await sync_to_async(self.async_queryset)(fields, PERMISSION_COLUMNS)
+        try:
+            row = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except ObjectDoesNotExist:
+            raise Http404
+        # Permissions may query (``request.user``, deferred fields of the book).
+        await sync_to_async(self.check_object_permissions)(request,
+                                                           self.rows.instance(row, queryset.db))
+        return Response(self.rows.data([row], fields)[0])
@@ -0,0 +1,123 @@
+import re
+from functools import reduce
+from operator import and_, or_
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+SQLITE_FTS_TABLE = 'store_book_fts'
+
+SQLITE_FTS_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5("
+    f"name, author, content='store_book', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_insert AFTER INSERT ON store_book BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, name, author) VALUES (new.id, new.name, new.author); "
+    f"END",
+    f"CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_delete AFTER DELETE ON store_book BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, name, author) "
+    f"VALUES ('delete', old.id, old.name, old.author); "
+    f"END",
+    f"CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_update AFTER UPDATE OF name, author "
+    f"ON store_book BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, name, author) "
+    f"VALUES ('delete', old.id, old.name, old.author); "
+    f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, name, author) VALUES (new.id, new.name, new.author); "
+    f"END",
+)
+
+POSTGRES_DOCUMENT_SQL = (
+    "setweight(to_tsvector('simple', coalesce({table}.name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce({table}.author, '')), 'B')"
+)
+
+
+def search_tokens(terms):
+    return [token.lower() for term in terms for token in re.findall(r'\w+', term)]
+
+
+def ensure_sqlite_search_index(connection):
+    """Create the FTS5 table and its triggers if they are missing.
+
+    SQLite drops triggers whenever Django rebuilds ``store_book`` during a
+    migration, so this runs after every ``migrate`` and refills the index
+    when anything had to be recreated.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM sqlite_master WHERE name LIKE %s",
+                       [f'{SQLITE_FTS_TABLE}%'])
+        existing = cursor.fetchone()[0]
+        for statement in SQLITE_FTS_SQL:
+            cursor.execute(statement)
+        cursor.execute("SELECT count(*) FROM sqlite_master WHERE name LIKE %s",
+                       [f'{SQLITE_FTS_TABLE}%'])
+        if cursor.fetchone()[0] != existing:
+            rebuild_search_index(connection)
+
+
+def rebuild_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('UPDATE store_book SET search_document = '
+                           + POSTGRES_DOCUMENT_SQL.format(table='store_book'))
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')")
+
+
+def postgres_search(queryset, terms, search_fields):
+    table = queryset.model._meta.db_table
+    tsquery = ' & '.join(f'{token}:*' for token in search_tokens(terms))
+    substring = reduce(and_, [
+        reduce(or_, [Q(**{f'{field}__icontains': term}) for field in search_fields])
+        for term in terms
+    ])
+    if not tsquery:
+        return queryset.filter(substring)
+    document = f'"{table}"."search_document"'
+    matches = RawSQL(f"{document} @@ to_tsquery('simple', %s)", [tsquery],
+                     output_field=BooleanField())
+    rank = RawSQL(f"ts_rank({document}, to_tsquery('simple', %s))::float8", [tsquery],
+                  output_field=FloatField())
+    return queryset.filter(Q(matches) | substring).annotate(
+        search_rank=rank).order_by('-search_rank', 'pk')
+
+
+def sqlite_search(queryset, terms, search_fields):
+    table = queryset.model._meta.db_table
+    tokens = search_tokens(terms)
+    if not tokens:
+        return queryset.none()
+    match = ' '.join(f'"{token}"*' for token in tokens)
+    matches = RawSQL(f'"{table}"."id" IN (SELECT rowid FROM {SQLITE_FTS_TABLE} '
+                     f'WHERE {SQLITE_FTS_TABLE} MATCH %s)', [match],
+                     output_field=BooleanField())
+    rank = RawSQL(f'(SELECT -bm25({SQLITE_FTS_TABLE}, 2.0, 1.0) FROM {SQLITE_FTS_TABLE} '
+                  f'WHERE {SQLITE_FTS_TABLE} MATCH %s AND rowid = "{table}"."id")', [match],
+                  output_field=FloatField())
+    return queryset.filter(matches).annotate(search_rank=rank).order_by('-search_rank', 'pk')
+
+
+SEARCH_BACKENDS = {
+    'postgresql': postgres_search,
+    'sqlite': sqlite_search,
+}
+
+
+class BookSearchFilter(SearchFilter):
+    """``?search=`` backed by the precomputed search document of each book.
+
+    PostgreSQL matches word prefixes against the GIN-indexed ``tsvector``
+    and keeps the old substring semantics through the trigram indexes,
+    SQLite uses the FTS5 index. Results are ranked unless ``?ordering=``
+    is given. Other databases fall back to DRF's ``icontains`` search.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        terms = self.get_search_terms(request)
+        backend = SEARCH_BACKENDS.get(connections[queryset.db].vendor)
+        if not search_fields or not terms or backend is None:
+            return super().filter_queryset(request, queryset, view)
+        return backend(queryset, terms, search_fields)
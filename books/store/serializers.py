@@ -1,20 +1,105 @@
+import re
+
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
+from books.instrumentation import TimedListSerializer, TimedSerializerMixin
 from .models import *
 
 
-class BookSerializer(ModelSerializer):
-    like_count = serializers.SerializerMethodField()
-    annotated_likes = serializers.IntegerField(read_only=True)
+class RatingSummarySerializer(ModelSerializer):
+    count = serializers.IntegerField(source='book.rating_count', read_only=True)
+    histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+
+    class Meta:
+        model = BookRatingSummary
+        fields = ('count', 'average', 'histogram')
+
+
+class SparseFieldsMixin:
+    """Accept ``fields=`` to keep only some of the declared fields."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class BookSerializer(SparseFieldsMixin, TimedSerializerMixin, ModelSerializer):
+    like_count = serializers.IntegerField(source='likes_count', read_only=True)
+    annotated_likes = serializers.IntegerField(source='likes_count', read_only=True)
+    like = serializers.BooleanField(source='user_like', read_only=True, allow_null=True)
+    in_bookmarks = serializers.BooleanField(source='user_in_bookmarks', read_only=True,
+                                            allow_null=True)
+    rate = serializers.IntegerField(source='user_rate', read_only=True, allow_null=True)
+    rating = RatingSummarySerializer(source='rating_summary', read_only=True)
+
     class Meta:
         model = Book
-        fields = ('id', 'name', 'price', 'author', 'like_count', 'annotated_likes')
+        fields = ('id', 'name', 'price', 'author', 'like_count', 'annotated_likes',
+                  'like', 'in_bookmarks', 'rate', 'rating')
+        list_serializer_class = TimedListSerializer
 
-    def get_like_count(self, instance):
-        return UserBookRelation.objects.filter(book=instance, like=True).count()
 
+class ScoredBookSerializer(BookSerializer):
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(BookSerializer.Meta):
+        fields = BookSerializer.Meta.fields + ('score',)
+
+
+class TrendingSerializer(TimedSerializerMixin, ModelSerializer):
+    book = BookSerializer(read_only=True)
 
-class UserBookRelationSerializer(ModelSerializer):
+    class Meta:
+        model = TrendingScore
+        fields = ('book', 'score')
+        list_serializer_class = TimedListSerializer
+
+
+class UserBookRelationSerializer(TimedSerializerMixin, ModelSerializer):
     class Meta:
         model = UserBookRelation
         fields = ('book', 'like', 'in_bookmarks', 'rate')
+        list_serializer_class = TimedListSerializer
+
+
+class LibraryBookSerializer(ModelSerializer):
+    like_count = serializers.IntegerField(source='likes_count', read_only=True)
+
+    class Meta:
+        model = Book
+        fields = ('id', 'name', 'price', 'author', 'like_count')
+
+
+class LibrarySerializer(TimedSerializerMixin, ModelSerializer):
+    book = LibraryBookSerializer(read_only=True)
+
+    class Meta:
+        model = UserBookRelation
+        fields = ('book', 'like', 'in_bookmarks', 'rate')
+        list_serializer_class = TimedListSerializer
+
+
+class UserBookRelationBatchSerializer(UserBookRelationSerializer):
+    book = serializers.IntegerField(min_value=1)
+
+    def validate(self, attrs):
+        if 'book' not in attrs:
+            raise serializers.ValidationError(
+                {'book': [self.fields['book'].error_messages['required']]})
+        return attrs
+
+
+class BookImportSerializer(ModelSerializer):
+    isbn = serializers.CharField(max_length=17)
+
+    class Meta:
+        model = Book
+        fields = ('isbn', 'name', 'price', 'author')
+
+    def validate_isbn(self, value):
+        isbn = re.sub(r'[\s-]', '', value).upper()
+        if not re.fullmatch(r'\d{9}[\dX]|\d{13}', isbn):
+            raise serializers.ValidationError('Enter a valid ISBN-10 or ISBN-13.')
+        return isbn
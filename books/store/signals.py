@@ -0,0 +1,49 @@
+from django.db import connections
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from store.cache import invalidate_books
+from store.logic import apply_relation_change
+from store.models import Book, BookRatingSummary, BookTombstone, CatalogVersion, UserBookRelation
+from store.search import ensure_sqlite_search_index
+
+
+@receiver(post_delete, sender=UserBookRelation)
+def relation_deleted(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Book) and origin.pk == instance.book_id:
+        return
+    if isinstance(origin, QuerySet) and origin.model is Book:
+        return
+    apply_relation_change(instance.counted_state(), None)
+
+
+@receiver(post_save, sender=Book)
+def book_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        BookRatingSummary.objects.create(book=instance)
+
+
+@receiver(pre_delete, sender=Book)
+def book_deleting(sender, instance, using, **kwargs):
+    # Take the version before the delete locks the book row, like every other writer.
+    instance._tombstone_version = CatalogVersion.allocate(using=using)
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, using, **kwargs):
+    BookTombstone.objects.using(using).bulk_create(
+        [BookTombstone(book_id=instance.pk, version=instance._tombstone_version)],
+        update_conflicts=True, unique_fields=['book_id'], update_fields=['version'])
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def book_changed(sender, instance, **kwargs):
+    invalidate_books([instance.pk])
+
+
+def ensure_search_index(sender, using, **kwargs):
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        ensure_sqlite_search_index(connection)
@@ -0,0 +1,192 @@
+"""Pre-compressed snapshots of the anonymous book list.
+
+The anonymous, unpaginated ``GET /book/`` (plain, ``?ordering=price`` or
+``?ordering=author``) is the most frequent request, and its output only
+changes with the list generation that ``invalidate_books`` bumps on every
+write of a book or a relation. ``build_snapshots`` renders these responses
+through ``BookViewSet`` itself and writes them under ``STORE_SNAPSHOT_DIR``
+as ``<name>.<generation>.json``, plus gzip and (when the ``brotli`` package
+is installed) brotli copies and a manifest holding the ETag. The manifest is
+written last, so its presence marks a complete snapshot; files of older
+generations are removed once the new one is in place.
+
+``SnapshotMixin.list`` serves a matching request from the file of the
+current generation, in the encoding the client accepts, without touching
+the database or the serializer. A stale or missing snapshot falls back to
+the regular (cached) list. Generations live in ``STORE_RESPONSE_CACHE``, so
+the ``build_snapshots --every`` builder and the web workers must share it
+(``check --deploy`` fails on a locmem one).
+
+Settings: ``STORE_SNAPSHOT_DIR`` (``None`` disables snapshots).
+"""
+import gzip
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, HttpRequest, QueryDict
+from django.utils.cache import patch_vary_headers
+
+from store.cache import LIST_GENERATION_KEY, etag_matches, get_generation, make_etag
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ``?ordering=`` value -> snapshot name.
+SNAPSHOTS = {None: 'books', 'price': 'books-price', 'author': 'books-author'}
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+CONTENT_TYPE = 'application/json'
+
+_loaded = {}
+
+
+def snapshot_dir():
+    directory = getattr(settings, 'STORE_SNAPSHOT_DIR', None)
+    return Path(directory) if directory else None
+
+
+def snapshot_name(request):
+    """Name of the snapshot that answers ``request``, or None."""
+    if request.user.is_authenticated:
+        return None
+    params = request.query_params
+    if not params:
+        return SNAPSHOTS[None]
+    if list(params) == ['ordering'] and len(params.getlist('ordering')) == 1:
+        return SNAPSHOTS.get(params['ordering'])
+    return None
+
+
+def compress(content):
+    encoded = {'gzip': gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        encoded['br'] = brotli.compress(content, quality=BROTLI_QUALITY)
+    return encoded
+
+
+def write_file(path, content):
+    temporary = path.with_name(f'.{path.name}.tmp')
+    temporary.write_bytes(content)
+    os.replace(temporary, path)
+
+
+def write_snapshot(directory, name, generation, content):
+    base = f'{name}.{generation}.json'
+    files = {'identity': base}
+    write_file(directory / base, content)
+    for encoding, encoded in compress(content).items():
+        files[encoding] = f'{base}.{"br" if encoding == "br" else "gz"}'
+        write_file(directory / files[encoding], encoded)
+    manifest = {'etag': make_etag(content), 'files': files}
+    write_file(directory / f'{name}.{generation}.manifest', json.dumps(manifest).encode())
+    for path in directory.glob(f'{name}.*'):
+        if not path.name.startswith(f'{name}.{generation}.'):
+            path.unlink(missing_ok=True)
+
+
+def render_list(ordering):
+    """The anonymous ``GET /book/`` response body for ``ordering``."""
+    from store.views import BookViewSet
+
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = QueryDict(f'ordering={ordering}' if ordering else '')
+    response = BookViewSet.as_view({'get': 'list'})(http_request)
+    if hasattr(response, 'render'):
+        response.render()
+    if response.status_code != 200:
+        raise ValueError(f'The book list answered {response.status_code}.')
+    return response.content
+
+
+def build_snapshots():
+    """Write the snapshots missing for the current list generation, return their names."""
+    directory = snapshot_dir()
+    if directory is None:
+        return []
+    directory.mkdir(parents=True, exist_ok=True)
+    # Read before rendering: a write meanwhile bumps it and the snapshot is never served.
+    generation = get_generation([LIST_GENERATION_KEY])
+    built = []
+    for ordering, name in SNAPSHOTS.items():
+        if not (directory / f'{name}.{generation}.manifest').exists():
+            write_snapshot(directory, name, generation, render_list(ordering))
+            built.append(name)
+    return built
+
+
+def load_snapshot(directory, name, generation):
+    key = (directory, name)
+    snapshot = _loaded.get(key)
+    if snapshot is None or snapshot['generation'] != generation:
+        try:
+            manifest = (directory / f'{name}.{generation}.manifest').read_bytes()
+        except FileNotFoundError:
+            return None
+        snapshot = {**json.loads(manifest), 'generation': generation}
+        _loaded[key] = snapshot
+    return snapshot
+
+
+def accepted_encodings(header):
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding.strip():
+            accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(header, available):
+    accepted = accepted_encodings(header)
+    for encoding in ('br', 'gzip'):
+        if encoding in available and accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return 'identity'
+
+
+class SnapshotMixin:
+    """Serve the anonymous book list from the snapshot of the current generation."""
+
+    def list(self, request, *args, **kwargs):
+        response = self.snapshot_response(request)
+        if response is None:
+            return super().list(request, *args, **kwargs)
+        return response
+
+    def snapshot_response(self, request):
+        directory, name = snapshot_dir(), snapshot_name(request)
+        if directory is None or name is None:
+            return None
+        snapshot = load_snapshot(directory, name, get_generation([LIST_GENERATION_KEY]))
+        if snapshot is None:
+            return None
+        if etag_matches(request, snapshot['etag']):
+            response = self.not_modified(snapshot['etag'])
+        else:
+            encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''),
+                                       snapshot['files'])
+            try:
+                file = open(directory / snapshot['files'][encoding], 'rb')
+            except FileNotFoundError:
+                # Replaced by a newer generation since the manifest was read.
+                return None
+            response = FileResponse(file, content_type=CONTENT_TYPE)
+            del response['Content-Disposition']
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+            response['ETag'] = snapshot['etag']
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
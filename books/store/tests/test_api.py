@@ -1,6 +1,7 @@
 import json
 from django.contrib.auth.models import User
-from django.db.models import Count, Case, When
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.exceptions import ErrorDetail
@@ -23,17 +24,56 @@ class BookAPITestCase(APITestCase):
     def test_get(self):
         url = reverse('book-list')
         response = self.client.get(url)
-        books = Book.objects.all().annotate(
-            annotated_likes=Count(Case(When(userbookrelation__like=True, then=1))))
+        books = Book.objects.all()
         serializer_data = BookSerializer(books, many=True).data
         self.assertEqual(response.data, serializer_data)
         self.assertEqual(status.HTTP_200_OK, response.status_code)
 
+    def test_get_queries(self):
+        UserBookRelation.objects.create(user=self.user1, book=self.book_1, like=True)
+        url = reverse('book-list')
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(1, response.data[0]['like_count'])
+        self.assertEqual(1, response.data[0]['annotated_likes'])
+
+    def test_get_personal(self):
+        user2 = User.objects.create(username='testuser2')
+        UserBookRelation.objects.create(user=self.user1, book=self.book_1, like=True, rate=4)
+        UserBookRelation.objects.create(user=self.user1, book=self.book_2, in_bookmarks=True)
+        UserBookRelation.objects.create(user=user2, book=self.book_3, like=True, rate=1)
+        url = reverse('book-list')
+        self.client.force_login(self.user1)
+        response = self.client.get(url)
+        personal = [(book['like'], book['in_bookmarks'], book['rate']) for book in response.data]
+        self.assertEqual([(True, False, 4), (False, True, None), (None, None, None)], personal)
+
+        self.client.force_login(user2)
+        response = self.client.get(url)
+        personal = [(book['like'], book['in_bookmarks'], book['rate']) for book in response.data]
+        self.assertEqual([(None, None, None), (None, None, None), (True, False, 1)], personal)
+
+        self.client.logout()
+        response = self.client.get(url)
+        self.assertEqual({None}, {book['like'] for book in response.data})
+
+    def test_get_personal_queries(self):
+        self.client.force_login(self.user1)
+        url = reverse('book-list')
+        counts = []
+        for liked, book in enumerate((self.book_1, self.book_2, self.book_3), start=1):
+            UserBookRelation.objects.create(user=self.user1, book=book, like=True)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, data={'page_size': 10})
+            self.assertEqual(liked, sum(bool(item['like']) for item in response.json()['results']))
+            counts.append(len([query for query in queries
+                               if 'store_book' in query['sql'] and 'SELECT' in query['sql']]))
+        self.assertEqual([1, 1, 1], counts)
+
     def test_get_filter(self):
         url = reverse('book-list')
         response = self.client.get(url, data={'price': 70})
-        books = Book.objects.filter(id__in=[self.book_2.id]).annotate(
-            annotated_likes=Count(Case(When(userbookrelation__like=True, then=1))))
+        books = Book.objects.filter(id__in=[self.book_2.id])
         serializer_data = BookSerializer(books, many=True).data
         self.assertEqual(response.data, serializer_data)
         self.assertEqual(status.HTTP_200_OK, response.status_code)
@@ -41,17 +81,15 @@ class BookAPITestCase(APITestCase):
     def test_get_search(self):
         url = reverse('book-list')
         response = self.client.get(url, data={'search': 'Author 1'})
-        books = Book.objects.filter(id__in=[self.book_1.id, self.book_3.id]).annotate(
-            annotated_likes=Count(Case(When(userbookrelation__like=True, then=1))))
+        books = Book.objects.filter(id__in=[self.book_1.id, self.book_3.id])
         serializer_data = BookSerializer(books, many=True).data
-        self.assertEqual(response.data, serializer_data)
+        self.assertEqual(sorted(response.data, key=lambda book: book['id']), serializer_data)
         self.assertEqual(status.HTTP_200_OK, response.status_code)
 
     def test_get_ordering(self):
         url = reverse('book-list')
         response = self.client.get(url, data={'ordering': 'price'})
-        books = Book.objects.all().annotate(
-            annotated_likes=Count(Case(When(userbookrelation__like=True, then=1)))).order_by('price')
+        books = Book.objects.all().order_by('price')
         serializer_data = BookSerializer(books, many=True).data
         self.assertEqual(response.data, serializer_data)
         self.assertEqual(status.HTTP_200_OK, response.status_code)
@@ -156,6 +194,15 @@ class UserBookRelationTestCase(APITestCase):
         relation2 = UserBookRelation.objects.get(user=self.user1, book=self.book_1)
         self.assertTrue(relation2.in_bookmarks)
 
+    def test_unknown_book(self):
+        self.client.force_login(self.user1)
+        for book in (self.book_3.id + 100, 'abc'):
+            response = self.client.patch(reverse('userbookrelation-detail', args=(book,)),
+                                         json.dumps({'like': True}),
+                                         content_type='application/json')
+            self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+        self.assertFalse(UserBookRelation.objects.exists())
+
     def test_rate(self):
         url = reverse('userbookrelation-detail', args=(self.book_1.id,))
         data = {
@@ -167,3 +214,116 @@ class UserBookRelationTestCase(APITestCase):
         self.assertEqual(status.HTTP_200_OK, response.status_code)
         relation = UserBookRelation.objects.get(user=self.user1, book=self.book_1)
         self.assertEqual(relation.rate, 2)
+
+    def test_batch(self):
+        UserBookRelation.objects.create(user=self.user1, book=self.book_1, like=True, rate=3)
+        url = reverse('userbookrelation-batch')
+        data = [
+            {"book": self.book_1.id, "in_bookmarks": True},
+            {"book": self.book_2.id, "like": True, "rate": 5},
+            {"book": self.book_2.id, "rate": 4},
+        ]
+        self.client.force_login(self.user1)
+        response = self.client.post(url, json.dumps(data), content_type='application/json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([
+            {'book': self.book_1.id, 'like': True, 'in_bookmarks': True, 'rate': 3,
+             'created': False},
+            {'book': self.book_2.id, 'like': True, 'in_bookmarks': False, 'rate': 4,
+             'created': True},
+            {'book': self.book_2.id, 'like': True, 'in_bookmarks': False, 'rate': 4,
+             'created': True},
+        ], response.data)
+        relation = UserBookRelation.objects.get(user=self.user1, book=self.book_2)
+        self.assertEqual((True, False, 4), (relation.like, relation.in_bookmarks, relation.rate))
+        self.book_1.refresh_from_db()
+        self.book_2.refresh_from_db()
+        self.assertEqual((1, 1, 3, 1), (self.book_1.likes_count, self.book_1.bookmarks_count,
+                                        self.book_1.rating_sum, self.book_1.rating_count))
+        self.assertEqual((1, 0, 4, 1), (self.book_2.likes_count, self.book_2.bookmarks_count,
+                                        self.book_2.rating_sum, self.book_2.rating_count))
+
+    def test_batch_errors(self):
+        url = reverse('userbookrelation-batch')
+        data = [
+            {"book": self.book_1.id, "like": True},
+            {"book": 100500, "like": True},
+            {"like": True},
+            {"book": self.book_2.id, "rate": 7},
+        ]
+        self.client.force_login(self.user1)
+        response = self.client.post(url, json.dumps(data), content_type='application/json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertTrue(response.data[0]['created'])
+        self.assertEqual(['Invalid pk "100500" - object does not exist.'],
+                         response.data[1]['errors']['book'])
+        self.assertEqual(['book'], list(response.data[2]['errors']))
+        self.assertEqual(['rate'], list(response.data[3]['errors']))
+        self.assertEqual(1, UserBookRelation.objects.count())
+
+        response = self.client.post(url, json.dumps({"book": self.book_1.id}),
+                                    content_type='application/json')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_batch_queries(self):
+        url = reverse('userbookrelation-batch')
+        self.client.force_login(self.user1)
+        books = Book.objects.bulk_create([Book(name=f'Book {i}', price=10, author='Author')
+                                          for i in range(20)])
+
+        def post(data):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(url, json.dumps(data), content_type='application/json')
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            return len(queries)
+
+        post([])
+        small = post([{"book": self.book_1.id, "like": True, "rate": 5}])
+        large = post([{"book": book.id, "like": True, "rate": 5} for book in books])
+        self.assertEqual(small, large)
+
+    def test_batch_anonymous(self):
+        url = reverse('userbookrelation-batch')
+        response = self.client.post(url, json.dumps([]), content_type='application/json')
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
+
+    def test_library(self):
+        UserBookRelation.objects.create(user=self.user1, book=self.book_1, like=True, rate=5)
+        UserBookRelation.objects.create(user=self.user1, book=self.book_2, in_bookmarks=True)
+        UserBookRelation.objects.create(user=self.user1, book=self.book_3, like=True,
+                                        in_bookmarks=True)
+        UserBookRelation.objects.create(user=self.user2, book=self.book_2, like=True)
+        self.client.force_login(self.user1)
+
+        response = self.client.get(reverse('userbookrelation-likes'))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([self.book_3.id, self.book_1.id],
+                         [item['book']['id'] for item in response.data['results']])
+        self.assertEqual({'id': self.book_1.id, 'name': 'Test book 1', 'price': '50.00',
+                          'author': 'Author 1', 'like_count': 1},
+                         response.data['results'][1]['book'])
+
+        response = self.client.get(reverse('userbookrelation-bookmarks'), data={'page_size': 1})
+        self.assertEqual([self.book_3.id],
+                         [item['book']['id'] for item in response.data['results']])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([self.book_2.id],
+                         [item['book']['id'] for item in response.data['results']])
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get(reverse('userbookrelation-rated'))
+        self.assertEqual([(self.book_1.id, 5)],
+                         [(item['book']['id'], item['rate']) for item in response.data['results']])
+
+    def test_library_queries(self):
+        self.client.force_login(self.user1)
+        for book in (self.book_1, self.book_2, self.book_3):
+            UserBookRelation.objects.create(user=self.user1, book=book, in_bookmarks=True)
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('userbookrelation-bookmarks'))
+            self.assertEqual(1, len([query for query in queries
+                                     if 'store_userbookrelation' in query['sql']]))
+
+    def test_library_anonymous(self):
+        response = self.client.get(reverse('userbookrelation-likes'))
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
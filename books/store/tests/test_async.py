@@ -0,0 +1,98 @@
+import asyncio
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.urls import resolve, reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from store.cache import get_cache
+from store.models import Book, UserBookRelation
+
+
+class AsyncReadTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='testuser1')
+        self.books = [Book.objects.create(name=f'Book {i}', price=Decimal(10 + i % 3),
+                                          author=f'Author {i % 2}', owner=self.user)
+                      for i in range(5)]
+        UserBookRelation.objects.create(user=self.user, book=self.books[0], like=True, rate=4)
+        UserBookRelation.objects.create(user=self.user, book=self.books[2], in_bookmarks=True)
+        UserBookRelation.objects.create(user=self.user, book=self.books[3], like=True)
+
+    def compare(self, name, params=None, args=()):
+        get_cache().clear()
+        sync = self.client.get(reverse(name, args=args), params)
+        get_cache().clear()
+        response = self.client.get(reverse(f'async-{name}', args=args), params)
+        self.assertEqual(sync.status_code, response.status_code)
+        self.assertEqual(sync['Content-Type'], response['Content-Type'])
+        self.assertEqual(sync.content, response.content.replace(b'/async/', b'/'))
+        return response
+
+    def test_views_are_async(self):
+        for path in ('/async/book/', '/async/book/1/', '/async/book-relation/likes/'):
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(path).func))
+
+    def test_book_list(self):
+        for params in ({}, {'fields': 'id,name,like'}, {'ordering': '-price', 'page_size': 2},
+                       {'search': 'book'}, {'price': '11.00'}, {'page_size': 2, 'count': 1}):
+            self.compare('book-list', params)
+            self.client.force_login(self.user)
+            self.compare('book-list', params)
+            self.client.logout()
+
+    def test_book_pages(self):
+        response = self.compare('book-list', {'page_size': 2, 'ordering': 'author'})
+        ids = [book['id'] for book in response.json()['results']]
+        while response.json()['next']:
+            response = self.client.get(response.json()['next'])
+            ids += [book['id'] for book in response.json()['results']]
+        self.assertEqual(sorted(book.id for book in self.books), sorted(ids))
+
+    def test_book_retrieve(self):
+        self.client.force_login(self.user)
+        self.compare('book-detail', args=(self.books[0].id,))
+        self.compare('book-detail', {'fields': 'rate'}, args=(self.books[0].id,))
+        response = self.compare('book-detail', args=(self.books[-1].id + 1,))
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_errors(self):
+        response = self.compare('book-list', {'fields': 'owner'})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        response = self.compare('userbookrelation-likes')
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
+
+    def test_library(self):
+        self.client.force_login(self.user)
+        for name in ('bookmarks', 'likes', 'rated'):
+            response = self.compare(f'userbookrelation-{name}', {'page_size': 1})
+            self.assertEqual(1, len(response.json()['results']))
+
+    def test_cached(self):
+        url = reverse('async-book-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+        self.books[0].save()
+        self.assertEqual(status.HTTP_200_OK,
+                         self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code)
+
+        self.client.get(reverse('book-list'), {'page_size': 1})
+        response = self.client.get(url, {'page_size': 1})
+        self.assertIn('/async/book/', response.json()['next'])
+
+    async def test_asgi(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(reverse('async-book-list'),
+                                               {'fields': 'id,like', 'page_size': 1})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([{'id': self.books[0].id, 'like': True}], response.json()['results'])
+        self.assertIn('queries', response['Server-Timing'])
+
+        response = await self.async_client.get(reverse('async-userbookrelation-likes'))
+        self.assertEqual([self.books[3].id, self.books[0].id],
+                         [relation['book']['id'] for relation in response.json()['results']])
@@ -0,0 +1,81 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from books.auth import check_user_cache
+from store.cache import get_cache
+from store.models import Book
+from store.permissions import IsOwnerOrStaffOrReadOnly
+
+GITHUB_BACKEND = 'social_core.backends.github.GithubOAuth2'
+
+
+class CachedAuthTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='testuser1')
+        self.user.set_password('password')
+        self.user.save()
+        self.book = Book.objects.create(name='Test book 1', price=50, author='Author 1',
+                                        owner=self.user)
+        self.url = reverse('userbookrelation-likes')
+
+    def get(self, path, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, params)
+        return response, [query['sql'] for query in queries]
+
+    def test_warm_request(self):
+        for backend in (None, GITHUB_BACKEND):
+            get_cache().clear()
+            self.client.force_login(self.user, backend=backend)
+            response, queries = self.get(reverse('book-list'), fields='id,like')
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+            response, queries = self.get(reverse('book-list'), fields='id,rate')
+            self.assertEqual([{'id': self.book.id, 'rate': None}], response.json())
+            self.assertEqual(1, len(queries))
+            self.assertNotIn('auth_user', queries[0])
+            self.client.logout()
+
+    def test_user_saved(self):
+        self.client.force_login(self.user)
+        self.assertEqual(status.HTTP_200_OK, self.get(self.url)[0].status_code)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.get(self.url)[0].status_code)
+
+    def test_password_changed(self):
+        self.client.force_login(self.user)
+        self.assertEqual(status.HTTP_200_OK, self.get(self.url)[0].status_code)
+        self.user.set_password('changed')
+        self.user.save()
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.get(self.url)[0].status_code)
+
+    def test_stale_session_hash(self):
+        self.client.force_login(self.user)
+        self.get(self.url)
+        User.objects.filter(pk=self.user.pk).update(password='!')
+        other = self.client_class()
+        other.force_login(User.objects.get(pk=self.user.pk))
+        self.assertEqual(status.HTTP_200_OK, other.get(self.url).status_code)
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.get(self.url)[0].status_code)
+
+    def test_owner_permission(self):
+        request = RequestFactory().patch('/')
+        permission = IsOwnerOrStaffOrReadOnly()
+        book = Book.objects.get(pk=self.book.pk)
+        for user, allowed in ((self.user, True), (User.objects.create(username='other'), False)):
+            request.user = user
+            with self.assertNumQueries(0):
+                self.assertEqual(allowed, permission.has_object_permission(request, None, book))
+
+    def test_deploy_check(self):
+        self.assertEqual(['books.E001'], [error.id for error in check_user_cache()])
+        shared = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}
+        with override_settings(CACHES={'default': shared}):
+            self.assertEqual([], check_user_cache())
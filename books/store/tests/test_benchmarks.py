@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+
+from benchmarks.concurrency import concurrency_throughput
+from benchmarks.dataset import USERNAME_PREFIX, clear_dataset, generate_dataset
+from benchmarks.runner import compare, run_benchmarks
+from benchmarks.serialization import serialization_throughput
+from store.logic import find_counter_mismatches
+from store.models import Book, UserBookRelation
+
+
+class BenchmarkDatasetTestCase(TestCase):
+
+    def test_generate(self):
+        created = generate_dataset(users=5, books=30, relations_per_user=4, seed=1)
+        self.assertEqual({'users': 5, 'books': 30, 'relations': 20}, created)
+        self.assertEqual(5, User.objects.filter(username__startswith=USERNAME_PREFIX).count())
+        self.assertEqual(20, UserBookRelation.objects.count())
+        self.assertEqual([], list(find_counter_mismatches()))
+
+    def test_reproducible(self):
+        generate_dataset(users=3, books=10, relations_per_user=3, seed=7)
+        first = sorted(UserBookRelation.objects.values_list(
+            'user__username', 'book__isbn', 'like', 'in_bookmarks', 'rate'))
+        clear_dataset()
+        self.assertFalse(Book.objects.exists())
+        generate_dataset(users=3, books=10, relations_per_user=3, seed=7)
+        second = sorted(UserBookRelation.objects.values_list(
+            'user__username', 'book__isbn', 'like', 'in_bookmarks', 'rate'))
+        self.assertEqual(first, second)
+
+
+class BenchmarkRunnerTestCase(TestCase):
+
+    def setUp(self):
+        generate_dataset(users=2, books=20, relations_per_user=2, seed=3)
+
+    def test_run(self):
+        results = run_benchmarks(['list', 'retrieve', 'relation_patch'], iterations=3, warmup=1)
+        self.assertEqual(20, results['meta']['books'])
+        self.assertEqual({'list', 'retrieve', 'relation_patch'}, set(results['scenarios']))
+        for result in results['scenarios'].values():
+            self.assertEqual(3, result['requests'])
+            self.assertEqual(['200'], list(result['status_codes']))
+            self.assertIsNotNone(result['queries']['max'])
+            self.assertIsNotNone(result['peak_memory_kb'])
+
+    def test_create_cleared(self):
+        run_benchmarks(['create'], iterations=2, warmup=1)
+        self.assertTrue(Book.objects.filter(isbn=None).exists())
+        clear_dataset()
+        self.assertFalse(Book.objects.exists())
+
+    def test_compare(self):
+        baseline = run_benchmarks(['list'], iterations=2, warmup=0)
+        self.assertEqual([], compare(baseline, baseline))
+        slower = json.loads(json.dumps(baseline))
+        slower['scenarios']['list']['latency_ms']['p95'] *= 2
+        slower['scenarios']['list']['throughput_rps'] /= 2
+        slower['scenarios']['list']['queries']['max'] += 1
+        self.assertEqual(3, len(compare(baseline, slower)))
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            call_command('run_benchmarks', 'filter', '--iterations', '2', '--warmup', '0',
+                         '--cold', '-o', path, stdout=StringIO())
+            with open(path) as results:
+                self.assertTrue(json.load(results)['meta']['cold'])
+
+    def test_serialization(self):
+        results = serialization_throughput(limit=15, repeat=1)
+        self.assertTrue(results['identical'])
+        self.assertEqual(15, results['rows']['rows'])
+
+
+class ConcurrencyBenchmarkTestCase(TransactionTestCase):
+
+    def test_run(self):
+        generate_dataset(users=2, books=20, relations_per_user=2, seed=3)
+        for endpoint in ('list', 'retrieve'):
+            results = concurrency_throughput(endpoint, requests=6, clients=3, threads=2,
+                                             client_delay=0)
+            self.assertTrue(results['identical'])
+            for name in ('wsgi', 'asgi'):
+                self.assertEqual({'200': 6}, results[name]['status_codes'])
+                self.assertGreater(results[name]['throughput_rps'], 0)
@@ -0,0 +1,84 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from store.cache import check_response_cache
+from store.models import Book, UserBookRelation
+
+
+class BookResponseCacheTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='testuser1')
+        self.book_1 = Book.objects.create(name='Test book 1', price=50,
+                                          author='Author 1', owner=self.user)
+        self.book_2 = Book.objects.create(name='Test book 2', price=70, author='Author 2')
+        self.list_url = reverse('book-list')
+        self.detail_url = reverse('book-detail', args=(self.book_1.id,))
+
+    def test_list_hit(self):
+        first = self.client.get(self.list_url, data={'ordering': 'price'})
+        with self.assertNumQueries(0):
+            second = self.client.get(self.list_url + '?ordering=price&search=')
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_query_string_is_part_of_key(self):
+        self.client.get(self.list_url, data={'price': 50})
+        response = self.client.get(self.list_url, data={'price': 70})
+        self.assertEqual([self.book_2.id], [book['id'] for book in response.data])
+
+    @override_settings(ALLOWED_HOSTS=['a.example', 'b.example'])
+    def test_host_is_part_of_key(self):
+        for host, secure in (('a.example', False), ('b.example', False), ('b.example', True)):
+            response = self.client.get(self.list_url, {'page_size': 1}, HTTP_HOST=host,
+                                       secure=secure)
+            scheme = 'https' if secure else 'http'
+            self.assertTrue(response.json()['next'].startswith(f'{scheme}://{host}/'), host)
+
+    def test_not_modified(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+        self.assertEqual(etag, response['ETag'])
+        self.assertEqual(b'', response.content)
+
+    def test_book_write_invalidates(self):
+        list_etag = self.client.get(self.list_url)['ETag']
+        other_etag = self.client.get(reverse('book-detail', args=(self.book_2.id,)))['ETag']
+        self.client.get(self.detail_url)
+
+        self.client.force_login(self.user)
+        data = {'name': 'New book name', 'price': 50, 'author': 'Author 1'}
+        self.client.put(self.detail_url, json.dumps(data), content_type='application/json')
+
+        self.assertEqual('New book name', self.client.get(self.detail_url).data['name'])
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('New book name', response.data[0]['name'])
+        response = self.client.get(reverse('book-detail', args=(self.book_2.id,)),
+                                   HTTP_IF_NONE_MATCH=other_etag)
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+
+    def test_relation_write_invalidates(self):
+        self.client.get(self.detail_url)
+        UserBookRelation.objects.create(user=self.user, book=self.book_1, like=True)
+        self.assertEqual(1, self.client.get(self.detail_url).data['like_count'])
+
+    def test_delete_invalidates(self):
+        self.client.get(self.list_url)
+        self.book_2.delete()
+        self.assertEqual(1, len(self.client.get(self.list_url).data))
+
+    def test_deploy_check(self):
+        self.assertEqual(['store.E001'], [error.id for error in check_response_cache()])
+        shared = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}
+        with override_settings(CACHES={'default': shared}):
+            self.assertEqual([], check_response_cache())
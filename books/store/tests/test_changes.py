@@ -0,0 +1,123 @@
+import unittest
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+
+from store.importer import import_books
+from store.logic import rebuild_counters
+from store.models import Book, BookTombstone, UserBookRelation
+
+
+class BookChangesTestCase(APITransactionTestCase):
+    # Versions are transaction ids on PostgreSQL: each write must commit on its own.
+
+    def setUp(self):
+        self.url = reverse('book-changes')
+        self.user = User.objects.create(username='testuser1')
+        self.books = [Book.objects.create(name=f'Book {i}', price=10, author='Author',
+                                          owner=self.user) for i in range(3)]
+
+    def sync(self, since, **params):
+        response = self.client.get(self.url, {'since': since, **params})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return response.json()
+
+    def changed_ids(self, feed):
+        return [book['id'] for book in feed['changed']]
+
+    def test_initial_sync(self):
+        feed = self.sync(0)
+        self.assertEqual([book.id for book in self.books], self.changed_ids(feed))
+        self.assertEqual([], feed['deleted'])
+        self.assertFalse(feed['has_more'])
+        last = Book.objects.get(pk=self.books[-1].pk)
+        self.assertEqual(f'{last.version}.{last.pk}', feed['token'])
+        self.assertEqual(self.client.get(reverse('book-list')).json(), feed['changed'])
+
+        again = self.sync(feed['token'])
+        self.assertEqual(([], [], feed['token']),
+                         (again['changed'], again['deleted'], again['token']))
+
+    def test_update_like_delete(self):
+        token = self.sync(0)['token']
+        self.client.force_login(self.user)
+        self.client.patch(reverse('book-detail', args=(self.books[1].id,)), {'price': '12.00'},
+                          format='json')
+        feed = self.sync(token)
+        self.assertEqual([self.books[1].id], self.changed_ids(feed))
+        self.assertEqual('12.00', feed['changed'][0]['price'])
+
+        UserBookRelation.objects.create(user=self.user, book=self.books[0], like=True)
+        feed = self.sync(feed['token'], fields='id,like_count,like')
+        self.assertEqual([{'id': self.books[0].id, 'like_count': 1, 'like': True}],
+                         feed['changed'])
+
+        deleted = sorted(book.id for book in (self.books[0], self.books[2]))
+        self.books[2].delete()
+        Book.objects.filter(pk=self.books[0].pk).delete()
+        feed = self.sync(feed['token'])
+        self.assertEqual(([], deleted),
+                         (feed['changed'], sorted(feed['deleted'])))
+        self.assertEqual(2, BookTombstone.objects.count())
+
+    def test_pages(self):
+        Book.objects.filter(pk=self.books[0].pk).delete()
+        self.books[1].save()
+        token, changed, deleted = 0, [], []
+        while True:
+            feed = self.sync(token, limit=1)
+            changed += self.changed_ids(feed)
+            deleted += feed['deleted']
+            token = feed['token']
+            if not feed['has_more']:
+                break
+        self.assertEqual([self.books[2].id, self.books[1].id], changed)
+        self.assertEqual([self.books[0].id], deleted)
+
+    def test_bulk_writes(self):
+        token = self.sync(0)['token']
+        import_books(StringIO('isbn,name,price,author\n0140449175,Anna Karenina,10,Leo Tolstoy\n'),
+                     'csv')
+        feed = self.sync(token)
+        self.assertEqual(['Anna Karenina'], [book['name'] for book in feed['changed']])
+
+        Book.objects.filter(pk=self.books[1].pk).update(likes_count=5)
+        rebuild_counters([self.books[1].pk])
+        feed = self.sync(feed['token'])
+        self.assertEqual([(self.books[1].id, 0)],
+                         [(book['id'], book['like_count']) for book in feed['changed']])
+
+    def test_queries(self):
+        token = self.sync(0)['token']
+        Book.objects.bulk_create([Book(name=f'Bulk {i}', price=1, author='Bulk')
+                                  for i in range(20)])
+        self.books[0].save()
+        # Plus the watermark on PostgreSQL.
+        with self.assertNumQueries(3 if connection.vendor == 'postgresql' else 2):
+            feed = self.sync(token)
+        self.assertEqual([self.books[0].id], self.changed_ids(feed))
+
+    def test_invalid_since(self):
+        for since in ('-1', 'abc', '12', '1.2.3'):
+            response = self.client.get(self.url, {'since': since})
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'versions are transaction ids')
+    def test_open_transaction(self):
+        token = self.sync(0)['token']
+        other = connections.create_connection('default')
+        self.addCleanup(other.close)
+        other.set_autocommit(False)
+        with other.cursor() as cursor:
+            cursor.execute('SELECT txid_current()')
+        book = Book.objects.create(name='Late', price=1, author='Author')
+        response = self.client.get(self.url, {'since': token})
+        self.assertEqual(([], token), (response.json()['changed'], response.json()['token']))
+        self.assertEqual('no-store', response['Cache-Control'])
+
+        other.rollback()
+        self.assertEqual([book.id], self.changed_ids(self.sync(token)))
@@ -0,0 +1,102 @@
+import unittest
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from store.cache import get_cache
+from store.counting import EstimatedCountPaginator, estimated_count
+from store.models import Book, UserBookRelation
+
+
+class EstimatedCountTestCase(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        Book.objects.bulk_create([Book(name=f'Book {i}', price=i % 5, author=f'Author {i % 2}')
+                                  for i in range(30)])
+
+    def test_exact_below_threshold(self):
+        for queryset in (Book.objects.all(), Book.objects.filter(author='Author 1')):
+            self.assertEqual((queryset.count(), True), estimated_count(queryset, threshold=1000))
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'needs planner statistics')
+    def test_planner_estimates(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE store_book')
+        with self.assertNumQueries(1):
+            count, exact = estimated_count(Book.objects.all(), threshold=1)
+        self.assertEqual((30, False), (count, exact))
+        count, exact = estimated_count(Book.objects.filter(author='Author 1'), threshold=1)
+        self.assertFalse(exact)
+        self.assertTrue(0 < count <= 30)
+
+    @unittest.skipIf(connection.vendor == 'postgresql', 'PostgreSQL estimates instead')
+    def test_cached_counts(self):
+        queryset = Book.objects.filter(price__lt=3)
+        self.assertEqual((18, True), estimated_count(queryset, threshold=10))
+        Book.objects.filter(price=0).delete()
+        with self.assertNumQueries(0):
+            self.assertEqual((18, False), estimated_count(queryset, threshold=10))
+        self.assertEqual((12, True), estimated_count(queryset, threshold=100))
+
+    def test_paginator(self):
+        paginator = EstimatedCountPaginator(Book.objects.all(), 10)
+        self.assertEqual((30, 3), (paginator.count, paginator.num_pages))
+        self.assertEqual(4, EstimatedCountPaginator(list(range(4)), 10).count)
+
+
+class PaginationCountTestCase(APITestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        for i in range(5):
+            Book.objects.create(name=f'Book {i}', price=10, author=f'Author {i % 2}')
+
+    def test_count(self):
+        url = reverse('book-list')
+        response = self.client.get(url, {'page_size': 2})
+        self.assertNotIn('count', response.json())
+
+        response = self.client.get(url, {'page_size': 2, 'search': 'Author 0', 'count': 1})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual((3, True), (response.json()['count'], response.json()['count_exact']))
+        self.assertEqual(['next', 'previous', 'count', 'count_exact', 'results'],
+                         list(response.json()))
+
+        response = self.client.get(response.json()['next'])
+        self.assertEqual(3, response.json()['count'])
+
+
+class AdminTestCase(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', password='password')
+        users = [User.objects.create(username=f'testuser{i}') for i in range(3)]
+        books = [Book.objects.create(name=f'Book {i}', price=10, author='Author')
+                 for i in range(3)]
+        for user in users:
+            for book in books:
+                UserBookRelation.objects.create(user=user, book=book, like=True)
+        self.client.force_login(self.admin)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return response, len(queries)
+
+    def test_changelist_queries(self):
+        url = reverse('admin:store_userbookrelation_changelist')
+        self.get(url)
+        queries = self.get(url)[1]
+        UserBookRelation.objects.create(user=self.admin, book=Book.objects.first())
+        response, more_queries = self.get(url)
+        self.assertEqual(queries, more_queries)
+        self.assertContains(response, 'Username: admin book: Book 0')
+        response = self.client.get(reverse('admin:store_book_changelist'))
+        self.assertContains(response, 'Book 2')
@@ -0,0 +1,68 @@
+import csv
+import json
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from store.export import EXPORT_FIELDS
+from store.models import Book, UserBookRelation
+from store.serializers import BookSerializer
+
+
+class BookExportTestCase(APITestCase):
+
+    def setUp(self):
+        self.url = reverse('book-export')
+        user = User.objects.create(username='testuser1')
+        self.book_1 = Book.objects.create(name='Test book 1', price=50.1, author='Author 1')
+        self.book_2 = Book.objects.create(name='Test "book" 2, ёж', price=70, author='Author 2')
+        self.book_3 = Book.objects.create(name='Test book 3', price=40, author='Author 1')
+        UserBookRelation.objects.create(user=user, book=self.book_1, like=True)
+
+    def ndjson(self, response):
+        content = b''.join(response.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def expected(self):
+        return [{field: book[field] for field in EXPORT_FIELDS}
+                for book in BookSerializer(Book.objects.all(), many=True).data]
+
+    def test_ndjson(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+            rows = self.ndjson(response)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('application/x-ndjson', response['Content-Type'])
+        self.assertEqual(self.expected(), rows)
+
+    def test_csv(self):
+        response = self.client.get(self.url, data={'export_format': 'csv'})
+        self.assertEqual('text/csv', response['Content-Type'])
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        expected = [{key: str(value) for key, value in book.items()}
+                    for book in self.expected()]
+        self.assertEqual(expected, rows)
+
+    def test_filters(self):
+        response = self.client.get(self.url, data={'price': 40})
+        self.assertEqual([self.book_3.id], [row['id'] for row in self.ndjson(response)])
+
+        response = self.client.get(self.url, data={'search': 'Author 1', 'ordering': '-price'})
+        self.assertEqual([self.book_1.id, self.book_3.id],
+                         [row['id'] for row in self.ndjson(response)])
+
+    def test_invalid_format(self):
+        response = self.client.get(self.url, data={'export_format': 'xml'})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('export_books', '--query', 'ordering=price', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([self.book_3.id, self.book_1.id, self.book_2.id],
+                         [row['id'] for row in rows])
@@ -0,0 +1,112 @@
+import json
+import unittest
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from store.export import filter_books
+from store.models import Book, BookRatingSummary, UserBookRelation
+
+
+class BookFilterTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='testuser1')
+        self.books = [Book.objects.create(name=f'Book {i}', price=5 + i * 10,
+                                          author=f'{"Ann" if i % 2 else "Bob"} {i % 3}')
+                      for i in range(6)]
+        UserBookRelation.objects.create(user=self.user, book=self.books[1], like=True, rate=5)
+        UserBookRelation.objects.create(user=self.user, book=self.books[2], like=True, rate=2)
+        self.url = reverse('book-list')
+
+    def ids(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(status.HTTP_200_OK, response.status_code, response.content)
+        return [book['id'] for book in response.json()]
+
+    def test_filters(self):
+        books = self.books
+        for params, expected in (
+                ({'min_price': 15, 'max_price': 35}, books[1:4]),
+                ({'min_price': 15, 'max_price': 35, 'ordering': '-price'}, books[3:0:-1]),
+                ({'price': '25.00'}, books[2:3]),
+                ({'author': 'Ann 1'}, [books[1]]),
+                ({'author_prefix': 'Ann'}, books[1::2]),
+                ({'min_likes': 1}, books[1:3]),
+                ({'min_rating': 4}, books[1:2]),
+                ({'author_prefix': 'Bob', 'max_price': 30, 'search': 'book'}, books[0:3:2])):
+            self.assertEqual([book.id for book in expected], self.ids(params), params)
+
+    def test_invalid(self):
+        response = self.client.get(self.url, {'min_price': 'cheap'})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertIn('min_price', response.json())
+
+    def test_facets(self):
+        url = reverse('book-facets')
+        response = self.client.get(url, {'limit': 2})
+        self.assertEqual({
+            'count': 6,
+            'price': [{'min': None, 'max': 10, 'count': 1},
+                      {'min': 10, 'max': 20, 'count': 1},
+                      {'min': 20, 'max': 50, 'count': 3},
+                      {'min': 50, 'max': 100, 'count': 1},
+                      {'min': 100, 'max': None, 'count': 0}],
+            'authors': [{'author': 'Ann 0', 'count': 1}, {'author': 'Ann 1', 'count': 1}],
+        }, response.json())
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'author_prefix': 'Bob', 'ordering': 'price'})
+        self.assertEqual([1, 0, 2, 0, 0], [bucket['count'] for bucket in response.json()['price']])
+        self.assertEqual([{'author': 'Bob 0', 'count': 1}, {'author': 'Bob 1', 'count': 1},
+                          {'author': 'Bob 2', 'count': 1}], response.json()['authors'])
+
+        self.books[0].delete()
+        self.assertEqual(2, self.client.get(url, {'author_prefix': 'Bob'}).json()['count'])
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'checks PostgreSQL plans')
+class BookFilterPlanTestCase(TestCase):
+    """The main filter and ordering combinations are answered from indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Book.objects.bulk_create([Book(name=f'Book {i}', price=i % 100, author=f'Author {i % 30}',
+                                       likes_count=i % 50) for i in range(3000)])
+        BookRatingSummary.objects.bulk_create([BookRatingSummary(book=book, average=book.pk % 5)
+                                               for book in Book.objects.all()])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE store_book')
+            cursor.execute('ANALYZE store_bookratingsummary')
+
+    def plan_nodes(self, queryset):
+        def walk(node):
+            yield node
+            for child in node.get('Plans', ()):
+                yield from walk(child)
+
+        with connection.cursor() as cursor:
+            # Only tells whether an index can answer the query: the table is too small to need one.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return list(walk(json.loads(queryset.explain(format='json'))[0]['Plan']))
+
+    def test_index_scans(self):
+        for query, ordering, index in (
+                ('min_price=10&max_price=30', ('price', 'id'), 'store_book_price_613d0a_idx'),
+                ('author=Author 7', ('price', 'id'), 'store_book_author_6b840a_idx'),
+                ('author=Author 7&min_price=50', ('price', 'id'), 'store_book_author_6b840a_idx'),
+                ('author_prefix=Author 29', (), 'store_book_author_prefix'),
+                ('min_likes=49', (), 'store_book_likes_c_c5d7b3_idx'),
+                ('min_rating=4', ('-average_rating', 'id'), 'store_rating_average_desc')):
+            queryset = filter_books(f'{query}&ordering={",".join(ordering)}').order_by(*ordering)
+            # A page when sorted, the whole match (as the facets read it) otherwise.
+            nodes = self.plan_nodes(queryset[:20] if ordering else queryset)
+            node_types = [node['Node Type'] for node in nodes]
+            self.assertIn(index, [node.get('Index Name') for node in nodes], (query, node_types))
+            self.assertNotIn('Seq Scan', node_types, query)
+            if ordering:
+                self.assertNotIn('Sort', node_types, query)
@@ -0,0 +1,133 @@
+import json
+import os
+import tempfile
+import unittest
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from store.importer import OTHER_OWNER_ERROR, import_books, write_copy
+from store.models import Book, BookRatingSummary
+
+CSV_DATA = '''isbn,name,price,author
+978-0-14-044793-4,War and Peace,12.50,Leo Tolstoy
+0140449175,Anna Karenina,10,Leo Tolstoy
+bad-isbn,Broken,10,Nobody
+9780143105428,No price,,Somebody
+'''
+
+
+class BookImportTestCase(TestCase):
+
+    def test_csv(self):
+        summary = import_books(StringIO(CSV_DATA), 'csv', chunk_size=1)
+        self.assertEqual((4, 2, 2), (summary['processed'], summary['imported'],
+                                     summary['rejected']))
+        self.assertEqual([4, 5], [error['line'] for error in summary['errors']])
+        self.assertIn('isbn', summary['errors'][0]['errors'])
+        self.assertIn('price', summary['errors'][1]['errors'])
+        book = Book.objects.get(isbn='9780140447934')
+        self.assertEqual(('War and Peace', '12.50', 'Leo Tolstoy'),
+                         (book.name, str(book.price), book.author))
+        self.assertEqual(0, book.rating_summary.average)
+
+    def test_upsert(self):
+        owner = User.objects.create(username='publisher')
+        existing = Book.objects.create(name='Old', price=1, author='Old', isbn='0140449175')
+        rows = [
+            {'isbn': '0140449175', 'name': 'Anna Karenina', 'price': '10.00', 'author': 'Tolstoy'},
+            {'isbn': '0140449175', 'name': 'Anna Karenina', 'price': '11.00', 'author': 'Tolstoy'},
+            {'isbn': '9780140447934', 'name': 'War and Peace', 'price': '12', 'author': 'Tolstoy'},
+        ]
+        lines = [json.dumps(row) + '\n' for row in rows] + ['\n', '{broken\n', '[1]\n']
+        for _ in range(2):
+            summary = import_books(lines, 'ndjson', owner=owner)
+            self.assertEqual(2, summary['imported'])
+            self.assertEqual([5, 6], [error['line'] for error in summary['errors']])
+        self.assertEqual(2, Book.objects.count())
+        existing.refresh_from_db()
+        self.assertEqual(('Anna Karenina', '11.00', None),
+                         (existing.name, str(existing.price), existing.owner))
+        self.assertEqual(owner, Book.objects.get(isbn='9780140447934').owner)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'COPY requires PostgreSQL')
+    def test_copy(self):
+        Book.objects.create(name='Old', price=1, author='Old', isbn='0140449175')
+        summary = import_books(StringIO(CSV_DATA), 'csv', chunk_size=1, use_copy=True)
+        self.assertEqual(2, summary['imported'])
+        self.assertEqual('Anna Karenina', Book.objects.get(isbn='0140449175').name)
+        self.assertEqual(2, Book.objects.count())
+        self.assertEqual(2, BookRatingSummary.objects.count())
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'COPY requires PostgreSQL')
+    def test_copy_only_own(self):
+        owner, other = (User.objects.create(username=name) for name in ('owner', 'other'))
+        Book.objects.create(name='Mine', price=1, author='Me', isbn='0140449175', owner=owner)
+        row = {'isbn': '0140449175', 'name': 'Theirs', 'price': '2.00', 'author': 'Them',
+               'version': 1}
+        # Past the check of import_books, as when the book was inserted meanwhile.
+        write_copy(connection, [row], other, only_own=True)
+        self.assertEqual('Mine', Book.objects.get(isbn='0140449175').name)
+        write_copy(connection, [row], owner, only_own=True)
+        self.assertEqual('Theirs', Book.objects.get(isbn='0140449175').name)
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+            file.write(CSV_DATA)
+        self.addCleanup(os.remove, file.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_books', file.name, stdout=out, stderr=err)
+        self.assertIn('2 imported, 2 rejected', out.getvalue())
+        self.assertIn('Line 4', err.getvalue())
+        self.assertEqual(2, Book.objects.count())
+
+
+class BookImportAPITestCase(APITestCase):
+
+    def setUp(self):
+        self.url = reverse('book-import-file')
+        self.user = User.objects.create(username='testuser1')
+
+    def test_import(self):
+        self.client.force_login(self.user)
+        response = self.client.post(self.url, CSV_DATA, content_type='text/csv')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(2, response.data['imported'])
+        self.assertEqual(2, len(response.data['errors']))
+        self.assertEqual(2, Book.objects.filter(owner=self.user).count())
+        self.assertEqual(2, len(self.client.get(reverse('book-list')).data))
+
+    def test_books_of_others(self):
+        other = User.objects.create(username='testuser2')
+        book = Book.objects.create(name='Mine', price=5, author='Me', isbn='0140449175',
+                                   owner=other)
+        self.client.force_login(self.user)
+        response = self.client.post(self.url, CSV_DATA, content_type='text/csv')
+        self.assertEqual((1, 3), (response.data['imported'], response.data['rejected']))
+        self.assertEqual({'line': 3, 'errors': {'isbn': [OTHER_OWNER_ERROR]}},
+                         response.data['errors'][-1])
+        book.refresh_from_db()
+        self.assertEqual(('Mine', '5.00', 'Me', other),
+                         (book.name, str(book.price), book.author, book.owner))
+
+        staff = User.objects.create(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.post(self.url, CSV_DATA, content_type='text/csv')
+        self.assertEqual(2, response.data['imported'])
+        book.refresh_from_db()
+        self.assertEqual(('Anna Karenina', other), (book.name, book.owner))
+
+    def test_unsupported_type(self):
+        self.client.force_login(self.user)
+        response = self.client.post(self.url, '<books/>', content_type='application/xml')
+        self.assertEqual(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, response.status_code)
+
+    def test_anonymous(self):
+        response = self.client.post(self.url, CSV_DATA, content_type='text/csv')
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
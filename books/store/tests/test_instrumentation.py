@@ -0,0 +1,71 @@
+import json
+import re
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from books.instrumentation import QueryBudgetExceeded, registry
+from store.models import Book
+
+BUDGETS = {
+    'QUERY_BUDGETS': {'book-list': 1, 'book-detail': 1, 'userbookrelation-detail': 13},
+    'ON_BUDGET_EXCEEDED': 'raise',
+}
+
+
+class RequestInstrumentationTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.user = User.objects.create(username='testuser1')
+        self.staff = User.objects.create(username='staff', is_staff=True)
+        self.book = Book.objects.create(name='Test book 1', price=50, author='Author 1')
+
+    def server_timing(self, response):
+        return dict(re.findall(r'(\w+);dur=([\d.]+)', response['Server-Timing']))
+
+    def test_server_timing(self):
+        response = self.client.get(reverse('book-list'))
+        timings = self.server_timing(response)
+        self.assertEqual({'db', 'serializer', 'view'}, set(timings))
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+        self.assertLessEqual(float(timings['serializer']), float(timings['view']))
+
+    @override_settings(REQUEST_INSTRUMENTATION=BUDGETS)
+    def test_budgets(self):
+        self.client.get(reverse('book-list'))
+        self.client.get(reverse('book-detail', args=(self.book.id,)))
+        self.client.force_login(self.user)
+        response = self.client.patch(reverse('userbookrelation-detail', args=(self.book.id,)),
+                                     json.dumps({'like': True}), content_type='application/json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    @override_settings(REQUEST_INSTRUMENTATION={'QUERY_BUDGETS': {'book-list': 0},
+                                                'ON_BUDGET_EXCEEDED': 'raise'})
+    def test_budget_exceeded(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('book-list'))
+
+    def test_metrics(self):
+        for _ in range(3):
+            self.client.get(reverse('book-list'), data={'ordering': 'price'})
+            cache.clear()
+        response = self.client.get('/metrics/')
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
+
+        self.client.force_login(self.staff)
+        stats = self.client.get('/metrics/').json()['GET book-list']
+        self.assertEqual(3, stats['count'])
+        self.assertEqual(1, stats['max_queries'])
+        self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+
+        response = self.client.get('/metrics/', data={'format': 'prometheus'})
+        content = response.content.decode()
+        self.assertIn('books_request_duration_seconds_count{method="GET",route="book-list"} 3',
+                      content)
+        self.assertIn('books_request_queries_total{method="GET",route="book-list"} 3', content)
@@ -0,0 +1,189 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+
+from store import logic
+from store.logic import (find_counter_mismatches, lock_relations, rebuild_counters,
+                         rebuild_rating_summaries, upsert_relations)
+from store.models import Book, BookRatingSummary, UserBookRelation
+
+
+class BookCountersTestCase(TestCase):
+
+    def setUp(self):
+        self.user1 = User.objects.create(username='testuser1')
+        self.user2 = User.objects.create(username='testuser2')
+        self.book_1 = Book.objects.create(name='Test book 1', price=50, author='Author 1')
+        self.book_2 = Book.objects.create(name='Test book 2', price=70, author='Author 2')
+
+    def assertCounters(self, book, likes, bookmarks, rating_sum, rating_count):
+        book.refresh_from_db()
+        self.assertEqual((likes, bookmarks, rating_sum, rating_count),
+                         (book.likes_count, book.bookmarks_count,
+                          book.rating_sum, book.rating_count))
+
+    def test_create(self):
+        UserBookRelation.objects.create(user=self.user1, book=self.book_1, like=True, rate=4)
+        UserBookRelation.objects.create(user=self.user2, book=self.book_1,
+                                        in_bookmarks=True, rate=5)
+        self.assertCounters(self.book_1, 1, 1, 9, 2)
+        self.assertEqual(4.5, self.book_1.rating)
+        self.assertCounters(self.book_2, 0, 0, 0, 0)
+        self.assertIsNone(self.book_2.rating)
+
+    def test_update(self):
+        relation = UserBookRelation.objects.create(user=self.user1, book=self.book_1,
+                                                   like=True, rate=2)
+        relation.like = False
+        relation.in_bookmarks = True
+        relation.rate = 5
+        relation.save()
+        self.assertCounters(self.book_1, 0, 1, 5, 1)
+
+        relation.rate = None
+        relation.save()
+        self.assertCounters(self.book_1, 0, 1, 0, 0)
+
+    def test_upsert_created_concurrently(self):
+        lock_relations = logic.lock_relations
+
+        def created_meanwhile(pairs):
+            relations = lock_relations(pairs)
+            if not relations:
+                # Another request creates the relation after this one looked for it.
+                UserBookRelation.objects.create(user=self.user1, book=self.book_1, like=True)
+            return relations
+
+        with mock.patch('store.logic.lock_relations', side_effect=created_meanwhile):
+            relations, created = upsert_relations(self.user1, {self.book_1.id: {'like': True,
+                                                                                 'rate': 4}})
+        self.assertEqual({self.book_1.id}, created)
+        self.assertEqual((True, 4), (relations[self.book_1.id].like,
+                                     relations[self.book_1.id].rate))
+        self.assertCounters(self.book_1, 1, 0, 4, 1)
+
+    def test_move_to_other_book(self):
+        relation = UserBookRelation.objects.create(user=self.user1, book=self.book_1,
+                                                   like=True, rate=3)
+        relation.book = self.book_2
+        relation.save()
+        self.assertCounters(self.book_1, 0, 0, 0, 0)
+        self.assertCounters(self.book_2, 1, 0, 3, 1)
+
+    def test_delete(self):
+        relation = UserBookRelation.objects.create(user=self.user1, book=self.book_1,
+                                                   like=True, rate=3)
+        UserBookRelation.objects.create(user=self.user2, book=self.book_1, like=True)
+        relation.delete()
+        self.assertCounters(self.book_1, 1, 0, 0, 0)
+
+        self.user2.delete()
+        self.assertCounters(self.book_1, 0, 0, 0, 0)
+
+    def test_rebuild(self):
+        UserBookRelation.objects.create(user=self.user1, book=self.book_1, like=True, rate=3)
+        UserBookRelation.objects.create(user=self.user2, book=self.book_1, in_bookmarks=True)
+        Book.objects.update(likes_count=7, bookmarks_count=0, rating_sum=1, rating_count=0)
+        BookRatingSummary.objects.update(average=0)
+        self.assertEqual([self.book_1.id, self.book_2.id],
+                         [book.id for book, stored, actual in find_counter_mismatches()])
+
+        rebuild_counters()
+        self.assertCounters(self.book_1, 1, 1, 3, 1)
+        self.assertEqual(3, BookRatingSummary.objects.get(book=self.book_1).average)
+        self.assertCounters(self.book_2, 0, 0, 0, 0)
+        self.assertEqual([], list(find_counter_mismatches()))
+
+    def test_check_command(self):
+        UserBookRelation.objects.create(user=self.user1, book=self.book_1, like=True)
+        out = StringIO()
+        call_command('check_book_counters', stdout=out)
+        self.assertIn('consistent', out.getvalue())
+
+        Book.objects.filter(pk=self.book_1.pk).update(likes_count=5)
+        with self.assertRaises(CommandError):
+            call_command('check_book_counters', stdout=StringIO())
+        call_command('check_book_counters', '--fix', stdout=StringIO())
+        self.assertCounters(self.book_1, 1, 0, 0, 0)
+
+    def test_rebuild_command(self):
+        UserBookRelation.objects.create(user=self.user1, book=self.book_1, like=True)
+        Book.objects.update(likes_count=0)
+        call_command('rebuild_book_counters', str(self.book_1.id), stdout=StringIO())
+        self.assertCounters(self.book_1, 1, 0, 0, 0)
+
+
+class RatingSummaryTestCase(TestCase):
+
+    def setUp(self):
+        self.users = [User.objects.create(username=f'testuser{i}') for i in range(3)]
+        self.book_1 = Book.objects.create(name='Test book 1', price=50, author='Author 1')
+        self.book_2 = Book.objects.create(name='Test book 2', price=70, author='Author 2')
+
+    def assertSummary(self, book, count, average, histogram):
+        summary = BookRatingSummary.objects.get(book=book)
+        self.assertEqual((count, average, histogram),
+                         (summary.book.rating_count, summary.average,
+                          [summary.histogram()[str(rate)] for rate in range(1, 6)]))
+
+    def test_created_with_book(self):
+        self.assertSummary(self.book_1, 0, 0, [0, 0, 0, 0, 0])
+
+    def test_transitions(self):
+        relation = UserBookRelation.objects.create(user=self.users[0], book=self.book_1, rate=3)
+        UserBookRelation.objects.create(user=self.users[1], book=self.book_1, rate=4)
+        self.assertSummary(self.book_1, 2, 3.5, [0, 0, 1, 1, 0])
+
+        relation.rate = 5
+        relation.save()
+        self.assertSummary(self.book_1, 2, 4.5, [0, 0, 0, 1, 1])
+
+        relation.like = True
+        relation.save()
+        self.assertSummary(self.book_1, 2, 4.5, [0, 0, 0, 1, 1])
+
+        relation.rate = None
+        relation.save()
+        self.assertSummary(self.book_1, 1, 4, [0, 0, 0, 1, 0])
+
+        relation.rate = 1
+        relation.book = self.book_2
+        relation.save()
+        self.assertSummary(self.book_2, 1, 1, [1, 0, 0, 0, 0])
+
+        relation.delete()
+        UserBookRelation.objects.filter(book=self.book_1).delete()
+        self.assertSummary(self.book_1, 0, 0, [0, 0, 0, 0, 0])
+        self.assertSummary(self.book_2, 0, 0, [0, 0, 0, 0, 0])
+
+    def test_upsert(self):
+        UserBookRelation.objects.create(user=self.users[0], book=self.book_1, rate=2)
+        upsert_relations(self.users[0], {self.book_1.id: {'rate': 5}, self.book_2.id: {'rate': 3}})
+        self.assertSummary(self.book_1, 1, 5, [0, 0, 0, 0, 1])
+        self.assertSummary(self.book_2, 1, 3, [0, 0, 1, 0, 0])
+
+    def test_lock_relations(self):
+        for user, book in ((0, self.book_1), (0, self.book_2), (1, self.book_1), (2, self.book_2)):
+            UserBookRelation.objects.create(user=self.users[user], book=book)
+        pairs = [(self.users[0].id, self.book_1.id), (self.users[1].id, self.book_2.id),
+                 (self.users[2].id, self.book_2.id)]
+        with self.assertNumQueries(2):
+            with mock.patch('store.logic.USERS_PER_QUERY', 2):
+                relations = lock_relations(pairs)
+        self.assertEqual([pairs[0], pairs[2]], sorted(relations))
+
+    def test_rebuild(self):
+        for user, rate in zip(self.users, (1, 2, 2)):
+            UserBookRelation.objects.create(user=user, book=self.book_1, rate=rate)
+        BookRatingSummary.objects.filter(book=self.book_1).update(average=5, rate_5=9)
+        BookRatingSummary.objects.filter(book=self.book_2).delete()
+
+        out = StringIO()
+        call_command('rebuild_rating_summaries', stdout=out)
+        self.assertIn('Rebuilt rating summaries for 2 books.', out.getvalue())
+        self.assertSummary(self.book_1, 3, 5 / 3, [1, 2, 0, 0, 0])
+        self.assertSummary(self.book_2, 0, 0, [0, 0, 0, 0, 0])
+        self.assertEqual(1, rebuild_rating_summaries([self.book_2.id]))
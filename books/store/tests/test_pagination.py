@@ -0,0 +1,86 @@
+from django.contrib.auth.models import User
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from store.models import Book, UserBookRelation
+
+
+class KeysetPaginationTestCase(APITestCase):
+
+    def setUp(self):
+        self.url = reverse('book-list')
+        prices = [30, 10, 20, 10, 30, 20, 10]
+        self.books = [Book.objects.create(name=f'Book {i}', price=price, author=f'Author {i % 3}')
+                      for i, price in enumerate(prices)]
+
+    def walk(self, params):
+        ids, response = [], self.client.get(self.url, data=params)
+        while True:
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            ids += [book['id'] for book in response.json()['results']]
+            if response.json()['next'] is None:
+                return ids, response
+            response = self.client.get(response.json()['next'])
+
+    def test_unpaginated_by_default(self):
+        response = self.client.get(self.url)
+        self.assertEqual(len(self.books), len(response.json()))
+
+    def test_pages(self):
+        ids, last = self.walk({'page_size': 3})
+        self.assertEqual([book.id for book in self.books], ids)
+        self.assertEqual(1, len(last.json()['results']))
+
+    def test_ordering_by_rating(self):
+        users = [User.objects.create(username=f'testuser{i}') for i in range(2)]
+        for book, rates in zip(self.books, [(5,), (3, 4), (1,), (4, 3), (), (2, 5), (4,)]):
+            for user, rate in zip(users, rates):
+                UserBookRelation.objects.create(user=user, book=book, rate=rate)
+        # Bulk inserts leave a book without a summary: it sorts as unrated.
+        Book.objects.bulk_create([Book(name='Bulk', price=10, author='Author 0')])
+        for ordering in ('average_rating', '-average_rating'):
+            ids, last = self.walk({'page_size': 2, 'ordering': ordering})
+            expected = Book.objects.annotate(
+                average_rating=Coalesce('rating_summary__average', 0.0)).order_by(ordering, 'id')
+            self.assertEqual(list(expected.values_list('id', flat=True)), ids, ordering)
+            self.assertEqual(len(self.books) + 1, len(ids))
+        self.assertEqual([0.0, None], [book['rating'] and book['rating']['average']
+                                       for book in last.json()['results']])
+
+    def test_ordering_with_tiebreaker(self):
+        for ordering in ('price', '-price', 'author', '-author'):
+            ids, last = self.walk({'page_size': 2, 'ordering': ordering})
+            expected = list(Book.objects.order_by(ordering, 'id').values_list('id', flat=True))
+            self.assertEqual(expected, ids, ordering)
+
+    def test_previous(self):
+        first = self.client.get(self.url, data={'page_size': 3, 'ordering': 'price'})
+        self.assertIsNone(first.json()['previous'])
+        second = self.client.get(first.json()['next'])
+        back = self.client.get(second.json()['previous'])
+        self.assertEqual(first.json()['results'], back.json()['results'])
+        self.assertIsNone(back.json()['previous'])
+        forward = self.client.get(back.json()['next'])
+        self.assertEqual(second.json()['results'], forward.json()['results'])
+
+    def test_page_size_cap(self):
+        Book.objects.bulk_create([Book(name=f'Bulk {i}', price=1, author='Bulk')
+                                  for i in range(120)])
+        response = self.client.get(self.url, data={'page_size': 1000})
+        self.assertEqual(100, len(response.json()['results']))
+
+    def test_constant_queries(self):
+        first = self.client.get(self.url, data={'page_size': 2})
+        with self.assertNumQueries(1):
+            self.client.get(first.json()['next'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, data={'cursor': 'garbage'})
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+        first = self.client.get(self.url, data={'page_size': 2, 'ordering': 'price'})
+        cursor = first.json()['next'].split('cursor=')[1].split('&')[0]
+        response = self.client.get(self.url, data={'cursor': cursor, 'ordering': 'author'})
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
@@ -0,0 +1,86 @@
+import unittest
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from store.models import Book, BookSimilarity, UserBookRelation
+from store.recommendations import build_similarities
+
+try:
+    import numpy
+    import scipy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, 'numpy and scipy are not installed')
+class RecommendationsTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create(username=f'testuser{i}') for i in range(5)]
+        self.books = [Book.objects.create(name=f'Book {i}', price=10, author='Author')
+                      for i in range(5)]
+        for user, books in zip(self.users, ((0, 1), (0, 1, 2), (2, 3), (3,))):
+            for book in books:
+                UserBookRelation.objects.create(user=user, book=self.books[book], like=True)
+        UserBookRelation.objects.create(user=self.users[3], book=self.books[4], rate=5)
+
+    def neighbours(self, book):
+        return [(row.similar_id, round(row.score, 3)) for row in
+                BookSimilarity.objects.filter(book=book).order_by('-score', 'similar_id')]
+
+    def test_build(self):
+        self.assertEqual(5, build_similarities())
+        self.assertEqual([(self.books[1].id, 1.0), (self.books[2].id, 0.5)],
+                         self.neighbours(self.books[0]))
+        self.assertEqual([(self.books[3].id, 0.707)], self.neighbours(self.books[4]))
+
+        build_similarities(top_k=1, memory_mb=0)
+        self.assertEqual([(self.books[1].id, 1.0)], self.neighbours(self.books[0]))
+
+    def test_incremental(self):
+        build_similarities()
+        UserBookRelation.objects.create(user=self.users[4], book=self.books[0], like=True)
+        UserBookRelation.objects.create(user=self.users[4], book=self.books[3], like=True)
+        BookSimilarity.objects.filter(book=self.books[1]).update(score=0.1)
+        out = StringIO()
+        call_command('build_recommendations', '--since-hours', '0.1', stdout=out)
+        self.assertIn('of 5 books', out.getvalue())
+        call_command('build_recommendations', self.books[0].id, stdout=out)
+        self.assertIn('of 1 books', out.getvalue())
+        self.assertEqual([(self.books[1].id, 0.816), (self.books[2].id, 0.408),
+                          (self.books[3].id, 0.333)], self.neighbours(self.books[0]))
+
+    def test_similar_endpoint(self):
+        build_similarities()
+        url = reverse('book-similar', args=(self.books[0].id,))
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([(self.books[1].id, 1.0), (self.books[2].id, 0.5)],
+                         [(book['id'], book['score']) for book in response.json()])
+
+        response = self.client.get(url, data={'limit': 1})
+        self.assertEqual(1, len(response.json()))
+        response = self.client.get(reverse('book-similar', args=(self.books[-1].id + 1,)))
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_recommended_endpoint(self):
+        build_similarities()
+        UserBookRelation.objects.create(user=self.users[4], book=self.books[0], like=True)
+        UserBookRelation.objects.create(user=self.users[4], book=self.books[3], rate=1)
+        url = reverse('userbookrelation-recommended')
+        response = self.client.get(url)
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
+
+        self.client.force_login(self.users[4])
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual([(self.books[1].id, 1.0), (self.books[2].id, 0.5)],
+                         [(book['id'], round(book['score'], 3)) for book in response.json()])
@@ -0,0 +1,82 @@
+import contextvars
+from unittest import mock
+
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from books import db
+from books.db import ReplicaRouter, ReplicaRoutingMiddleware
+from store.models import Book
+
+ROUTING = {'REPLICAS': ['replica'], 'STICKY_SECONDS': 5, 'RETRY_SECONDS': 30}
+
+
+def in_new_context(test):
+    def run(self, *args, **kwargs):
+        return contextvars.Context().run(test, self, *args, **kwargs)
+    return run
+
+
+@override_settings(REPLICA_ROUTING=ROUTING)
+class ReplicaRouterTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        cache.clear()
+        db._unavailable_until.clear()
+
+    @in_new_context
+    @mock.patch('books.db.is_available', return_value=True)
+    def test_reads_from_replica_until_write(self, is_available):
+        self.assertEqual('replica', self.router.db_for_read(Book))
+        self.assertEqual('default', self.router.db_for_write(Book))
+        self.assertEqual('default', self.router.db_for_read(Book))
+
+    @in_new_context
+    @mock.patch('books.db.is_available', return_value=True)
+    def test_instance_hint(self, is_available):
+        book = Book(pk=1)
+        book._state.db = 'default'
+        self.assertEqual('default', self.router.db_for_read(Book, instance=book))
+
+    @in_new_context
+    def test_failover(self):
+        with override_settings(REPLICA_ROUTING={**ROUTING, 'REPLICAS': ['missing']}):
+            with self.assertLogs('books.db', 'WARNING'):
+                self.assertEqual('default', self.router.db_for_read(Book))
+            with mock.patch('books.db.connections') as connections:
+                connections.__getitem__.return_value.in_atomic_block = False
+                self.assertEqual('default', self.router.db_for_read(Book))
+                connections.__getitem__.return_value.ensure_connection.assert_not_called()
+
+    def request(self, method, session_key=None):
+        request = getattr(RequestFactory(), method)('/book/')
+        if session_key:
+            request.COOKIES['sessionid'] = session_key
+        SessionMiddleware(lambda request: None).process_request(request)
+        return request
+
+    @in_new_context
+    @mock.patch('books.db.is_available', return_value=True)
+    def test_sticky_after_write(self, is_available):
+        reads = []
+
+        def view(request):
+            if request.method == 'POST':
+                self.router.db_for_write(Book)
+            reads.append(self.router.db_for_read(Book))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        middleware(self.request('get', 'writer-session'))
+        middleware(self.request('post', 'writer-session'))
+        middleware(self.request('get', 'writer-session'))
+        middleware(self.request('get', 'other-session'))
+        middleware(self.request('get'))
+        self.assertEqual(['replica', 'default', 'default', 'replica', 'replica'], reads)
+
+        cache.clear()
+        middleware(self.request('get', 'writer-session'))
+        self.assertEqual('replica', reads[-1])
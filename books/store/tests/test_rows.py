@@ -0,0 +1,149 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.permissions import BasePermission
+from rest_framework.test import APITestCase
+
+from store.cache import get_cache
+from store.models import Book, BookRatingSummary, UserBookRelation
+from store.rows import BookRows, decimal_converter
+from store.serializers import BookSerializer
+from store.views import BookViewSet
+
+
+class FastReadTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='testuser1')
+        other = User.objects.create(username='testuser2')
+        self.books = [
+            Book.objects.create(name='Plain', price=Decimal('12.30'), author='Author 1'),
+            Book.objects.create(name='Ünïcode “quotes”   \\ "x" \x01', price=0,
+                                author='Автор 2', owner=self.user),
+            Book.objects.create(name='No summary', price=Decimal('99999.99'), author='Author 3'),
+            Book.objects.create(name='Rated', price=Decimal('7.5'), author='Author 1'),
+        ]
+        BookRatingSummary.objects.filter(book=self.books[2]).delete()
+        UserBookRelation.objects.create(user=self.user, book=self.books[0], like=True, rate=4)
+        UserBookRelation.objects.create(user=self.user, book=self.books[1], in_bookmarks=True)
+        UserBookRelation.objects.create(user=other, book=self.books[0], rate=1)
+        UserBookRelation.objects.create(user=other, book=self.books[3], like=True, rate=5)
+
+    def get(self, url, params=None):
+        get_cache().clear()
+        fast = self.client.get(url, params)
+        get_cache().clear()
+        with mock.patch.object(BookViewSet, 'fast_read', False):
+            slow = self.client.get(url, params)
+        self.assertEqual(slow.status_code, fast.status_code)
+        self.assertEqual(slow['Content-Type'], fast['Content-Type'])
+        self.assertEqual(slow.content, fast.content)
+        return fast
+
+    def test_list(self):
+        url = reverse('book-list')
+        for params in ({}, {'ordering': '-average_rating'}, {'ordering': 'price'},
+                       {'search': 'author'}, {'price': '12.30'}):
+            self.get(url, params)
+            self.client.force_login(self.user)
+            self.get(url, params)
+            self.client.logout()
+
+    def test_pages(self):
+        self.client.force_login(self.user)
+        params = {'page_size': 1, 'ordering': 'average_rating'}
+        response = self.get(reverse('book-list'), params)
+        while response.json()['next']:
+            response = self.get(response.json()['next'])
+        self.assertIsNotNone(response.json()['previous'])
+
+    def test_retrieve(self):
+        self.client.force_login(self.user)
+        for book in self.books:
+            response = self.get(reverse('book-detail', args=(book.id,)))
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+        response = self.get(reverse('book-detail', args=(self.books[-1].id + 1,)))
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_object_permissions(self):
+        class OwnedOrRated(BasePermission):
+            def has_object_permission(self, request, view, obj):
+                # A selected column, then a deferred one.
+                return obj.owner_id is not None or obj.name == 'Rated'
+
+        get_cache().clear()
+        with mock.patch.object(BookViewSet, 'permission_classes', [OwnedOrRated]):
+            for name in ('book-detail', 'async-book-detail'):
+                for book, expected in ((self.books[0], status.HTTP_403_FORBIDDEN),
+                                       (self.books[1], status.HTTP_200_OK),
+                                       (self.books[3], status.HTTP_200_OK)):
+                    response = self.client.get(reverse(name, args=(book.id,)),
+                                               {'fields': 'id'})
+                    self.assertEqual(expected, response.status_code, (name, book.name))
+
+    def test_skips_serializer(self):
+        with mock.patch.object(BookSerializer, 'to_representation') as to_representation:
+            response = self.client.get(reverse('book-list'))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(len(self.books), len(response.json()))
+        to_representation.assert_not_called()
+
+    def test_fields(self):
+        row = BookRows().values(Book.objects.filter(pk=self.books[0].pk)).get()
+        self.assertEqual(list(BookSerializer.Meta.fields), list(BookRows().to_representation(row)))
+
+    def test_decimal_converter(self):
+        field = BookSerializer().fields['price']
+        convert = decimal_converter(field)
+        for value in (Decimal('12.30'), Decimal('12.3'), Decimal('0'), Decimal('1E+2'), 5, 7.25):
+            self.assertEqual(field.to_representation(value), convert(value))
+
+    def test_sparse_fields(self):
+        url = reverse('book-list')
+        self.client.force_login(self.user)
+        for params, fields in (({'fields': 'name,id,price'}, ['id', 'name', 'price']),
+                               ({'fields': 'rate, rating'}, ['rate', 'rating']),
+                               ({'exclude': 'rating,like,in_bookmarks,rate,annotated_likes'},
+                                ['id', 'name', 'price', 'author', 'like_count']),
+                               ({'fields': 'id,price', 'exclude': 'price',
+                                 'ordering': '-average_rating', 'page_size': 2}, ['id'])):
+            response = self.get(url, params)
+            results = response.json()
+            results = results['results'] if 'results' in results else results
+            self.assertEqual([fields] * len(results), [list(book) for book in results])
+        response = self.get(reverse('book-detail', args=(self.books[0].id,)), {'fields': 'rate'})
+        self.assertEqual({'rate': 4}, response.json())
+
+    def test_unknown_field(self):
+        response = self.client.get(reverse('book-list'), {'fields': 'id,owner', 'exclude': 'x'})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertEqual({'fields': ['Unknown fields: owner.']}, response.json())
+
+    def test_sparse_columns(self):
+        self.client.force_login(self.user)
+        for fast_read in (True, False):
+            get_cache().clear()
+            with mock.patch.object(BookViewSet, 'fast_read', fast_read):
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(reverse('book-list'), {'fields': 'id,name', 'ordering': 'price',
+                                                           'page_size': 2})
+            sql = queries.captured_queries[-1]['sql']
+            for column in ('name', 'price'):
+                self.assertIn(f'"store_book"."{column}"', sql)
+            for column in ('author', 'likes_count', 'store_bookratingsummary',
+                           'store_userbookrelation'):
+                self.assertNotIn(column, sql)
+
+    def test_sparse_cache_key(self):
+        url = reverse('book-list')
+        self.client.get(url, {'fields': 'name,id'})
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'fields': 'id, name,'})
+        self.assertEqual(['id', 'name'], list(response.json()[0]))
+        response = self.client.get(url)
+        self.assertEqual(list(BookSerializer.Meta.fields), list(response.json()[0]))
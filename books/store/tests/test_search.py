@@ -0,0 +1,48 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from store.models import Book
+
+
+class BookSearchTestCase(APITestCase):
+
+    def setUp(self):
+        self.url = reverse('book-list')
+        self.book_1 = Book.objects.create(name='War and Peace', price=50, author='Leo Tolstoy')
+        self.book_2 = Book.objects.create(name='Anna Karenina', price=40, author='Leo Tolstoy')
+        self.book_3 = Book.objects.create(name='The Death of Ivan Ilyich', price=30,
+                                          author='Tolstoy')
+        self.book_4 = Book.objects.create(name='Peace Talks', price=20, author='Jim Butcher')
+
+    def search(self, term, **params):
+        response = self.client.get(self.url, data={'search': term, **params})
+        return [book['id'] for book in response.json()]
+
+    def test_prefix(self):
+        self.assertEqual({self.book_1.id, self.book_4.id}, set(self.search('pea')))
+        self.assertEqual({self.book_1.id, self.book_2.id}, set(self.search('leo tol')))
+        self.assertEqual([], self.search('tolstoy butcher'))
+
+    def test_ranked(self):
+        Book.objects.create(name='Tolstoy', price=10, author='Tolstoy')
+        self.assertEqual(Book.objects.get(name='Tolstoy').id, self.search('tolstoy')[0])
+
+    def test_ordering_overrides_rank(self):
+        self.assertEqual([self.book_3.id, self.book_2.id, self.book_1.id],
+                         self.search('tolstoy', ordering='price'))
+
+    def test_index_follows_writes(self):
+        self.book_4.name = 'Storm Front'
+        self.book_4.save()
+        Book.objects.bulk_create([Book(name='Peace Corps', price=10, author='Anon')])
+        self.book_1.delete()
+        self.assertEqual([Book.objects.get(name='Peace Corps').id], self.search('peace'))
+        self.assertEqual([self.book_4.id], self.search('storm'))
+
+    def test_paginated(self):
+        response = self.client.get(self.url, data={'search': 'tolstoy', 'page_size': 2})
+        ids = [book['id'] for book in response.json()['results']]
+        response = self.client.get(response.json()['next'])
+        ids += [book['id'] for book in response.json()['results']]
+        self.assertEqual(set(self.search('tolstoy')), set(ids))
+        self.assertEqual(self.search('tolstoy'), ids)
@@ -16,9 +16,9 @@ class BookSerializerTestCase(TestCase):
         UserBookRelation.objects.create(user=user1, book=book_1, like=True)
         UserBookRelation.objects.create(user=user2, book=book_1, like=True)
         UserBookRelation.objects.create(user=user3, book=book_1, like=True)
-        UserBookRelation.objects.create(user=user1, book=book_2, like=True)
+        UserBookRelation.objects.create(user=user1, book=book_2, like=True, rate=5)
         UserBookRelation.objects.create(user=user2, book=book_2, like=True)
-        UserBookRelation.objects.create(user=user3, book=book_2, like=False)
+        UserBookRelation.objects.create(user=user3, book=book_2, like=False, rate=4)
         books = Book.objects.all().annotate(
             annotated_likes=Count(Case(When(userbookrelation__like=True, then=1)))).order_by('id')
         serializer_data = BookSerializer(books, many=True).data
@@ -29,7 +29,15 @@ class BookSerializerTestCase(TestCase):
                 'price': '50.10',
                 'author': "Author_1",
                 'like_count': 3,
-                'annotated_likes': 3
+                'annotated_likes': 3,
+                'like': None,
+                'in_bookmarks': None,
+                'rate': None,
+                'rating': {
+                    'count': 0,
+                    'average': 0.0,
+                    'histogram': {'1': 0, '2': 0, '3': 0, '4': 0, '5': 0},
+                },
             },
             {
                 'id': book_2.id,
@@ -37,7 +45,15 @@ class BookSerializerTestCase(TestCase):
                 'price': '110.12',
                 'author': "Author_2",
                 'like_count': 2,
-                'annotated_likes': 2
+                'annotated_likes': 2,
+                'like': None,
+                'in_bookmarks': None,
+                'rate': None,
+                'rating': {
+                    'count': 2,
+                    'average': 4.5,
+                    'histogram': {'1': 0, '2': 0, '3': 0, '4': 1, '5': 1},
+                },
             },
         ]
         self.assertEqual(serializer_data, expected_data)
\ No newline at end of file
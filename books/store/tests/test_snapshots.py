@@ -0,0 +1,116 @@
+import gzip
+import json
+import tempfile
+import unittest
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from store.models import Book, UserBookRelation
+from store.snapshots import brotli, build_snapshots, choose_encoding
+
+
+class SnapshotTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings = override_settings(STORE_SNAPSHOT_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create(username='testuser1')
+        self.books = [Book.objects.create(name=f'Book {i}', price=10 + i % 3,
+                                          author=f'Author {i % 2}', owner=self.user)
+                      for i in range(5)]
+        UserBookRelation.objects.create(user=self.user, book=self.books[1], like=True, rate=4)
+        self.url = reverse('book-list')
+
+    def live(self, params=None):
+        with self.settings(STORE_SNAPSHOT_DIR=None):
+            return self.client.get(self.url, params)
+
+    def test_served(self):
+        expected = {ordering: self.live({'ordering': ordering} if ordering else None)
+                    for ordering in (None, 'price', 'author')}
+        self.assertEqual(['books', 'books-price', 'books-author'], build_snapshots())
+        for ordering, live in expected.items():
+            params = {'ordering': ordering} if ordering else None
+            with self.assertNumQueries(0):
+                response = self.client.get(self.url, params, HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+            self.assertEqual('gzip', response['Content-Encoding'])
+            self.assertEqual('application/json', response['Content-Type'])
+            self.assertIn('Accept-Encoding', response['Vary'])
+            self.assertEqual(live['ETag'], response['ETag'])
+            self.assertEqual(live.content,
+                             gzip.decompress(b''.join(response.streaming_content)))
+
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(expected[None].content, b''.join(response.streaming_content))
+
+    @unittest.skipUnless(brotli, 'brotli is not installed')
+    def test_brotli(self):
+        build_snapshots()
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual('br', response['Content-Encoding'])
+        self.assertEqual(self.live().content,
+                         brotli.decompress(b''.join(response.streaming_content)))
+
+    def test_not_modified(self):
+        build_snapshots()
+        etag = self.live()['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+
+    def test_other_requests(self):
+        build_snapshots()
+        for params in ({'ordering': '-price'}, {'page_size': 2}, {'fields': 'id'},
+                       {'ordering': 'price', 'search': 'book'}):
+            response = self.client.get(self.url, params, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertFalse(response.has_header('Content-Encoding'), params)
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertTrue(response.json()[1]['like'])
+
+    def test_rebuilt_on_change(self):
+        build_snapshots()
+        first = set(self.directory.iterdir())
+        self.books[0].name = 'Renamed'
+        self.books[0].save()
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual('Renamed', response.json()[0]['name'])
+
+        UserBookRelation.objects.create(user=self.user, book=self.books[0], like=True)
+        self.assertEqual(3, len(build_snapshots()))
+        self.assertEqual([], build_snapshots())
+        self.assertFalse(first & set(self.directory.iterdir()))
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        books = json.loads(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual(('Renamed', 1), (books[0]['name'], books[0]['like_count']))
+
+    def test_command(self):
+        out = StringIO()
+        call_command('build_snapshots', stdout=out)
+        call_command('build_snapshots', stdout=out)
+        self.assertEqual('Built books, books-price, books-author.\nSnapshots are up to date.\n',
+                         out.getvalue())
+
+    def test_choose_encoding(self):
+        available = {'identity': 'a', 'gzip': 'b', 'br': 'c'}
+        for header, expected in (('', 'identity'), ('gzip', 'gzip'), ('br, gzip', 'br'),
+                                 ('gzip;q=0.5, br;q=0', 'gzip'), ('*', 'br'),
+                                 ('*;q=0', 'identity'), ('identity', 'identity')):
+            self.assertEqual(expected, choose_encoding(header, available), header)
+        self.assertEqual('gzip', choose_encoding('br, gzip', {'identity': 'a', 'gzip': 'b'}))
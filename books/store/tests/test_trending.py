@@ -0,0 +1,80 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from store.models import Book, BookEvent, TrendingScore, UserBookRelation
+from store.trending import refresh_trending
+
+
+class TrendingTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create(username=f'testuser{i}') for i in range(3)]
+        self.books = [Book.objects.create(name=f'Book {i}', price=10, author='Author')
+                      for i in range(4)]
+        self.url = reverse('book-trending')
+
+    def age_events(self, book, **delta):
+        BookEvent.objects.filter(book=book).update(created_at=timezone.now() - timedelta(**delta))
+
+    def test_events(self):
+        relation = UserBookRelation.objects.create(user=self.users[0], book=self.books[0],
+                                                   like=True, rate=4)
+        relation.rate = 5
+        relation.like = False
+        relation.save()
+        self.assertEqual(
+            [('like', 1), ('rate', 1), ('like', -1), ('rate', 1)],
+            list(BookEvent.objects.order_by('id').values_list('kind', 'weight')))
+
+    def test_refresh(self):
+        for user in self.users:
+            UserBookRelation.objects.create(user=user, book=self.books[0], like=True)
+        UserBookRelation.objects.create(user=self.users[0], book=self.books[1], in_bookmarks=True)
+        UserBookRelation.objects.create(user=self.users[0], book=self.books[2], like=True)
+        UserBookRelation.objects.create(user=self.users[1], book=self.books[3],
+                                        like=True, in_bookmarks=True)
+        self.age_events(self.books[0], days=3)
+        self.age_events(self.books[3], days=40)
+
+        self.assertEqual({'day': 2, 'week': 3, 'month': 3}, refresh_trending())
+        day = TrendingScore.objects.filter(window='day').order_by('-score')
+        self.assertEqual([self.books[1].id, self.books[2].id], [row.book_id for row in day])
+        self.assertAlmostEqual(2.0, day[0].score, places=3)
+        week = TrendingScore.objects.filter(window='week').order_by('-score')
+        self.assertEqual([self.books[1].id, self.books[0].id, self.books[2].id],
+                         [row.book_id for row in week])
+        self.assertAlmostEqual(3 * 0.5 ** 1.5, week[1].score, places=3)
+        self.assertFalse(BookEvent.objects.filter(book=self.books[3]).exists())
+
+    def test_endpoint(self):
+        UserBookRelation.objects.create(user=self.users[0], book=self.books[2], like=True,
+                                        in_bookmarks=True)
+        UserBookRelation.objects.create(user=self.users[0], book=self.books[1], like=True)
+        response = self.client.get(self.url)
+        self.assertEqual([], response.json())
+
+        call_command('refresh_trending', stdout=StringIO())
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, data={'window': 'day', 'limit': 1})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([self.books[2].id], [row['book']['id'] for row in response.json()])
+        self.assertEqual('Book 2', response.json()[0]['book']['name'])
+
+        response = self.client.get(self.url)
+        self.assertEqual([self.books[2].id, self.books[1].id],
+                         [row['book']['id'] for row in response.json()])
+
+    def test_invalid_params(self):
+        response = self.client.get(self.url, data={'window': 'year'})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        response = self.client.get(self.url, data={'limit': 'x'})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
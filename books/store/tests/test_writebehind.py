@@ -0,0 +1,176 @@
+import threading
+import time
+import unittest
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from store.cache import get_cache
+from store.logic import find_counter_mismatches
+from store.models import Book, PendingRelationChange, UserBookRelation
+from store.writebehind import (LOCK_NAMESPACE, PENDING_KEY, flush_pending_for,
+                               flush_relation_changes)
+
+
+@override_settings(STORE_RELATION_WRITE_BEHIND=True)
+class WriteBehindTestCase(APITestCase):
+
+    def setUp(self):
+        self.users = [User.objects.create(username=f'testuser{i}') for i in range(3)]
+        self.books = [Book.objects.create(name=f'Book {i}', price=10, author='Author')
+                      for i in range(2)]
+
+    def patch(self, user, book, data):
+        self.client.force_login(user)
+        return self.client.patch(reverse('userbookrelation-detail', args=(book.id,)), data,
+                                 format='json')
+
+    def test_buffered(self):
+        self.client.force_login(self.users[0])
+        url = reverse('userbookrelation-detail', args=(self.books[0].id,))
+        self.client.get(reverse('userbookrelation-likes'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(url, {'like': True, 'rate': 4}, format='json')
+        self.assertEqual(status.HTTP_202_ACCEPTED, response.status_code)
+        self.assertEqual({'book': self.books[0].id, 'like': True, 'rate': 4}, response.json())
+        self.assertEqual(['SELECT', 'INSERT'], [query['sql'].split()[0] for query in queries])
+        self.assertFalse(UserBookRelation.objects.exists())
+        self.assertEqual(0, Book.objects.get(pk=self.books[0].pk).likes_count)
+
+    def test_invalid(self):
+        self.client.force_login(self.users[0])
+        response = self.client.patch(reverse('userbookrelation-detail', args=('abc',)),
+                                     {'like': True}, format='json')
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+        # As without write-behind, rather than a 202 the flusher would drop.
+        response = self.client.patch(reverse('userbookrelation-detail', args=(10 ** 9,)),
+                                     {'like': True}, format='json')
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+        response = self.patch(self.users[0], self.books[0], {'rate': 9})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertFalse(PendingRelationChange.objects.exists())
+
+    def test_flush_coalesces(self):
+        for data in ({'like': True}, {'like': False}, {'in_bookmarks': True}, {'like': True}):
+            self.patch(self.users[0], self.books[0], data)
+        self.patch(self.users[1], self.books[0], {'like': True, 'rate': 5})
+        self.patch(self.users[1], self.books[1], {'rate': 3})
+        self.patch(self.users[2], self.books[0], {'like': True})
+        UserBookRelation.objects.create(user=self.users[2], book=self.books[1], like=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(7, flush_relation_changes())
+        book_updates = [query for query in queries
+                        if query['sql'].startswith('UPDATE "store_book" ')]
+        self.assertEqual(1, len(book_updates))
+        self.assertFalse(PendingRelationChange.objects.exists())
+        self.assertEqual(0, flush_relation_changes())
+
+        relations = UserBookRelation.objects.order_by('user', 'book').values_list(
+            'user', 'book', 'like', 'in_bookmarks', 'rate')
+        self.assertEqual([
+            (self.users[0].id, self.books[0].id, True, True, None),
+            (self.users[1].id, self.books[0].id, True, False, 5),
+            (self.users[1].id, self.books[1].id, False, False, 3),
+            (self.users[2].id, self.books[0].id, True, False, None),
+            (self.users[2].id, self.books[1].id, True, False, None),
+        ], list(relations))
+        self.assertEqual([3, 1], [book.likes_count for book in Book.objects.order_by('id')])
+        self.assertEqual([], list(find_counter_mismatches()))
+
+    def test_dropped(self):
+        self.patch(self.users[0], self.books[0], {'like': True})
+        self.patch(self.users[1], self.books[1], {'like': True})
+        self.books[0].delete()
+        self.users[1].delete()
+        self.assertEqual(2, flush_relation_changes())
+        self.assertFalse(UserBookRelation.objects.exists())
+
+    def test_read_own_writes(self):
+        self.patch(self.users[1], self.books[0], {'like': True})
+        self.patch(self.users[0], self.books[0], {'like': True, 'in_bookmarks': True})
+        response = self.client.get(reverse('book-detail', args=(self.books[0].id,)),
+                                   {'fields': 'like,in_bookmarks,like_count'})
+        self.assertEqual({'like_count': 1, 'like': True, 'in_bookmarks': True}, response.json())
+        self.assertEqual([self.users[1].id], list(
+            PendingRelationChange.objects.values_list('user_id', flat=True)))
+
+        self.patch(self.users[1], self.books[1], {'in_bookmarks': True})
+        self.patch(self.users[0], self.books[1], {'in_bookmarks': True})
+        response = self.client.get(reverse('userbookrelation-bookmarks'))
+        self.assertEqual([self.books[1].id, self.books[0].id],
+                         [item['book']['id'] for item in response.json()['results']])
+        self.assertEqual([self.users[0].id], list(
+            UserBookRelation.objects.filter(book=self.books[1]).values_list('user', flat=True)))
+        self.assertEqual(2, PendingRelationChange.objects.count())
+
+    def test_mark_evicted(self):
+        self.patch(self.users[0], self.books[0], {'like': True})
+        get_cache().delete(PENDING_KEY.format(self.users[0].pk))
+        response = self.client.get(reverse('book-detail', args=(self.books[0].id,)),
+                                   {'fields': 'like,like_count'})
+        self.assertEqual({'like_count': 1, 'like': True}, response.json())
+        self.assertFalse(PendingRelationChange.objects.exists())
+
+        # Nothing pending: the query, then no flush.
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(0, flush_pending_for(self.users[0]))
+        self.assertEqual(1, len(queries))
+
+    @mock.patch('store.writebehind.use_primary')
+    def test_flush_reads_from_primary(self, use_primary):
+        self.client.force_login(self.users[0])
+        self.client.get(reverse('userbookrelation-likes'))
+        use_primary.assert_not_called()
+        self.patch(self.users[0], self.books[0], {'like': True})
+        self.client.get(reverse('userbookrelation-likes'))
+        use_primary.assert_called_once_with(sticky=True)
+
+    def test_gauges(self):
+        self.patch(self.users[0], self.books[0], {'like': True})
+        self.patch(self.users[0], self.books[1], {'like': True})
+        staff = User.objects.create(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        gauges = self.client.get('/metrics/').json()['gauges']
+        self.assertEqual(2, gauges['relation_buffer_depth'])
+        self.assertGreaterEqual(gauges['relation_buffer_lag_seconds'], 0)
+        content = self.client.get('/metrics/', {'format': 'prometheus'}).content.decode()
+        self.assertIn('# TYPE books_relation_buffer_depth gauge\nbooks_relation_buffer_depth 2',
+                      content)
+
+        out = StringIO()
+        call_command('flush_relation_changes', stdout=out)
+        self.assertIn('2 changes applied, 0 pending', out.getvalue())
+        self.assertEqual(0, self.client.get('/metrics/').json()['gauges']['relation_buffer_depth'])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'advisory locks')
+    def test_user_locked_by_other_flusher(self):
+        self.patch(self.users[0], self.books[0], {'like': True})
+        self.patch(self.users[1], self.books[0], {'like': True})
+        other = connections.create_connection('default')
+        other.inc_thread_sharing()
+        self.addCleanup(other.close)
+        other.set_autocommit(False)
+        with other.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, hashint8(%s::bigint))',
+                           [LOCK_NAMESPACE, self.users[0].pk])
+
+        self.assertEqual(1, flush_relation_changes())
+        self.assertEqual([self.users[0].id], list(
+            PendingRelationChange.objects.values_list('user_id', flat=True)))
+
+        # The user's own flush waits for the other flusher instead of skipping.
+        timer = threading.Timer(0.2, other.rollback)
+        timer.start()
+        self.addCleanup(timer.join)
+        start = time.monotonic()
+        self.assertEqual(1, flush_relation_changes(user_id=self.users[0].pk))
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        self.assertEqual(2, Book.objects.get(pk=self.books[0].pk).likes_count)
@@ -0,0 +1,84 @@
+"""Time-decayed trending scores.
+
+Relation changes append ``BookEvent`` rows (``store.logic.record_events``).
+``refresh_trending``, run periodically by the ``refresh_trending`` command,
+folds the events of every window into at most ``LEADERBOARD_SIZE``
+``TrendingScore`` rows per window. An event counts
+``KIND_WEIGHTS[kind] * weight`` halved every ``half_life`` of its window, so
+reading the top N books is an index range scan of N rows.
+"""
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from store.cache import invalidate_trending
+from store.models import Book, BookEvent, TrendingScore
+
+WINDOWS = {
+    'day': (timedelta(days=1), timedelta(hours=6)),
+    'week': (timedelta(days=7), timedelta(days=2)),
+    'month': (timedelta(days=30), timedelta(days=7)),
+}
+DEFAULT_WINDOW = 'week'
+KIND_WEIGHTS = {
+    BookEvent.LIKE: 1.0,
+    BookEvent.BOOKMARK: 2.0,
+    BookEvent.RATE: 1.5,
+}
+LEADERBOARD_SIZE = 1000
+BATCH_SIZE = 2000
+
+
+def compute_scores(windows, now):
+    """Return ``{window: {book_id: score}}`` from one pass over the events."""
+    longest = max(WINDOWS[window][0] for window in windows)
+    events = (BookEvent.objects.filter(created_at__gt=now - longest, created_at__lte=now)
+              .values_list('book_id', 'kind', 'weight', 'created_at'))
+    limits = [(window, WINDOWS[window][0].total_seconds(), WINDOWS[window][1].total_seconds())
+              for window in windows]
+    scores = {window: defaultdict(float) for window in windows}
+    for book_id, kind, weight, created_at in events.iterator(chunk_size=BATCH_SIZE):
+        age = (now - created_at).total_seconds()
+        for window, span, half_life in limits:
+            if age < span:
+                scores[window][book_id] += KIND_WEIGHTS[kind] * weight * 0.5 ** (age / half_life)
+    return scores
+
+
+def refresh_trending(windows=None, now=None, size=LEADERBOARD_SIZE, prune=True):
+    """Recompute the leaderboards of ``windows`` (default: all) as of ``now``.
+
+    Returns the number of books ranked per window. With ``prune``, events
+    older than the longest window are deleted.
+    """
+    windows = list(windows or WINDOWS)
+    now = now or timezone.now()
+    scores = compute_scores(windows, now)
+    leaders = {window: heapq.nlargest(size, ((score, -book_id) for book_id, score
+                                             in scores[window].items() if score > 0))
+               for window in windows}
+    book_ids = {-book_id for leader in leaders.values() for score, book_id in leader}
+    existing = set(Book.objects.filter(pk__in=book_ids).values_list('pk', flat=True))
+
+    ranked = {}
+    with transaction.atomic():
+        for window, leader in leaders.items():
+            TrendingScore.objects.filter(window=window).delete()
+            rows = [TrendingScore(window=window, book_id=-book_id, score=score, refreshed_at=now)
+                    for score, book_id in leader if -book_id in existing]
+            TrendingScore.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+            ranked[window] = len(rows)
+        if prune:
+            longest = max(span for span, half_life in WINDOWS.values())
+            BookEvent.objects.filter(created_at__lte=now - longest).delete()
+        invalidate_trending()
+    return ranked
+
+
+def top_books(window, limit):
+    return (TrendingScore.objects.filter(window=window)
+            .select_related('book', 'book__rating_summary')
+            .order_by('-score', 'book_id')[:limit])
@@ -1,41 +1,270 @@
-from django.db.models import Count, Case, When
-from django.shortcuts import render
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.db.models import F, FilteredRelation, Q
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, UnsupportedMediaType, ValidationError
 from rest_framework.mixins import UpdateModelMixin
+from rest_framework.pagination import _positive_int
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, GenericViewSet
+from .async_views import AsyncReadMixin
+from .cache import (LIST_GENERATION_KEY, RECOMMENDATIONS_GENERATION_KEY, TRENDING_GENERATION_KEY,
+                    CachedResponseMixin, normalized_query)
+from .changes import changes_since, parse_token
+from .export import EXPORT_CONTENT_TYPES, export_books
+from .filters import BookFilter, BookOrderingFilter, book_facets
+from .importer import IMPORT_CONTENT_TYPES, import_books
+from .logic import upsert_relations
 from .models import *
+from .pagination import KeysetPagination, LibraryPagination
 from .permissions import IsOwnerOrStaffOrReadOnly
-from .serializers import BookSerializer, UserBookRelationSerializer
+from .recommendations import recommended_for, similar_to
+from .rows import PERSONAL_COLUMNS, FastReadMixin
+from .search import BookSearchFilter
+from .serializers import (BookSerializer, LibrarySerializer, ScoredBookSerializer,
+                          TrendingSerializer, UserBookRelationBatchSerializer,
+                          UserBookRelationSerializer)
+from .snapshots import SnapshotMixin
+from .trending import DEFAULT_WINDOW, WINDOWS, top_books
+from .writebehind import PendingChangesMixin, buffer_relation_change, write_behind_enabled
+
 
+def top_limit(request, default=20, maximum=100):
+    try:
+        return _positive_int(request.query_params.get('limit', default),
+                             strict=True, cutoff=maximum)
+    except ValueError:
+        raise ValidationError({'limit': ['A positive integer is required.']})
 
-class BookViewSet(ModelViewSet):
-    queryset = Book.objects.all().annotate(
-        annotated_likes=Count(Case(When(userbookrelation__like=True, then=1))))
+
+class BookViewSet(PendingChangesMixin, SnapshotMixin, CachedResponseMixin, FastReadMixin,
+                  AsyncReadMixin, ModelViewSet):
+    queryset = Book.objects.select_related('rating_summary')
     serializer_class = BookSerializer
     permission_classes = [IsOwnerOrStaffOrReadOnly]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filter_fields = ['price']
+    filter_backends = [DjangoFilterBackend, BookSearchFilter, BookOrderingFilter]
+    lookup_value_regex = r'\d+'
+    filterset_class = BookFilter
     search_fields = ['name', 'author']
-    ordering_fields = ['price', 'author']
+    ordering_fields = ['price', 'author', 'average_rating']
+    pagination_class = KeysetPagination
+    read_actions = FastReadMixin.read_actions + ('changes',)
+    max_import_errors = 1000
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.selected_fields()
+        if 'rating' not in fields:
+            queryset = queryset.select_related(None)
+        user = self.request.user
+        if (self.action == 'export' or not user.is_authenticated
+                or not set(fields) & set(PERSONAL_COLUMNS)):
+            return queryset
+        # The unique (user, book) constraint makes this a to-one LEFT JOIN.
+        return queryset.annotate(
+            user_relation=FilteredRelation('userbookrelation',
+                                           condition=Q(userbookrelation__user=user)),
+            user_like=F('user_relation__like'),
+            user_in_bookmarks=F('user_relation__in_bookmarks'),
+            user_rate=F('user_relation__rate'))
+
+    def get_cache_query(self, request):
+        query = normalized_query(request, ignore=(self.fields_query_param,
+                                                  self.exclude_query_param))
+        return f'{query}|{",".join(self.selected_fields())}'
 
     def perform_update(self, serializer):
         serializer.validated_data['owner'] = self.request.user
         serializer.save()
 
+    @action(detail=False)
+    def export(self, request):
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_CONTENT_TYPES:
+            raise ValidationError({'export_format': [
+                f'Choose one of: {", ".join(EXPORT_CONTENT_TYPES)}.']})
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(export_books(queryset, export_format),
+                                         content_type=EXPORT_CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = f'attachment; filename="books.{export_format}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import',
+            permission_classes=[IsAuthenticated])
+    def import_file(self, request):
+        content_type = request.content_type.split(';')[0].strip()
+        if content_type not in IMPORT_CONTENT_TYPES:
+            raise UnsupportedMediaType(content_type)
+        lines = (line.decode('utf-8') for line in request._request)
+        # Only staff may overwrite the books of other users, as IsOwnerOrStaffOrReadOnly.
+        summary = import_books(lines, IMPORT_CONTENT_TYPES[content_type], owner=request.user,
+                               max_errors=self.max_import_errors,
+                               only_own=not request.user.is_staff)
+        return Response(summary)
+
+    @action(detail=False)
+    def changes(self, request):
+        try:
+            since = parse_token(request.query_params.get('since'))
+        except ValueError:
+            raise ValidationError({'since': ['Pass 0 or the token of the previous sync.']})
+        return self.cached_response([LIST_GENERATION_KEY], self.changes_response, request,
+                                    since, top_limit(request, default=500, maximum=1000))
+
+    def changes_response(self, request, since, limit):
+        fields = self.selected_fields()
+        books = self.rows.values(self.get_queryset().order_by('version', 'pk'), fields)
+        changed, deleted, token, has_more, held = changes_since(books, since, limit)
+        response = Response(OrderedDict([
+            ('token', token),
+            ('has_more', has_more),
+            ('changed', self.rows.data(changed, fields)),
+            ('deleted', deleted),
+        ]))
+        if held:
+            # Out of date as soon as the transactions holding it back end.
+            response['Cache-Control'] = 'no-store'
+        return response
+
+    @action(detail=False)
+    def facets(self, request):
+        return self.cached_response([LIST_GENERATION_KEY], self.facets_response, request,
+                                    top_limit(request, default=10, maximum=100))
+
+    def facets_response(self, request, authors):
+        return Response(book_facets(self.filter_queryset(self.get_queryset()), authors))
+
+    @action(detail=False)
+    def trending(self, request):
+        window = request.query_params.get('window', DEFAULT_WINDOW)
+        if window not in WINDOWS:
+            raise ValidationError({'window': [f'Choose one of: {", ".join(WINDOWS)}.']})
+        return self.cached_response([LIST_GENERATION_KEY, TRENDING_GENERATION_KEY],
+                                    self.trending_response, request, window, top_limit(request))
+
+    def trending_response(self, request, window, limit):
+        return Response(TrendingSerializer(top_books(window, limit), many=True).data)
+
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        return self.cached_response([LIST_GENERATION_KEY, RECOMMENDATIONS_GENERATION_KEY],
+                                    self.similar_response, request, pk, top_limit(request))
+
+    def similar_response(self, request, pk, limit):
+        books = list(similar_to(pk)[:limit])
+        if not books:
+            get_object_or_404(Book, pk=pk)
+        return Response(ScoredBookSerializer(books, many=True).data)
+
 
-class BookRelationViewSet(UpdateModelMixin, GenericViewSet):
+class BookRelationViewSet(PendingChangesMixin, AsyncReadMixin, UpdateModelMixin, GenericViewSet):
     queryset = UserBookRelation.objects.all()
     serializer_class = UserBookRelationSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = 'book'
+    pagination_class = LibraryPagination
+    max_batch_size = 500
+
+    def buffers_request(self):
+        return write_behind_enabled() and self.action in ('update', 'partial_update')
+
+    def update(self, request, *args, **kwargs):
+        try:
+            book_id = _positive_int(self.kwargs['book'], strict=True)
+        except ValueError:
+            raise NotFound
+        serializer = self.get_serializer(data=request.data, partial=kwargs.get('partial', False))
+        serializer.is_valid(raise_exception=True)
+        changes = {field: value for field, value in serializer.validated_data.items()
+                   if field != 'book'}
+        if not Book.objects.filter(pk=book_id).exists():
+            raise NotFound
+        if self.buffers_request():
+            buffer_relation_change(request.user, book_id, changes)
+            return Response({'book': book_id, **changes}, status=status.HTTP_202_ACCEPTED)
+        relation = upsert_relations(request.user, {book_id: changes})[0][book_id]
+        return Response(self.get_serializer(relation).data)
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        if not isinstance(request.data, list):
+            raise ValidationError('Expected a list of relations.')
+        if len(request.data) > self.max_batch_size:
+            raise ValidationError(
+                f'Ensure this list has no more than {self.max_batch_size} elements.')
+
+        items = [UserBookRelationBatchSerializer(data=item, partial=True) for item in request.data]
+        valid = [item for item in items if item.is_valid()]
+        book_ids = {item.validated_data['book'] for item in valid}
+        existing_books = set(Book.objects.filter(pk__in=book_ids).values_list('pk', flat=True))
+
+        changes = {}
+        for item in valid:
+            data = dict(item.validated_data)
+            book_id = data.pop('book')
+            if book_id in existing_books:
+                changes.setdefault(book_id, {}).update(data)
+        relations, created = upsert_relations(request.user, changes) if changes else ({}, set())
+
+        results = []
+        for item in items:
+            if item.errors:
+                results.append({'errors': item.errors})
+                continue
+            book_id = item.validated_data['book']
+            if book_id not in existing_books:
+                message = str(PrimaryKeyRelatedField.default_error_messages['does_not_exist'])
+                results.append({'errors': {'book': [message.format(pk_value=book_id)]}})
+                continue
+            results.append({**UserBookRelationSerializer(relations[book_id]).data,
+                            'created': book_id in created})
+        return Response(results)
+
+    def library_queryset(self, condition):
+        return (UserBookRelation.objects.filter(condition, user=self.request.user)
+                .select_related('book').order_by('-id'))
+
+    def library(self, condition):
+        page = self.paginate_queryset(self.library_queryset(condition))
+        return self.get_paginated_response(LibrarySerializer(page, many=True).data)
+
+    async def alibrary(self, condition):
+        queryset = await sync_to_async(self.pinned)(self.library_queryset(condition))
+        page = await self.apaginate_queryset(queryset)
+        return self.get_paginated_response(LibrarySerializer(page, many=True).data)
+
+    @action(detail=False)
+    def bookmarks(self, request):
+        return self.library(Q(in_bookmarks=True))
+
+    @action(detail=False)
+    def likes(self, request):
+        return self.library(Q(like=True))
+
+    @action(detail=False)
+    def rated(self, request):
+        return self.library(Q(rate__isnull=False))
+
+    async def abookmarks(self, request):
+        return await self.alibrary(Q(in_bookmarks=True))
+
+    async def alikes(self, request):
+        return await self.alibrary(Q(like=True))
+
+    async def arated(self, request):
+        return await self.alibrary(Q(rate__isnull=False))
 
-    def get_object(self):
-        obj, created = UserBookRelation.objects.get_or_create(user=self.request.user,
-                                                        book_id=self.kwargs['book'])
-        # print('created', created)
-        return obj
+    @action(detail=False)
+    def recommended(self, request):
+        books = recommended_for(request.user)[:top_limit(request)]
+        return Response(ScoredBookSerializer(books, many=True).data)
 
 
 def auth(request):
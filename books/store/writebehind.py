@@ -0,0 +1,143 @@
+"""Write-behind buffering of relation toggles.
+
+With ``STORE_RELATION_WRITE_BEHIND = True``, ``PATCH /book-relation/<book>/``
+appends the change to ``PendingRelationChange`` and answers 202 without
+touching ``UserBookRelation`` or the book counters, so a promoted book does
+not make thousands of requests queue for its row lock.
+``flush_relation_changes``, run by the ``flush_relation_changes`` command,
+claims the oldest pending changes, merges them per (user, book) in arrival
+order and applies them with ``upsert_user_relations``: one upsert of the
+relations and one UPDATE of the book counters per batch.
+
+Users read their own writes: the next request of a user
+(``PendingChangesMixin``) applies the user's pending changes before anything
+else. Buffering a change marks its user in the cache; without the mark,
+which may have been evicted, an indexed query on the primary tells whether
+there are any while the mode is on. Others see them once the flusher ran.
+
+Changes of one user are applied in arrival order, by one flusher at a time:
+on PostgreSQL a flusher claims users with a transaction-level advisory lock
+per user, skipping the users another flusher holds, so flushers can run
+concurrently. The flush of a user's own request waits for that lock instead,
+so it returns only once every earlier change of the user is applied.
+Elsewhere run a single flusher.
+
+The buffer depth and the age of its oldest change are served as gauges by
+the metrics view.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from books.db import use_primary
+from store.cache import get_cache
+from store.logic import upsert_user_relations
+from store.models import Book, PendingRelationChange
+
+PENDING_KEY = 'store:relations:pending:{}'
+BATCH_SIZE = 2000
+# First key of the per-user advisory locks, the second is a hash of the user id.
+LOCK_NAMESPACE = 0x5e1a
+
+
+def write_behind_enabled():
+    return getattr(settings, 'STORE_RELATION_WRITE_BEHIND', False)
+
+
+def buffer_relation_change(user, book_id, changes):
+    PendingRelationChange.objects.create(user_id=user.pk, book_id=book_id, changes=changes)
+    get_cache().set(PENDING_KEY.format(user.pk), True, timeout=None)
+
+
+def flush_pending_for(user):
+    """Apply the pending changes of ``user``; at most one indexed query when there are none."""
+    key = PENDING_KEY.format(user.pk)
+    pending = PendingRelationChange.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user.pk)
+    if not get_cache().get(key) and not (write_behind_enabled() and pending.exists()):
+        return 0
+    flushed = 0
+    while True:
+        count = flush_relation_changes(user_id=user.pk)
+        flushed += count
+        if count < BATCH_SIZE:
+            break
+    # Unmarked only once applied, so a concurrent request of the user waits for
+    # this flush; a change buffered meanwhile is found by the query above.
+    get_cache().delete(key)
+    if flushed:
+        # The changes are only on the primary yet: read them back from there.
+        use_primary(sticky=True)
+    return flushed
+
+
+def lock_users(user_ids, wait=False):
+    """Take the flush locks of ``user_ids`` for the transaction, return the users locked.
+
+    Without ``wait``, users another flusher holds are skipped.
+    """
+    if connection.vendor != 'postgresql':
+        return set(user_ids)
+    function = 'pg_advisory_xact_lock' if wait else 'pg_try_advisory_xact_lock'
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT user_id, {function}(%s, hashint8(user_id)) '
+                       f'FROM unnest(%s::bigint[]) AS user_id ORDER BY user_id',
+                       [LOCK_NAMESPACE, sorted(user_ids)])
+        return {user_id for user_id, locked in cursor.fetchall() if locked is not False}
+
+
+def flush_relation_changes(batch_size=BATCH_SIZE, user_id=None):
+    """Apply up to ``batch_size`` of the oldest pending changes, return how many there were.
+
+    With ``user_id``, only that user's, waiting for a flusher busy with them.
+    Changes of deleted users or books are dropped.
+    """
+    pending = PendingRelationChange.objects.order_by('id')
+    with transaction.atomic():
+        if user_id is not None:
+            locked = lock_users([user_id], wait=True)
+        else:
+            locked = lock_users(set(pending.values_list('user_id', flat=True)[:batch_size]))
+        if not locked:
+            return 0
+        # The oldest changes of each locked user, so each is applied in arrival order.
+        claimed = list(pending.filter(user_id__in=locked)
+                       .values_list('id', 'user_id', 'book_id', 'changes')[:batch_size])
+        if not claimed:
+            return 0
+        PendingRelationChange.objects.filter(pk__in=[row[0] for row in claimed]).delete()
+
+        changes = {}
+        for pk, user_id, book_id, fields in claimed:
+            changes.setdefault((user_id, book_id), {}).update(fields)
+        users = set(User.objects.filter(pk__in={pair[0] for pair in changes})
+                    .values_list('pk', flat=True))
+        books = set(Book.objects.filter(pk__in={pair[1] for pair in changes})
+                    .values_list('pk', flat=True))
+        changes = {(user_id, book_id): fields for (user_id, book_id), fields in changes.items()
+                   if user_id in users and book_id in books}
+        if changes:
+            upsert_user_relations(changes)
+    return len(claimed)
+
+
+def buffer_gauges():
+    stats = PendingRelationChange.objects.aggregate(depth=Count('id'), oldest=Min('created_at'))
+    lag = (timezone.now() - stats['oldest']).total_seconds() if stats['oldest'] else 0.0
+    return {
+        'relation_buffer_depth': ('Relation changes waiting for the flusher.', stats['depth']),
+        'relation_buffer_lag_seconds': ('Age of the oldest pending relation change.', lag),
+    }
+
+
+class PendingChangesMixin:
+    """Apply the pending relation changes of the user before serving any of its requests."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.user.is_authenticated and not self.buffers_request():
+            flush_pending_for(request.user)
+
+    def buffers_request(self):
+        return False